@@ -1,74 +1,376 @@
-import sys
 import os
 import re
+import time
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from logger import get_logger
-from tools.movie_tools import search_movie_details, get_youtube_trailer, get_streaming_info, get_movie_title_from_search
+from utils.tracing import span
+from utils.metrics import track_phase, TOOL_LATENCY, SPECULATIVE_LOOKUPS, SPECULATION_SAVED
+from tools.movie_tools import (search_movie_details, get_youtube_trailer, get_streaming_info, get_movie_title_from_search,
+                               search_movies_bulk)
+from tools.movie_tools import (search_movie_details_async, get_youtube_trailer_async,
+                               get_streaming_info_async, get_movie_title_from_search_async, search_movies_bulk_async)
+from tools.movie_tools import clean_movie_title, title_candidate_listener
 
 logger = get_logger("Executor")
 
+# One pool serves every session of the process (see AgentRuntime), so it is sized for several plans at once
+MAX_WORKERS = int(os.getenv("EXECUTOR_MAX_WORKERS", 16))
+STEP_TIMEOUT = float(os.getenv("EXECUTOR_STEP_TIMEOUT", 30))
+SPECULATIVE = os.getenv("EXECUTOR_SPECULATIVE", "0") == "1"
+
+# Steps that only need the movie title, so they can start on an early candidate
+SPECULATIVE_TOOLS = {"search_movie_details", "get_youtube_trailer", "get_streaming_info"}
+
+# Catches: [OUTPUT], {step_1}, THE_MOVIE, previous_result, etc.
+PLACEHOLDER_PATTERN = re.compile(r'(\[.*?\]|\{.*?\}|OUTPUT|STEP|THE_MOVIE|placeholder|output of step \d+)', re.IGNORECASE)
+
+def _loop_running():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+class _Speculation:
+    """
+    Lookups started on the title search's early candidate (the cleaned top
+    DuckDuckGo hit) while the LLM is still refining it. One per plan run.
+    """
+    def __init__(self, steps, start_step):
+        self.steps = steps            # Tool names of the later steps that take the title
+        self.start_step = start_step  # (tool_name, title) -> task
+        self.tasks = {}               # (tool_name, title key) -> (task, started_at)
+        self.finished = {}            # (tool_name, title key) -> finished_at
+        self.hits = 0
+        self.wasted = 0
+        self.saved_s = 0.0
+
+    @staticmethod
+    def _key(tool_name, title):
+        return tool_name, clean_movie_title(title).lower()
+
+    def start(self, title):
+        for tool_name in self.steps:
+            key = self._key(tool_name, title)
+            if title and key not in self.tasks:
+                task = self.start_step(tool_name, title)
+                task.add_done_callback(lambda _, key=key: self.finished.setdefault(key, time.perf_counter()))
+                self.tasks[key] = (task, time.perf_counter())
+
+    def take(self, tool_name, title):
+        """The running (or finished) speculative task for this step, or None."""
+        key = self._key(tool_name, title)
+        entry = self.tasks.pop(key, None)
+        if entry is None:
+            return None
+        task, started_at = entry
+        saved = min(time.perf_counter(), self.finished.get(key, float("inf"))) - started_at
+        self.hits += 1
+        self.saved_s += saved
+        SPECULATIVE_LOOKUPS.inc(result="hit")
+        SPECULATION_SAVED.inc(saved)
+        return task
+
+    def settle(self, title=None):
+        """Cancels every speculative lookup that is not for `title` (all of them if None)."""
+        keep = {self._key(tool_name, title) for tool_name in self.steps} if title else set()
+        for key in [k for k in self.tasks if k not in keep]:
+            task, _ = self.tasks.pop(key)
+            task.cancel()
+            self.wasted += 1
+            SPECULATIVE_LOOKUPS.inc(result="wasted")
+
+
 class ExecutorAgent:
-    def __init__(self):
-        self.tool_map = {
-            "search_movie_details": search_movie_details,
-            "get_youtube_trailer": get_youtube_trailer,
-            "get_streaming_info": get_streaming_info,
-            "get_movie_title_from_search": get_movie_title_from_search
+    def __init__(self, max_workers: int = MAX_WORKERS, step_timeout: float = STEP_TIMEOUT,
+                 speculative: bool = SPECULATIVE):
+        self.tool_names = {
+            "search_movie_details",
+            "get_youtube_trailer",
+            "get_streaming_info",
+            "get_movie_title_from_search",
+            "search_movies_bulk",
         }
+        self.step_timeout = step_timeout
+        self.speculative = speculative
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="executor")
+        self._run_stats = {"runs": 0, "steps": 0, "timeouts": 0, "wall_clock_s": 0.0, "summed_step_latency_s": 0.0}
+        self._speculation_stats = {"hits": 0, "wasted": 0, "saved_s": 0.0}
+        self._stats_lock = threading.Lock()  # Runs from several sessions finish concurrently
+
+    def _get_tool(self, tool_name, suffix=""):
+        # Looked up at call time so a patched tool (e.g. in tests) is picked up
+        if tool_name not in self.tool_names:
+            raise KeyError(tool_name)
+        return globals()[tool_name + suffix]
+
+    async def _call_sync_tool(self, tool_name, arg):
+        """
+        Runs the tool on the pool. The step timeout starts when a worker
+        picks the call up: the pool is shared by every session, and time
+        spent queued behind other plans' steps is not this step's fault.
+        """
+        loop = asyncio.get_running_loop()
+        tool = self._get_tool(tool_name)
+        picked_up = loop.create_future()
+
+        def run(arg):
+            loop.call_soon_threadsafe(lambda: picked_up.done() or picked_up.set_result(None))
+            return tool(arg)
+
+        # Carry the current trace span into the worker thread
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(self.pool, context.run, run, arg)
+        try:
+            await asyncio.wait({picked_up, future}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            picked_up.cancel()
+        return await asyncio.wait_for(future, timeout=self.step_timeout)
+
+    async def _call_async_tool(self, tool_name, arg):
+        return await asyncio.wait_for(self._get_tool(tool_name, "_async")(arg), timeout=self.step_timeout)
+
+    @staticmethod
+    def _resolves_title(tool_name, context_movie_title):
+        """
+        True if this step can change the movie title used by later steps.
+        Every later step depends on it, so it has to finish before they start.
+        """
+        if tool_name == "get_movie_title_from_search":
+            return True
+        return tool_name == "search_movie_details" and context_movie_title is None
+
+    @staticmethod
+    async def _run_step(call_tool, tool_name, arg, durations, speculative=False):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with span("step", tool=tool_name, arg=arg) as step_span:
+                if speculative:
+                    step_span.set("speculative", True)
+                output = await call_tool(tool_name, arg)
+            status = "ok"
+            return output
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            durations.append((elapsed, status))
+            TOOL_LATENCY.observe(elapsed, tool=tool_name, status=status)
+
+    def _start_speculation(self, steps, index, call_tool, durations):
+        """
+        Prepares speculative lookups for the title search at steps[index].
+        Returns (speculation, listener), or (None, None) if no later step
+        would use the title.
+        """
+        later = []
+        for step in steps[index + 1:]:
+            tool_name = step.get("tool")
+            if tool_name == "get_movie_title_from_search":
+                break  # A second search would change the title again
+            if tool_name in SPECULATIVE_TOOLS and tool_name not in later:
+                later.append(tool_name)
+        if not later:
+            return None, None
+
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()  # Speculative spans nest under execute_plan
+        speculation = _Speculation(later, lambda tool_name, title: asyncio.ensure_future(
+            self._run_step(call_tool, tool_name, title, durations, speculative=True)))
+
+        def listener(title):
+            # Called from a worker thread (sync tools) or from the loop itself (async tools)
+            loop.call_soon_threadsafe(speculation.start, title, context=context)
+        return speculation, listener
+
+    async def _collect(self, step_id, task):
+        """Waits for a started step, turning failures and timeouts into error strings."""
+        try:
+            return await task
+        except asyncio.TimeoutError:
+            logger.error("Step %s timed out after %ss", step_id, self.step_timeout)
+            return f"Error: Step {step_id} timed out after {self.step_timeout}s."
+        except Exception as e:
+            logger.error("Step %s Failed: %s", step_id, e)
+            return f"Error: {str(e)}"
+
+    def execute_plan(self, plan, run_stats=None):
+        """
+        Runs the plan with the sync tools on the executor's thread pool.
+        If `run_stats` is a dict, this run's timings are written into it.
+        Called from a thread with a running event loop (an async host), the
+        plan runs on its own loop in a helper thread, blocking the caller;
+        async code should await execute_plan_async instead.
+        """
+        with span("execute_plan", steps=len(plan.get("steps", []))), track_phase("execute"):
+            run = self._run_plan(plan, self._call_sync_tool, run_stats)
+            if not _loop_running():
+                return asyncio.run(run)
+            # asyncio.run cannot start inside a running loop; the copied context keeps the trace span
+            context = contextvars.copy_context()
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="execute-plan") as runner:
+                return runner.submit(context.run, asyncio.run, run).result()
+
+    async def execute_plan_async(self, plan, run_stats=None):
+        """
+        Runs the plan with the async tools on the caller's event loop.
+        If `run_stats` is a dict, this run's timings are written into it.
+        """
+        with span("execute_plan", steps=len(plan.get("steps", []))), track_phase("execute"):
+            return await self._run_plan(plan, self._call_async_tool, run_stats)
+
+    async def _run_plan(self, plan, call_tool, run_stats=None):
+        """
+        Runs the plan steps, overlapping the ones that do not depend on each other.
+
+        A step depends on the most recent earlier step that can resolve the movie
+        title (see _resolves_title). Those steps are waited for before moving on;
+        every other step keeps running in the background. Results are gathered
+        in plan order, so the output matches a sequential run.
+        """
+        outputs = {}   # step index -> (tool_name, output)
+        pending = {}   # step index -> (step_id, tool_name, task)
+        context_movie_title = None
+        step_durations = []  # (seconds, status) per step run
+        speculations = []
+        started = time.perf_counter()
+        steps = plan.get("steps", [])
 
-    def execute_plan(self, plan):
-        results = {}
-        context_movie_title = None 
-        
         logger.info("Starting execution phase...")
 
-        for step in plan.get("steps", []):
+        for index, step in enumerate(steps):
             tool_name = step.get("tool")
-            arg = str(step.get("args")) # Force string conversion
+            args = step.get("args")
+            # Force string conversion (a list of titles for a bulk step becomes "A | B")
+            arg = " | ".join(map(str, args)) if isinstance(args, list) else str(args)
             step_id = step.get("step_id")
-            
+
             # --- 1. DETECT PLACEHOLDERS (Aggressive Regex) ---
-            # Catches: [OUTPUT], {step_1}, THE_MOVIE, previous_result, etc.
-            is_placeholder = bool(re.search(r'(\[.*?\]|\{.*?\}|OUTPUT|STEP|THE_MOVIE|placeholder|output of step \d+)', arg, re.IGNORECASE))
+            is_placeholder = bool(PLACEHOLDER_PATTERN.search(arg))
 
             # --- 2. CONTEXT REPLACEMENT ---
             if context_movie_title:
                 # If we know the movie, ALWAYS replace the argument if it looks generic or is a placeholder
-                if is_placeholder or tool_name != "get_movie_title_from_search":
-                    logger.info(f"🔄 Replacing '{arg}' with discovered title '{context_movie_title}'")
+                if is_placeholder or tool_name not in ("get_movie_title_from_search", "search_movies_bulk"):
+                    logger.info("🔄 Replacing '%s' with discovered title '%s'", arg, context_movie_title)
                     arg = context_movie_title
-            
+
             elif is_placeholder:
                 # CRITICAL: If we have a placeholder but NO title, the previous step failed.
                 # STOP. Do not call OMDb with "[OUTPUT FROM STEP 1]".
                 error_msg = f"Error: Previous step failed to find a movie title. Cannot execute {tool_name}."
                 logger.error(error_msg)
-                results[tool_name] = error_msg
-                continue 
+                outputs[index] = (tool_name, error_msg)
+                continue
 
             # --- 3. EXECUTION ---
-            try:
-                logger.info(f"Executing Step {step_id}: {tool_name}('{arg}')")
-                
-                output = self.tool_map[tool_name](arg)
-                results[tool_name] = output
-                
-                # --- 4. CAPTURE TITLE ---
-                if tool_name == "get_movie_title_from_search":
-                    # Check if the tool actually found something
-                    if isinstance(output, str) and "Found via search:" in output:
-                        context_movie_title = output.replace("Found via search:", "").strip()
-                        logger.info(f"🎯 Discovered Target Movie: {context_movie_title}")
-                    else:
-                        logger.warning(f"⚠️ Search step finished but didn't return a clear title. Output: {output[:50]}...")
-
-                # Also capture from OMDb if that was the first step
-                elif tool_name == "search_movie_details" and isinstance(output, dict) and "title" in output:
-                    context_movie_title = output['title']
-
-            except Exception as e:
-                logger.error(f"Step {step_id} Failed: {e}")
-                results[tool_name] = f"Error: {str(e)}"
-
-        return results
\ No newline at end of file
+            logger.info("Executing Step %s: %s('%s')", step_id, tool_name, arg)
+            task = speculations[-1].take(tool_name, arg) if speculations and tool_name in SPECULATIVE_TOOLS else None
+            if task is not None:
+                logger.info("⚡ Step %s already started speculatively for '%s'", step_id, arg)
+            elif self.speculative and tool_name == "get_movie_title_from_search":
+                speculation, listener = self._start_speculation(steps, index, call_tool, step_durations)
+                token = title_candidate_listener.set(listener)
+                try:
+                    # The task copies the context, so the tool sees the listener
+                    task = asyncio.ensure_future(self._run_step(call_tool, tool_name, arg, step_durations))
+                finally:
+                    title_candidate_listener.reset(token)
+                if speculation:
+                    speculations.append(speculation)
+            else:
+                task = asyncio.ensure_future(self._run_step(call_tool, tool_name, arg, step_durations))
+
+            if not self._resolves_title(tool_name, context_movie_title):
+                # Nothing later depends on this step, keep going while it runs
+                pending[index] = (step_id, tool_name, task)
+                continue
+
+            output = await self._collect(step_id, task)
+            outputs[index] = (tool_name, output)
+            if isinstance(output, str) and output.startswith("Error:"):
+                if speculations and tool_name == "get_movie_title_from_search":
+                    speculations[-1].settle()
+                continue
+
+            # --- 4. CAPTURE TITLE ---
+            if tool_name == "get_movie_title_from_search":
+                # Check if the tool actually found something
+                if isinstance(output, str) and "Found via search:" in output:
+                    context_movie_title = output.replace("Found via search:", "").strip()
+                    logger.info("🎯 Discovered Target Movie: %s", context_movie_title)
+                else:
+                    logger.warning("⚠️ Search step finished but didn't return a clear title. Output: %s...", str(output)[:50])
+                if speculations:
+                    # Keep the lookups the candidate got right, redo the rest with the real title
+                    speculations[-1].settle(context_movie_title)
+
+            # Also capture from OMDb if that was the first step
+            elif isinstance(output, dict) and "title" in output:
+                context_movie_title = output['title']
+
+        for speculation in speculations:
+            speculation.settle()  # Nothing left to use them
+        for index, (step_id, tool_name, task) in pending.items():
+            outputs[index] = (tool_name, await self._collect(step_id, task))
+
+        results = {}
+        for index in sorted(outputs):
+            tool_name, output = outputs[index]
+            results[tool_name] = output
+
+        wall_clock = time.perf_counter() - started
+        summed = sum(elapsed for elapsed, _ in step_durations)
+        timeouts = sum(1 for _, status in step_durations if status == "timeout")
+        run = {
+            "wall_clock_s": round(wall_clock, 3),
+            "summed_step_latency_s": round(summed, 3),
+            "steps": len(step_durations),  # Includes speculative lookups
+            "timeouts": timeouts,
+        }
+        with self._stats_lock:
+            self._run_stats["runs"] += 1
+            self._run_stats["steps"] += len(step_durations)
+            self._run_stats["timeouts"] += timeouts
+            self._run_stats["wall_clock_s"] += wall_clock
+            self._run_stats["summed_step_latency_s"] += summed
+        if speculations:
+            speculated = {"hits": sum(s.hits for s in speculations), "wasted": sum(s.wasted for s in speculations),
+                          "saved_s": sum(s.saved_s for s in speculations)}
+            with self._stats_lock:
+                for field, value in speculated.items():
+                    self._speculation_stats[field] += value
+            run["speculation"] = dict(speculated, saved_s=round(speculated["saved_s"], 3))
+        if run_stats is not None:
+            run_stats.update(run)
+        logger.info("⏱️ Execution took %.2fs wall-clock vs %.2fs summed step latency", wall_clock, summed)
+
+        return results
+
+    def execution_stats(self):
+        """Plans run, steps, step timeouts and time spent, since start-up, over every session."""
+        with self._stats_lock:
+            stats = dict(self._run_stats)
+        runs = stats["runs"]
+        stats["avg_wall_clock_s"] = round(stats["wall_clock_s"] / runs, 3) if runs else 0.0
+        stats["wall_clock_s"] = round(stats["wall_clock_s"], 3)
+        stats["summed_step_latency_s"] = round(stats["summed_step_latency_s"], 3)
+        return stats
+
+    def speculation_stats(self):
+        """Speculative lookups reused (hits) or cancelled (wasted) and the step latency saved, since start-up."""
+        with self._stats_lock:
+            stats = dict(self._speculation_stats)
+        total = stats["hits"] + stats["wasted"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+        stats["saved_s"] = round(stats["saved_s"], 3)
+        return stats
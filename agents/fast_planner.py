@@ -0,0 +1,162 @@
+import re
+from typing import Dict, Any, Optional
+
+from logger import get_logger
+
+logger = get_logger("FastPlanner")
+
+# Deterministic planner for request shapes we recognise ("trailer for Inception",
+# "who directed Heat", "movie where a tire kills people"). It emits the same plan
+# shape the LLM planner would, and returns None whenever it is not sure so the
+# caller falls back to the LLM.
+
+TITLE = r"(?P<title>.+?)"
+
+INTENT_PATTERNS = {
+    "trailer": [
+        rf"^(?:show me |find |get |play |watch |give me )?(?:the )?(?:official )?trailer (?:for|of|to) {TITLE}$",
+        rf"^{TITLE} (?:official )?trailer$",
+    ],
+    "streaming": [
+        rf"^where (?:can|do|could|should) (?:i|we) (?:watch|stream|see) {TITLE}(?: online| streaming)?$",
+        rf"^where (?:is|to) (?:watch |stream )?{TITLE} (?:streaming|available)$",
+        rf"^where to (?:watch|stream) {TITLE}$",
+        rf"^is {TITLE} (?:streaming|on netflix|on prime|on disney\+?|on hulu|available to stream)(?: anywhere)?$",
+    ],
+    "details": [
+        rf"^who directed {TITLE}$",
+        rf"^who is the director of {TITLE}$",
+        rf"^(?:what is|what's) {TITLE} about$",
+        rf"^(?:what is |what's )?(?:the )?(?:imdb )?rating (?:of|for) {TITLE}$",
+        rf"^when (?:was|did) {TITLE} (?:released|come out)$",
+        rf"^(?:the )?(?:plot|synopsis|director|release year|year) of {TITLE}$",
+        rf"^(?:tell me about|find|look up|search for|details (?:for|on|about)|info (?:on|about)|information (?:on|about)) {TITLE}$",
+    ],
+}
+
+# "compare Heat, Collateral and Thief", "tell me about Heat, Ronin and Collateral"
+LIST_PATTERN = re.compile(
+    r"^(?P<verb>compare|tell me about|look up|find|info on|details (?:for|on|about)) (?P<titles>.+)$",
+    re.IGNORECASE,
+)
+LIST_SEPARATORS = re.compile(r"\s*(?:,|;|\bvs\.?(?=\s)|\bversus\b)\s*", re.IGNORECASE)
+MAX_BULK_TITLES = 10
+
+DESCRIBE_PATTERN = re.compile(
+    r"\b(?:movie|film)\s+(?:where|about|in which|that|with)\b|\bthe one (?:where|with|about)\b",
+    re.IGNORECASE,
+)
+
+# A title containing one of these is probably not a title, or needs the LLM
+# (context, rankings, release dates) to be resolved.
+UNSURE_WORDS = {
+    "it", "that", "this", "them", "they", "movie", "film", "movies", "films",
+    "latest", "newest", "last", "upcoming", "next", "recent", "best", "worst",
+    "where", "which", "who", "what", "about", "trailer", "streaming",
+}
+# Descriptions that lean on the conversation or ask for suggestions go to the LLM
+DESCRIBE_UNSURE_WORDS = {"previous", "earlier", "same", "similar", "another", "again", "recommend", "suggest"}
+MAX_TITLE_WORDS = 8
+
+
+def _normalize(text: str) -> str:
+    text = re.sub(r"\s+", " ", text.strip())
+    return text.rstrip("?.! ")
+
+
+def _clean_title(raw: str) -> Optional[str]:
+    """Returns the title if it looks like an explicit one, else None."""
+    title = re.sub(r"^(?:the )?(?:movie|film) ", "", raw.strip(), flags=re.IGNORECASE)
+    title = title.strip("\"'“”‘’ ")
+    words = title.split()
+    if not words or len(words) > MAX_TITLE_WORDS:
+        return None
+    if any(word.lower().strip(",:") in UNSURE_WORDS for word in words):
+        return None
+    if re.search(r"\b(?:19|20)\d{2}\b", title):  # "the Mission Impossible coming out in 2025"
+        return None
+    return title
+
+
+def _split_title_list(text: str, allow_and: bool):
+    """
+    Splits "Heat, Collateral and Thief" into titles. Without a comma (or "vs")
+    " and " only counts for "compare", so "tell me about Harry Potter and the
+    Deathly Hallows" is left alone. Returns None if any part is not a clean title.
+    """
+    parts = [p for p in LIST_SEPARATORS.split(text) if p]
+    if len(parts) > 1 or allow_and:
+        last = re.sub(r"^and ", "", parts[-1], flags=re.IGNORECASE)
+        parts[-1:] = last.rsplit(" and ", 1)
+    titles = [_clean_title(p) for p in parts]
+    if len(titles) < 2 or len(titles) > MAX_BULK_TITLES or not all(titles):
+        return None
+    return titles
+
+
+def _build_plan(first_step: Dict[str, str], follow_ups) -> Dict[str, Any]:
+    steps = [first_step]
+    if first_step["tool"] == "get_movie_title_from_search":
+        steps.append({"tool": "search_movie_details", "args": "THE_MOVIE", "description": "Fetch movie details"})
+    for tool, description in follow_ups:
+        steps.append({"tool": tool, "args": "THE_MOVIE", "description": description})
+    for index, step in enumerate(steps, start=1):
+        step["step_id"] = index
+    return {"steps": steps}
+
+
+FOLLOW_UPS = {
+    "trailer": ("get_youtube_trailer", "Fetch the trailer"),
+    "streaming": ("get_streaming_info", "Find streaming options"),
+}
+
+
+def fast_path_plan(user_request: str) -> Optional[Dict[str, Any]]:
+    """
+    Plans recognisable requests without the LLM. Returns None when unsure.
+    """
+    text = _normalize(user_request)
+    if not text:
+        return None
+
+    # --- 1. DESCRIBE-A-MOVIE: "the movie where a car tire kills people" ---
+    if DESCRIBE_PATTERN.search(text):
+        lowered = text.lower()
+        if len(text.split()) < 4 or DESCRIBE_UNSURE_WORDS & set(re.findall(r"\w+", lowered)):
+            return None
+        follow_ups = [FOLLOW_UPS[intent] for intent in ("trailer", "streaming")
+                      if intent in lowered or (intent == "streaming" and "where to watch" in lowered)]
+        first = {"tool": "get_movie_title_from_search", "args": text, "description": "Identify the movie from the description"}
+        return _build_plan(first, follow_ups)
+
+    # --- 2. SEVERAL EXPLICIT TITLES: one bulk lookup instead of N steps ---
+    list_match = LIST_PATTERN.match(text)
+    if list_match:
+        is_compare = list_match.group("verb").lower() == "compare"
+        titles = _split_title_list(list_match.group("titles"), allow_and=is_compare)
+        if titles:
+            logger.info("⚡ Fast path: bulk lookup of %s titles", len(titles))
+            first = {"tool": "search_movies_bulk", "args": " | ".join(titles), "description": "Fetch details for every movie"}
+            return _build_plan(first, [])
+        if is_compare:
+            return None
+
+    # --- 3. EXPLICIT TITLE + INTENT ---
+    matches = []
+    for intent, patterns in INTENT_PATTERNS.items():
+        for pattern in patterns:
+            match = re.match(pattern, text, re.IGNORECASE)
+            title = _clean_title(match.group("title")) if match else None
+            if title:
+                matches.append((intent, title))
+                break
+
+    if len(matches) != 1:
+        return None  # Nothing recognised, or ambiguous
+
+    intent, title = matches[0]
+
+    first = {"tool": "search_movie_details", "args": title, "description": "Fetch movie details"}
+    follow_ups = [FOLLOW_UPS[intent]] if intent in FOLLOW_UPS else []
+    logger.info("⚡ Fast path: intent='%s', title='%s'", intent, title)
+    return _build_plan(first, follow_ups)
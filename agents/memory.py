@@ -0,0 +1,149 @@
+"""
+Per-session conversation memory for the chat UI.
+
+A long chat used to keep every message in st.session_state forever and hand
+the planner the last four messages raw. ConversationMemory instead keeps:
+
+- the newest CHAT_MAX_MESSAGES messages (older ones are dropped, each one
+  capped at MAX_MESSAGE_CHARS), rendered a page at a time
+- an entity state rolled forward from each turn's tool results: the current
+  movie(s) and their key details
+- a compact summary of what was dropped: the number of earlier turns and the
+  movies they were about
+
+context() builds the planner's chat history from these, within a fixed
+token budget however long the session runs.
+"""
+import os
+from collections import deque
+
+from llm.compaction import HISTORY_TOKEN_BUDGET, trim_history, truncate
+from tools.movie_tools import clean_movie_title
+
+CHAT_MAX_MESSAGES = int(os.getenv("CHAT_MAX_MESSAGES", 50))
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", 20))
+MAX_MESSAGE_CHARS = 4000
+RECENT_MESSAGES = 4     # Raw messages given to the planner, like the app always did
+MAX_PAST_MOVIES = 5
+ENTITY_TOKENS = 60      # Share of the context budget for the current movie line(s)
+
+# Details worth remembering for follow-ups ("Who directed it?", "Is it any good?")
+DETAIL_FIELDS = ("year", "director", "rating")
+
+
+def _movie(details):
+    """{"title", ...DETAIL_FIELDS} from an OMDb details dict, or None."""
+    if not isinstance(details, dict) or "Error" in details or not details.get("title"):
+        return None
+    return {"title": details["title"], **{f: details.get(f) for f in DETAIL_FIELDS if details.get(f)}}
+
+
+def movies_from_results(results):
+    """The movies a turn's tool results were about, most specific source first."""
+    results = results or {}
+    bulk = results.get("search_movies_bulk")
+    if isinstance(bulk, list):
+        movies = [m for m in (_movie(r) for r in bulk) if m]
+        if movies:
+            return movies
+    movie = _movie(results.get("search_movie_details"))
+    if movie:
+        return [movie]
+    found = results.get("get_movie_title_from_search")
+    if isinstance(found, str) and found.startswith("Found via search:"):
+        title = clean_movie_title(found)
+        if title:
+            return [{"title": title}]
+    return []
+
+
+def _label(movie):
+    return f"{movie['title']} ({movie['year']})" if movie.get("year") else movie["title"]
+
+
+class ConversationMemory:
+    """One chat session's messages, entity state and summary. Lives in st.session_state."""
+
+    def __init__(self, max_messages=CHAT_MAX_MESSAGES, page_size=CHAT_PAGE_SIZE,
+                 context_tokens=HISTORY_TOKEN_BUDGET):
+        self.max_messages = max_messages
+        self.page_size = page_size
+        self.context_tokens = context_tokens
+        self.clear()
+
+    def clear(self):
+        self.messages = deque(maxlen=self.max_messages)
+        self.current_movies = []  # The movie(s) of the latest turn that found any
+        self.last_results = {}    # Tool outputs of the latest turn
+        self.past_movies = []     # Earlier movies, newest last
+        self.dropped_turns = 0    # User messages that fell out of `messages`
+
+    # --- Recording ---
+    def _append(self, role, content):
+        if len(self.messages) == self.max_messages and self.messages[0]["role"] == "user":
+            self.dropped_turns += 1
+        self.messages.append({"role": role, "content": str(content)[:MAX_MESSAGE_CHARS]})
+
+    def add_user(self, content):
+        self._append("user", content)
+
+    def add_assistant(self, content, results=None):
+        """The answer to the latest user message, and the tool results it was built from."""
+        self._append("assistant", content)
+        if results is None:
+            return
+        self.last_results = results
+        movies = movies_from_results(results)
+        if not movies:
+            return
+        for movie in self.current_movies:
+            if movie["title"] not in (m["title"] for m in movies):
+                self.past_movies = [m for m in self.past_movies if m["title"] != movie["title"]] + [movie]
+        self.past_movies = self.past_movies[-MAX_PAST_MOVIES:]
+        self.current_movies = movies
+
+    # --- Planner context ---
+    def summary(self):
+        """What the conversation was about beyond the recent messages, in a line or two."""
+        lines = []
+        if self.current_movies:
+            details = "\n".join("; ".join([_label(m)] + [f"{f}: {m[f]}" for f in ("director", "rating") if f in m])
+                                for m in self.current_movies)
+            lines.append(f"Current movie: {details}" if len(self.current_movies) == 1
+                         else f"Current movies:\n{details}")
+        if self.past_movies:
+            lines.append("Earlier movies: " + ", ".join(_label(m) for m in reversed(self.past_movies)))
+        if self.dropped_turns:
+            lines.append(f"({self.dropped_turns} earlier turns not shown)")
+        return truncate("\n".join(lines), ENTITY_TOKENS) if lines else ""
+
+    def context(self, current_request=None):
+        """
+        The planner's chat history: the summary, then the newest messages, in
+        at most `context_tokens` tokens whatever the session length.
+        """
+        summary = self.summary()
+        recent = "\n".join(f"{m['role'].capitalize()}: {m['content']}"
+                           for m in list(self.messages)[-RECENT_MESSAGES:])
+        budget = self.context_tokens - (ENTITY_TOKENS if summary else 0)
+        recent = trim_history(recent, budget, current_request=current_request)
+        return "\n".join(part for part in (summary, recent) if part)
+
+    # --- Rendering ---
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.messages) // self.page_size))
+
+    def page(self, index=0):
+        """Messages of page `index`, oldest first; page 0 holds the newest ones."""
+        messages = list(self.messages)
+        end = len(messages) - index * self.page_size
+        return messages[max(0, end - self.page_size):max(0, end)]
+
+    def stats(self):
+        return {
+            "messages": len(self.messages),
+            "chars": sum(len(m["content"]) for m in self.messages),
+            "dropped_turns": self.dropped_turns,
+            "current_movies": [m["title"] for m in self.current_movies],
+        }
@@ -1,24 +1,56 @@
 import json
-import sys
 import os
+import time
 import logging
+import threading
 from typing import Dict, Any, Optional
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from logger import get_logger
+from agents.fast_planner import fast_path_plan
+from utils.tracing import span
+from utils.metrics import track_phase, PLANS
+from llm.rate_limiter import PRIORITY_DEFAULT
+from llm.compaction import PROMPT_COMPACTION, trim_history
 
 logger = get_logger("Planner")
 
+USE_FAST_PATH = os.getenv("PLANNER_FAST_PATH", "1") != "0"
+
+# How many plans came from the fast path vs the LLM, and how long each took
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "fast_path": 0, "llm": 0, "fast_path_time_s": 0.0, "llm_time_s": 0.0}
+
+def _record(route: str, seconds: float):
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats[route] += 1
+        _stats[f"{route}_time_s"] += seconds
+
+def get_planner_stats() -> Dict[str, Any]:
+    """
+    Fraction of requests served by the fast path, and the latency it saved
+    (estimated from the average LLM planning time).
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    avg_llm = stats["llm_time_s"] / stats["llm"] if stats["llm"] else 0.0
+    stats["fast_path_ratio"] = round(stats["fast_path"] / stats["requests"], 4) if stats["requests"] else 0.0
+    stats["avg_llm_plan_s"] = round(avg_llm, 3)
+    stats["latency_saved_s"] = round(max(0.0, stats["fast_path"] * avg_llm - stats["fast_path_time_s"]), 3)
+    return stats
+
 try:
-    from llm.groq_client import llm_client
+    from llm.groq_client import llm_client, async_llm_client
 except ImportError:
     llm_client = None
+    async_llm_client = None
 
 # ... (Keep your existing TOOLS and helper functions: extract_json, validate_plan, build_tools_description) ...
 # COPY PASTE YOUR EXISTING TOOLS DICTIONARY AND HELPER FUNCTIONS HERE
 TOOLS = {
     "get_movie_title_from_search": "Use this if the user describes a movie but doesn't give the exact name.",
     "search_movie_details": "Use this ONLY when you have a specific movie title.",
+    "search_movies_bulk": "Use this ONCE (not one step per movie) when the user names several specific movies, e.g. to compare them. Pass all titles separated by ' | '.",
     "get_youtube_trailer": "Fetch the YouTube trailer URL for a movie",
     "get_streaming_info": "Find where the movie is available for streaming"
 }
@@ -40,17 +72,63 @@ def validate_plan(plan: Dict[str, Any]) -> bool:
 def build_tools_description() -> str:
     return "\n".join(f"{i+1}. {name}(query): {desc}" for i, (name, desc) in enumerate(TOOLS.items()))
 
+# One line per tool for the compact prompt; same rules as TOOLS, fewer words
+COMPACT_TOOLS = {
+    "get_movie_title_from_search": "the user describes a movie without naming it",
+    "search_movie_details": "details of one specific title",
+    "search_movies_bulk": "several specific titles (e.g. to compare): ONE step, titles joined by ' | '",
+    "get_youtube_trailer": "trailer URL",
+    "get_streaming_info": "where to stream it",
+}
+
+# The static part of the compact prompt. It comes first and never changes, so
+# every planning call shares the same prefix; each rule is stated once.
+PLANNER_INSTRUCTIONS = f"""You are an AI Planner Agent. Break the user's request into tool calls.
+
+TOOLS:
+{chr(10).join(f"- {name}: {desc}" for name, desc in COMPACT_TOOLS.items())}
+
+Reply with ONLY this JSON: {{"steps": [{{"step_id": 1, "tool": "tool_name", "args": "argument", "description": "short"}}]}}
+- A follow-up about an earlier movie ("Who directed it?"): take its title from the CONVERSATION.
+- A specific title: use it. A vague description: start with get_movie_title_from_search.
+- Later steps that need the movie: args "THE_MOVIE".
+"""
+
 class PlannerAgent:
-    def __init__(self):
+    def __init__(self, use_fast_path: bool = USE_FAST_PATH, priority: int = PRIORITY_DEFAULT,
+                 compact_prompts: bool = PROMPT_COMPACTION):
         if llm_client is None: raise RuntimeError("LLM Client is not initialized.")
         self.llm = llm_client
+        self.async_llm = async_llm_client
+        self.use_fast_path = use_fast_path
+        self.priority = priority  # Rate-limit queue priority of the planning LLM call
+        self.compact_prompts = compact_prompts
 
-    # 1. UPDATED SIGNATURE: Accept chat_history
-    def create_plan(self, user_request: str, chat_history: str = "", retries: int = 2):
-        logger.info(f"Received request: '{user_request}'")
-        
-        # 2. UPDATED PROMPT: Include History
-        prompt = f"""
+    def _try_fast_path(self, user_request: str):
+        if not self.use_fast_path:
+            return None
+        started = time.perf_counter()
+        plan = fast_path_plan(user_request)
+        if plan and validate_plan(plan):
+            _record("fast_path", time.perf_counter() - started)
+            return plan
+        return None
+
+    def _build_prompt(self, user_request: str, chat_history: str) -> str:
+        if not self.compact_prompts:
+            return self._build_full_prompt(user_request, chat_history)
+        # History trimmed to a token budget, still enough for follow-ups ("Who directed it?")
+        history = trim_history(chat_history, current_request=user_request)
+        context = f"\nCONVERSATION:\n{history}\n" if history else ""
+        return f"""{PLANNER_INSTRUCTIONS}{context}
+USER REQUEST:
+<<< {user_request} >>>
+"""
+
+    @staticmethod
+    def _build_full_prompt(user_request: str, chat_history: str) -> str:
+        # Include History so follow-ups ("Who directed it?") can be resolved
+        return f"""
 You are an AI Planner Agent.
 
 Your task is to break down a user's request into a sequence of steps.
@@ -80,19 +158,74 @@ USER REQUEST:
 
 PLAN (JSON ONLY):
 """
-        for attempt in range(retries + 1):
-            try:
-                response_text = self.llm.generate_text(prompt)
-                clean_json = extract_json(response_text)
-                if not clean_json: raise ValueError("No JSON found")
-                
-                plan = json.loads(clean_json)
-                if not validate_plan(plan): raise ValueError("Invalid plan")
-                
-                for index, step in enumerate(plan["steps"], start=1):
-                    step["step_id"] = index
-                    
+
+    @staticmethod
+    def _parse_plan(response_text: str) -> Dict[str, Any]:
+        clean_json = extract_json(response_text)
+        if not clean_json: raise ValueError("No JSON found")
+
+        plan = json.loads(clean_json)
+        if not validate_plan(plan): raise ValueError("Invalid plan")
+
+        for index, step in enumerate(plan["steps"], start=1):
+            step["step_id"] = index
+
+        return plan
+
+    def create_plan(self, user_request: str, chat_history: str = "", retries: int = 2):
+        logger.info("Received request: '%s'", user_request)
+        with span("create_plan") as plan_span, track_phase("plan"):
+            plan = self._try_fast_path(user_request)
+            if plan:
+                plan_span.set("route", "fast_path")
+                PLANS.inc(route="fast_path")
                 return plan
-            except Exception as e:
-                logger.error(f"Planning failed attempt {attempt}: {e}")
-                if attempt == retries: return None
\ No newline at end of file
+
+            plan_span.set("route", "llm")
+            prompt = self._build_prompt(user_request, chat_history)
+            started = time.perf_counter()
+
+            for attempt in range(retries + 1):
+                plan_span.set("attempts", attempt + 1)
+                try:
+                    # A retry needs a fresh completion, not the cached answer that just failed
+                    plan = self._parse_plan(self.llm.generate_text(prompt, use_cache=attempt == 0, priority=self.priority,
+                                                                  prompt_name="planner", validate=self._parse_plan))
+                    _record("llm", time.perf_counter() - started)
+                    PLANS.inc(route="llm")
+                    return plan
+                except Exception as e:
+                    logger.error("Planning failed attempt %s: %s", attempt, e)
+                    if attempt == retries:
+                        PLANS.inc(route="failed")
+                        return None
+
+    async def create_plan_async(self, user_request: str, chat_history: str = "", retries: int = 2):
+        """Async version of create_plan, backed by the AsyncGroqClient."""
+        logger.info("Received request: '%s'", user_request)
+        with span("create_plan") as plan_span, track_phase("plan"):
+            plan = self._try_fast_path(user_request)
+            if plan:
+                plan_span.set("route", "fast_path")
+                PLANS.inc(route="fast_path")
+                return plan
+
+            plan_span.set("route", "llm")
+            prompt = self._build_prompt(user_request, chat_history)
+            started = time.perf_counter()
+
+            for attempt in range(retries + 1):
+                plan_span.set("attempts", attempt + 1)
+                try:
+                    # A retry needs a fresh completion, not the cached answer that just failed
+                    plan = self._parse_plan(await self.async_llm.generate_text(prompt, use_cache=attempt == 0,
+                                                                              priority=self.priority, prompt_name="planner",
+                                                                              validate=self._parse_plan))
+                    _record("llm", time.perf_counter() - started)
+                    PLANS.inc(route="llm")
+                    return plan
+                except Exception as e:
+                    logger.error("Planning failed attempt %s: %s", attempt, e)
+                    if attempt == retries:
+                        PLANS.inc(route="failed")
+                        return None
\ No newline at end of file
@@ -1,29 +1,38 @@
-import sys
-import os
+import time
 
-# Add parent directory to path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from logger import get_logger
+from utils.tracing import span
+from utils.metrics import track_phase
 
 logger = get_logger("Verifier")
 
 try:
-    from llm.groq_client import llm_client
+    from llm.groq_client import llm_client, async_llm_client
 except ImportError:
     llm_client = None
+    async_llm_client = None
+from llm.rate_limiter import PRIORITY_INTERACTIVE
+from llm.compaction import PROMPT_COMPACTION, compact
+
+# Static part of the compact prompt (first, so every call shares the prefix)
+VERIFIER_INSTRUCTIONS = """You are the Verifier Agent. Answer the user from the tool outputs below.
+- STATUS "Movie Not Found": apologize and ask for clarification.
+- STATUS "Movie Found": state the identified movie name clearly and give the trailer link if there is one. \
+Do not say you couldn't find details when you have the name and trailer. Be helpful.
+"""
 
 class VerifierAgent:
-    def __init__(self):
+    def __init__(self, priority: int = PRIORITY_INTERACTIVE, compact_prompts: bool = PROMPT_COMPACTION):
         self.llm = llm_client
+        self.async_llm = async_llm_client
+        # A user is normally waiting on this answer, so it jumps ahead of background
+        # LLM work; batch jobs pass PRIORITY_BACKGROUND instead
+        self.priority = priority
+        self.compact_prompts = compact_prompts
         if self.llm is None:
             logger.critical("LLM Client is not initialized! Verifier cannot generate text.")
 
-    def verify_and_respond(self, user_query, execution_results):
-        logger.info("Verifying results and generating response...")
-
-        if self.llm is None:
-            return "I apologize, but my language engine is currently offline."
-
+    def _build_prompt(self, user_query, execution_results):
         # --- SMART VALIDATION ---
         
         # 1. Did OMDb work?
@@ -38,8 +47,12 @@ class VerifierAgent:
         if search_result and isinstance(search_result, str) and "Found via search:" in search_result:
             search_success = True
 
-        # DECISION: It counts as found if EITHER works
-        movie_found = omdb_success or search_success
+        # 3. Did a bulk lookup find any of the movies?
+        bulk_result = execution_results.get("search_movies_bulk")
+        bulk_found = [r for r in bulk_result if isinstance(r, dict)] if isinstance(bulk_result, list) else []
+
+        # DECISION: It counts as found if ANY of them works
+        movie_found = omdb_success or search_success or bool(bulk_found)
 
         if not movie_found:
             # THIS IS THE NEW MESSAGE. If you don't see this in logs, the file didn't save.
@@ -51,6 +64,22 @@ class VerifierAgent:
             movie_name_display = omdb_result.get('title', 'Unknown')
         elif search_success:
             movie_name_display = search_result.replace("Found via search:", "").strip()
+        elif bulk_found:
+            movie_name_display = ", ".join(r.get("title", "Unknown") for r in bulk_found)
+
+        if self.compact_prompts:
+            # Tool outputs as short "key: value" text instead of Python reprs
+            lines = [f'User Query: "{user_query}"',
+                     f"STATUS: {'Movie Found' if movie_found else 'Movie Not Found'}",
+                     f"Movie Name Identified: {movie_name_display}",
+                     f"OMDb Details: {compact(omdb_result) if omdb_result else 'not found'}"]
+            trailer = execution_results.get('get_youtube_trailer')
+            if trailer:
+                lines.append(f"Trailer Link: {compact(trailer)}")
+            if bulk_result is not None:
+                lines.append(f"Details for each requested movie (in order):\n{compact(bulk_result)}")
+            context = "\n".join(lines)
+            return f"{VERIFIER_INSTRUCTIONS}\n{context}\n\nFINAL RESPONSE:\n"
 
         context = f"""
         User Query: "{user_query}"
@@ -61,6 +90,9 @@ class VerifierAgent:
         1. OMDb Details: {omdb_result if omdb_result else "Not executed/Not found"}
         2. Trailer Link: {execution_results.get('get_youtube_trailer', 'Not found')}
         """
+        if bulk_result is not None:
+            context += f"""3. Details for each requested movie (in order): {bulk_result}
+        """
 
         prompt = f"""
         You are the Verifier Agent.
@@ -76,9 +108,71 @@ class VerifierAgent:
 
         FINAL RESPONSE:
         """
+        return prompt
+
+    def verify_and_respond(self, user_query, execution_results):
+        logger.info("Verifying results and generating response...")
+
+        if self.llm is None:
+            return "I apologize, but my language engine is currently offline."
+
+        prompt = self._build_prompt(user_query, execution_results)
+
+        with span("verify") as verify_span, track_phase("verify"):
+            try:
+                return self.llm.generate_text(prompt, priority=self.priority, prompt_name="verifier")
+            except Exception as e:
+                logger.error("LLM Generation failed: %s", e)
+                verify_span.set("fallback", True)
+                return "I found the movie, but I'm having trouble summarizing it right now."
+
+    def verify_and_respond_stream(self, user_query, execution_results, timings=None):
+        """
+        Streaming version of verify_and_respond: yields the answer chunk by chunk.
+        Time-to-first-token and total generation time are logged, and written
+        into `timings` (a dict) when one is passed.
+        """
+        logger.info("Verifying results and streaming response...")
+
+        if self.llm is None:
+            yield "I apologize, but my language engine is currently offline."
+            return
+
+        prompt = self._build_prompt(user_query, execution_results)
+        started = time.perf_counter()
+        first_token = None
+
+        with span("verify", stream=True) as verify_span, track_phase("verify"):
+            try:
+                for chunk in self.llm.stream_text(prompt, priority=self.priority, prompt_name="verifier"):
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                        verify_span.set("ttft_ms", round(first_token * 1000, 1))
+                    yield chunk
+            except Exception as e:
+                logger.error("LLM Generation failed: %s", e)
+                verify_span.set("fallback", True)
+                yield "I found the movie, but I'm having trouble summarizing it right now."
+
+        total = time.perf_counter() - started
+        if timings is not None:
+            timings.update(ttft_s=round(first_token, 3) if first_token is not None else None, total_s=round(total, 3))
+        if first_token is not None:
+            logger.info("⏱️ First token after %.2fs, full response after %.2fs", first_token, total)
+
+    async def verify_and_respond_async(self, user_query, execution_results):
+        """Async version of verify_and_respond, backed by the AsyncGroqClient."""
+        logger.info("Verifying results and generating response...")
+
+        if self.async_llm is None:
+            return "I apologize, but my language engine is currently offline."
+
+        prompt = self._build_prompt(user_query, execution_results)
 
-        try:
-            return self.llm.generate_text(prompt)
-        except Exception as e:
-            logger.error(f"LLM Generation failed: {e}")
-            return "I found the movie, but I'm having trouble summarizing it right now."
\ No newline at end of file
+        with span("verify") as verify_span, track_phase("verify"):
+            try:
+                return await self.async_llm.generate_text(prompt, priority=self.priority, prompt_name="verifier")
+            except Exception as e:
+                logger.error("LLM Generation failed: %s", e)
+                verify_span.set("fallback", True)
+                return "I found the movie, but I'm having trouble summarizing it right now."
\ No newline at end of file
@@ -1,9 +1,14 @@
 import streamlit as st
-from agents.planner import PlannerAgent
-from agents.executor import ExecutorAgent
-from agents.verifier import VerifierAgent
+from dotenv import load_dotenv
+
+load_dotenv()  # Before the project modules read their settings
+
+from runtime import get_runtime
+from agents.memory import ConversationMemory
 from logger import get_logger
-import os
+from utils.cache import clear_cache
+from utils.tracing import trace
+from utils.metrics import start_metrics_server, track_phase
 
 # Page Config
 st.set_page_config(page_title="AI Movie Assistant", page_icon="🎬", layout="wide")
@@ -18,28 +23,51 @@ st.markdown("""
 
 logger = get_logger("StreamlitApp")
 
+@st.cache_resource
+def load_runtime():
+    """
+    Built once per process and shared by every session and rerun, so agents,
+    the LLM client, HTTP pools and caches are not rebuilt for each message.
+    Chat history stays per session in st.session_state (a ConversationMemory).
+    Also starts the /metrics endpoint (METRICS_PORT) next to the app, and
+    pays the deferred start-up work (SDK imports, cache files) here rather
+    than in the first user's question.
+    """
+    start_metrics_server()
+    return get_runtime(warm=True)
+
 def main():
     st.title("🎬 AI Movie Agent")
     st.write("Ask me about movies, trailers, ratings, or plot summaries!")
 
     # --- 1. INITIALIZE MEMORY ---
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    # Bounded per session: capped message list, current movie + summary for the Planner
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory()
+        st.session_state.history_page = 0
+    memory = st.session_state.memory
 
     # Sidebar for controls
     with st.sidebar:
         st.header("⚙️ Controls")
         if st.button("🧹 Clear Conversation"):
-            st.session_state.messages = []
-            if os.path.exists("search_cache.json"):
-                os.remove("search_cache.json")
+            memory.clear()
+            st.session_state.history_page = 0
+            clear_cache()
             st.rerun()
 
     # --- 2. DISPLAY HISTORY ---
-    # We display previous messages so the user sees the conversation flow
-    for message in st.session_state.messages:
+    # One page of messages per rerun (newest by default), so long chats render fast
+    page = min(st.session_state.history_page, memory.page_count - 1)
+    if page + 1 < memory.page_count and st.button("⬆️ Show older messages"):
+        st.session_state.history_page = page + 1
+        st.rerun()
+    for message in memory.page(page):
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
+    if page > 0 and st.button("⬇️ Back to latest"):
+        st.session_state.history_page = 0
+        st.rerun()
 
     # --- 3. HANDLE NEW INPUT ---
     if prompt := st.chat_input("How can I help you today?"):
@@ -49,51 +77,56 @@ def main():
             st.markdown(prompt)
         
         # Add to history
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        memory.add_user(prompt)
+        st.session_state.history_page = 0
 
         # --- PREPARE CONTEXT STRING ---
-        # Convert the last 3 turns into a string for the Planner
-        # Format: "User: ... \n Agent: ..."
-        history_text = "\n".join(
-            [f"{m['role'].capitalize()}: {m['content']}" for m in st.session_state.messages[-4:]]
-        )
-
-        # Run Agents
-        with st.spinner("Thinking..."):
-            try:
-                # Initialize Agents
-                planner = PlannerAgent()
-                executor = ExecutorAgent()
-                verifier = VerifierAgent()
-
-                # Plan (With History!)
-                plan = planner.create_plan(prompt, chat_history=history_text)
+        # Current movie, earlier movies and the last turns, in a fixed token budget
+        # Format: "Current movie: ... \n User: ... \n Assistant: ..."
+        history_text = memory.context(current_request=prompt)
+
+        # One trace per question, from planning to the last streamed token
+        with trace("user_query", query=prompt), track_phase("query"):
+            # Run Agents
+            response_stream = None
+            results = None
+            with st.spinner("Thinking..."):
+                try:
+                    # Shared Agents
+                    runtime = load_runtime()
+                    planner, executor, verifier = runtime.planner, runtime.executor, runtime.verifier
+
+                    # Plan (With History!)
+                    plan = planner.create_plan(prompt, chat_history=history_text)
                 
-                if plan:
-                    with st.status("⚙️ Executing Logic...", expanded=False) as status:
-                        st.json(plan)
+                    if plan:
+                        with st.status("⚙️ Executing Logic...", expanded=False) as status:
+                            st.json(plan)
                         
-                        # Execute
-                        results = executor.execute_plan(plan)
-                        st.write("✅ Tools Executed")
-                        st.json(results)
-                        status.update(label="Process Complete", state="complete")
-
-                    # Verify & Respond
-                    final_response = verifier.verify_and_respond(prompt, results)
+                            # Execute
+                            results = executor.execute_plan(plan)
+                            st.write("✅ Tools Executed")
+                            st.json(results)
+                            status.update(label="Process Complete", state="complete")
+
+                        # Verify & Respond (streamed below as tokens arrive)
+                        response_stream = verifier.verify_and_respond_stream(prompt, results)
+                    else:
+                        final_response = "I couldn't generate a plan. Please try again."
+
+                except Exception as e:
+                    logger.exception("App Crash: %s", e)
+                    final_response = f"An error occurred: {str(e)}"
+
+            # Display Assistant Response
+            with st.chat_message("assistant"):
+                if response_stream is not None:
+                    final_response = st.write_stream(response_stream)
                 else:
-                    final_response = "I couldn't generate a plan. Please try again."
-
-            except Exception as e:
-                logger.error(f"App Crash: {e}")
-                final_response = f"An error occurred: {str(e)}"
-
-        # Display Assistant Response
-        with st.chat_message("assistant"):
-            st.markdown(final_response)
+                    st.markdown(final_response)
 
-        # Add Assistant response to history
-        st.session_state.messages.append({"role": "assistant", "content": final_response})
+        # Add Assistant response (and what the tools found) to history
+        memory.add_assistant(final_response, results)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
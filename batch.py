@@ -0,0 +1,196 @@
+"""
+Batch mode: answers a file of movie questions with bounded concurrency.
+
+    python batch.py queries.jsonl answers.jsonl --concurrency 8
+    python batch.py queries.csv answers.jsonl --rpm 20   # leave Groq headroom for the app
+
+Input is JSONL (one {"query": "..."} object, or a bare JSON string, per line)
+or CSV with a "query" column. Identical questions (ignoring case, spacing and
+trailing punctuation) are answered once; the output record lists every input
+row that asked it.
+
+Output is JSONL, appended and flushed as each question finishes, so it is also
+the checkpoint: running the same command again skips questions that already
+have an answer and retries the ones that failed (the newest line for a
+question wins). Every Groq call goes through the shared rate-limit scheduler
+at background priority.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()  # Before the project modules read their settings
+
+from agents.planner import PlannerAgent
+from agents.executor import ExecutorAgent
+from agents.verifier import VerifierAgent
+from llm.rate_limiter import scheduler, PRIORITY_BACKGROUND
+from utils.metrics import track_phase
+from utils.tracing import trace
+
+DEFAULT_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+
+
+def query_key(query):
+    """Questions that only differ in case, spacing or trailing punctuation share a key."""
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?.! ")
+
+
+def read_queries(path):
+    """Returns [(row_number, query)] from a JSONL or CSV file, skipping blank rows."""
+    rows = []
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for number, record in enumerate(csv.DictReader(f), start=1):
+                query = (record.get("query") or "").strip()
+                if query:
+                    rows.append((number, query))
+            return rows
+
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            query = (record.get("query", "") if isinstance(record, dict) else str(record)).strip()
+            if query:
+                rows.append((number, query))
+    return rows
+
+
+def dedupe(rows):
+    """Groups input rows by query_key, keeping the first spelling and input order."""
+    jobs = {}
+    for number, query in rows:
+        job = jobs.setdefault(query_key(query), {"key": query_key(query), "query": query, "rows": []})
+        job["rows"].append(number)
+    return list(jobs.values())
+
+
+def load_checkpoint(path):
+    """Keys already answered in an earlier (possibly interrupted) run."""
+    done = {}
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Half-written last line of an interrupted run
+            if isinstance(record, dict) and "key" in record:
+                done[record["key"]] = record.get("error") is None
+    return {key for key, ok in done.items() if ok}
+
+
+def _ends_mid_line(path):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+class BatchRunner:
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, planner=None, executor=None, verifier=None):
+        self.concurrency = concurrency
+        # Background priority: an interactive user sharing the process is served first
+        self.planner = planner or PlannerAgent(priority=PRIORITY_BACKGROUND)
+        self.executor = executor or ExecutorAgent()
+        self.verifier = verifier or VerifierAgent(priority=PRIORITY_BACKGROUND)
+
+    async def answer(self, job):
+        """Runs one question through plan -> execute -> verify and returns its output record."""
+        record = {"key": job["key"], "query": job["query"], "rows": job["rows"],
+                  "answer": None, "plan": None, "error": None}
+        started = time.perf_counter()
+        with trace("batch_query", query=job["query"]), track_phase("query"):
+            try:
+                plan = await self.planner.create_plan_async(job["query"])
+                if not plan:
+                    record["error"] = "Planning failed."
+                else:
+                    results = await self.executor.execute_plan_async(plan)
+                    record["plan"] = plan
+                    record["answer"] = await self.verifier.verify_and_respond_async(job["query"], results)
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+        record["elapsed_s"] = round(time.perf_counter() - started, 3)
+        return record
+
+    async def run(self, jobs, out, on_record=None):
+        """
+        Answers `jobs` with at most `concurrency` in flight, writing each record
+        to the open file `out` as soon as it finishes.
+        """
+        queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+
+        async def worker():
+            while True:
+                try:
+                    job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                record = await self.answer(job)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if on_record:
+                    on_record(record)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(jobs)) or 1)))
+
+
+def run_batch(input_path, output_path, concurrency=DEFAULT_CONCURRENCY, runner=None):
+    """Answers every not-yet-answered question in `input_path`. Returns (answered, failed, skipped)."""
+    jobs = dedupe(read_queries(input_path))
+    done = load_checkpoint(output_path)
+    todo = [job for job in jobs if job["key"] not in done]
+    runner = runner or BatchRunner(concurrency)
+    counts = {"answered": 0, "failed": 0}
+    started = time.perf_counter()
+
+    def progress(record):
+        counts["failed" if record["error"] else "answered"] += 1
+        finished = counts["answered"] + counts["failed"]
+        status = "❌" if record["error"] else "✅"
+        print(f"[{finished}/{len(todo)}] {status} {record['query'][:60]} ({record['elapsed_s']}s)", file=sys.stderr)
+
+    print(f"📦 {len(jobs)} unique queries, {len(jobs) - len(todo)} already answered, {len(todo)} to go", file=sys.stderr)
+    with open(output_path, "a", encoding="utf-8") as out:
+        if _ends_mid_line(output_path):
+            out.write("\n")  # An interrupted run left half a record behind
+        asyncio.run(runner.run(todo, out, on_record=progress))
+    print(f"🏁 Done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return counts["answered"], counts["failed"], len(jobs) - len(todo)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a file of movie questions in batch")
+    parser.add_argument("input", help="Queries as JSONL or CSV (with a 'query' column)")
+    parser.add_argument("output", help="Answers as JSONL; also the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Questions in flight at once")
+    parser.add_argument("--rpm", type=int, help="Groq requests per minute for this job (default: GROQ_RPM)")
+    parser.add_argument("--tpm", type=int, help="Groq tokens per minute for this job (default: GROQ_TPM)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.getLogger("AI_Movie_Assistant").setLevel(logging.WARNING)
+    scheduler.configure(rpm=args.rpm, tpm=args.tpm)
+    _, failed, _ = run_batch(args.input, args.output, args.concurrency)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+End-to-end plan -> execute -> verify benchmark, fully offline.
+
+Every backend (Groq, OMDb, YouTube, DuckDuckGo) is replayed from
+benchmarks/fixtures/pipeline.json with configurable latency and error
+injection (see benchmarks/replay.py). N sessions run the fixture queries
+concurrently against one shared AgentRuntime, like Streamlit sessions do.
+
+    python -m benchmarks.bench_pipeline --sessions 8 --rounds 3
+    python -m benchmarks.bench_pipeline --mode async --llm-ms 400 --error-rate 0.05
+    python -m benchmarks.bench_pipeline --output after.json --baseline before.json
+    python -m benchmarks.bench_pipeline --speculative   # report speculation hit rate / time saved
+
+Reports p50/p95/p99 per phase and in total, plus throughput. With
+--baseline, exits non-zero if any p95 got worse than the tolerance allows.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.replay import Latency, load_fixtures, offline_pipeline
+from runtime import AgentRuntime
+from utils import tracing
+from utils.tracing import trace
+
+PHASES = ("plan", "execute", "verify", "total")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+
+def summarize(values):
+    ms = [v * 1000 for v in values]
+    return {
+        "p50": round(percentile(ms, 50), 2),
+        "p95": round(percentile(ms, 95), 2),
+        "p99": round(percentile(ms, 99), 2),
+        "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        "max": round(max(ms), 2) if ms else 0.0,
+    }
+
+
+def _session_queries(queries, session, rounds):
+    # Each session starts at a different query so they do not move in lockstep
+    shifted = queries[session % len(queries):] + queries[:session % len(queries)]
+    return shifted * rounds
+
+
+def run_query_sync(runtime, query):
+    timings = {}
+    with trace("user_query", query=query):
+        started = time.perf_counter()
+        plan = runtime.planner.create_plan(query)
+        timings["plan"] = time.perf_counter() - started
+
+        mark = time.perf_counter()
+        results = runtime.executor.execute_plan(plan) if plan else {}
+        timings["execute"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        runtime.verifier.verify_and_respond(query, results)
+        timings["verify"] = time.perf_counter() - mark
+        timings["total"] = time.perf_counter() - started
+    return timings, plan is not None
+
+
+async def run_query_async(runtime, query):
+    timings = {}
+    with trace("user_query", query=query):
+        started = time.perf_counter()
+        plan = await runtime.planner.create_plan_async(query)
+        timings["plan"] = time.perf_counter() - started
+
+        mark = time.perf_counter()
+        results = await runtime.executor.execute_plan_async(plan) if plan else {}
+        timings["execute"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        await runtime.verifier.verify_and_respond_async(query, results)
+        timings["verify"] = time.perf_counter() - mark
+        timings["total"] = time.perf_counter() - started
+    return timings, plan is not None
+
+
+def run_sync(runtime, queries, sessions, rounds):
+    def session(index):
+        return [run_query_sync(runtime, q) for q in _session_queries(queries, index, rounds)]
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        return [r for rs in pool.map(session, range(sessions)) for r in rs]
+
+
+def run_async(runtime, queries, sessions, rounds):
+    async def session(index):
+        return [await run_query_async(runtime, q) for q in _session_queries(queries, index, rounds)]
+
+    async def main():
+        results = await asyncio.gather(*(session(i) for i in range(sessions)))
+        return [r for rs in results for r in rs]
+
+    return asyncio.run(main())
+
+
+def run_benchmark(sessions=4, rounds=2, mode="sync", llm=None, http=None, ddgs=None,
+                  warm_caches=False, fixtures=None, speculative=False):
+    """Runs the benchmark and returns the report dict."""
+    fixtures = fixtures or load_fixtures()
+    queries = [s["query"] for s in fixtures["scenarios"]]
+
+    with offline_pipeline(fixtures, llm=llm, http=http, ddgs=ddgs, warm_caches=warm_caches):
+        runtime = AgentRuntime()
+        runtime.executor.speculative = speculative
+        started = time.perf_counter()
+        runner = run_async if mode == "async" else run_sync
+        results = runner(runtime, queries, sessions, rounds)
+        wall_clock = time.perf_counter() - started
+        stats = runtime.stats()
+    runtime.executor.pool.shutdown(wait=False)
+
+    return {
+        "mode": mode,
+        "sessions": sessions,
+        "requests": len(results),
+        "failed_plans": sum(1 for _, ok in results if not ok),
+        "wall_clock_s": round(wall_clock, 3),
+        "throughput_rps": round(len(results) / wall_clock, 3) if wall_clock else 0.0,
+        "latency_ms": {phase: summarize([t[phase] for t, _ in results]) for phase in PHASES},
+        "stats": {k: stats[k] for k in ("planner", "search_cache", "tool_caches", "completion_cache", "http",
+                                        "speculation")},
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Lists the phases whose p95 regressed by more than `tolerance` (a fraction)."""
+    regressions = []
+    for phase in PHASES:
+        before = baseline["latency_ms"][phase]["p95"]
+        after = report["latency_ms"][phase]["p95"]
+        if before and after > before * (1 + tolerance):
+            regressions.append(f"{phase}: p95 {before}ms -> {after}ms (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline plan -> execute -> verify benchmark")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent sessions")
+    parser.add_argument("--rounds", type=int, default=2, help="Passes over the fixture queries per session")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--llm-ms", type=float, default=300.0, help="Simulated Groq latency")
+    parser.add_argument("--http-ms", type=float, default=80.0, help="Simulated OMDb/YouTube latency")
+    parser.add_argument("--ddgs-ms", type=float, default=400.0, help="Simulated DuckDuckGo latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected failure rate for every backend")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm", action="store_true", help="Use the real (persistent) caches")
+    parser.add_argument("--speculative", action="store_true", help="Start title-dependent lookups on the top search hit")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 regression (fraction)")
+    parser.add_argument("--trace", metavar="FILE", help="Write per-query span traces (JSONL) to FILE")
+    parser.add_argument("--verbose", action="store_true", help="Keep agent logs and tool output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    latency = lambda ms, offset: Latency(ms, args.error_rate, seed=args.seed + offset)
+
+    if args.trace:
+        tracing.configure(enabled=True, path=args.trace)
+
+    quiet = not args.verbose
+    if quiet:
+        logging.getLogger("AI_Movie_Assistant").setLevel(logging.CRITICAL)
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        report = run_benchmark(args.sessions, args.rounds, args.mode,
+                               llm=latency(args.llm_ms, 0), http=latency(args.http_ms, 1),
+                               ddgs=latency(args.ddgs_ms, 2), warm_caches=args.warm,
+                               speculative=args.speculative)
+    report["config"] = {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "trace", "verbose")}
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Prompt size benchmark: the original planner / verifier prompts against the
+compact ones (llm/compaction.py), on the fixture scenarios.
+
+Every scenario is planned (LLM planner, no fast path) and verified twice,
+once per prompt style, with the chat history the app would send (the last
+four messages, the current request included). Reports the prompt tokens per
+prompt type from the token ledger, the mean latency per phase, and whether
+both styles produced the same plans.
+
+    python -m benchmarks.bench_prompts
+    python -m benchmarks.bench_prompts --llm-ms 150 --ms-per-1k-tokens 400
+    python -m benchmarks.bench_prompts --live   # real Groq (needs GROQ_API_KEY); plans may differ
+
+Offline, the fake Groq answers from the fixtures, so identical plans only
+show that the compact prompt still carries the request; --live checks that
+the model itself plans the same. Exits non-zero if any plan differs.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import time
+
+from benchmarks.replay import Latency, load_fixtures, offline_pipeline
+from llm.tokens import token_ledger
+
+PROMPTS = ("planner", "verifier")
+
+
+def session_history(scenarios, index):
+    """The app's history for scenario `index`: the previous turn (and one before it), then the request."""
+    messages = []
+    for earlier in scenarios[max(0, index - 2):index]:
+        messages += [f"User: {earlier['query']}", f"Assistant: {earlier['answer']}"]
+    messages.append(f"User: {scenarios[index]['query']}")
+    return "\n".join(messages[-4:])
+
+
+def _plan_signature(plan):
+    return [(step.get("tool"), step.get("args")) for step in (plan or {}).get("steps", [])]
+
+
+def run_style(scenarios, compact_prompts):
+    """Plans and verifies every scenario with one prompt style; returns (plans, report)."""
+    from agents.executor import ExecutorAgent
+    from agents.planner import PlannerAgent
+    from agents.verifier import VerifierAgent
+
+    planner = PlannerAgent(use_fast_path=False, compact_prompts=compact_prompts)
+    verifier = VerifierAgent(compact_prompts=compact_prompts)
+    executor = ExecutorAgent()
+    token_ledger.reset()
+    plans, timings = [], {"plan": [], "verify": []}
+    try:
+        for index, scenario in enumerate(scenarios):
+            started = time.perf_counter()
+            plan = planner.create_plan(scenario["query"], chat_history=session_history(scenarios, index))
+            timings["plan"].append(time.perf_counter() - started)
+            plans.append(_plan_signature(plan))
+
+            results = executor.execute_plan(plan) if plan else {}
+            started = time.perf_counter()
+            verifier.verify_and_respond(scenario["query"], results)
+            timings["verify"].append(time.perf_counter() - started)
+    finally:
+        executor.pool.shutdown(wait=False)
+
+    ledger = token_ledger.stats()
+    report = {
+        "tokens": {name: {"avg_prompt_tokens": ledger.get(name, {}).get("avg_prompt_tokens"),
+                          "avg_estimated_prompt_tokens": ledger.get(name, {}).get("avg_estimated_prompt_tokens"),
+                          "prompt_tokens": ledger.get(name, {}).get("prompt_tokens", 0)}
+                   for name in PROMPTS},
+        "latency_ms": {phase: round(sum(values) / len(values) * 1000, 2) if values else 0.0
+                       for phase, values in timings.items()},
+    }
+    return plans, report
+
+
+def _reduction(before, after):
+    return round(1 - after / before, 3) if before else 0.0
+
+
+def run_benchmark(llm=None, fixtures=None, live=False):
+    """Runs both prompt styles and returns the comparison report."""
+    fixtures = fixtures or load_fixtures()
+    scenarios = fixtures["scenarios"]
+    context = contextlib.nullcontext() if live else offline_pipeline(fixtures, llm=llm)
+    with context:
+        full_plans, full = run_style(scenarios, compact_prompts=False)
+        compact_plans, compact = run_style(scenarios, compact_prompts=True)
+
+    differing = [{"query": s["query"], "full": f, "compact": c}
+                 for s, f, c in zip(scenarios, full_plans, compact_plans) if f != c]
+    return {
+        "scenarios": len(scenarios),
+        "full": full,
+        "compact": compact,
+        "token_reduction": {name: _reduction(full["tokens"][name]["prompt_tokens"],
+                                             compact["tokens"][name]["prompt_tokens"]) for name in PROMPTS},
+        "latency_reduction": {phase: _reduction(full["latency_ms"][phase], compact["latency_ms"][phase])
+                              for phase in full["latency_ms"]},
+        "identical_plans": not differing,
+        "differing_plans": differing,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Original vs compact planner/verifier prompts")
+    parser.add_argument("--llm-ms", type=float, default=100.0, help="Simulated Groq latency per call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=300.0,
+                        help="Simulated Groq latency per 1k prompt tokens (prefill)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--live", action="store_true", help="Use the real Groq, OMDb and search backends")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep agent logs and tool output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    quiet = not args.verbose
+    if quiet:
+        logging.getLogger("AI_Movie_Assistant").setLevel(logging.CRITICAL)
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        report = run_benchmark(llm=Latency(args.llm_ms, seed=args.seed, ms_per_1k_tokens=args.ms_per_1k_tokens),
+                               live=args.live)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if not report["identical_plans"]:
+        print(f"❌ {len(report['differing_plans'])} plan(s) differ between the prompt styles")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,65 @@
+"""
+Per-message overhead of building agents per chat message vs reusing the
+process-wide runtime (what app.py did before and does now).
+
+Tools are stubbed out, so the numbers are only the framework overhead:
+agent construction, a fresh executor thread pool, and plan scheduling.
+
+    python -m benchmarks.bench_runtime [iterations]
+"""
+import json
+import sys
+import time
+from unittest.mock import patch
+
+from agents.planner import PlannerAgent
+from agents.executor import ExecutorAgent
+from agents.verifier import VerifierAgent
+from runtime import AgentRuntime
+
+PLAN = {
+    "steps": [
+        {"step_id": 1, "tool": "search_movie_details", "args": "Heat"},
+        {"step_id": 2, "tool": "get_youtube_trailer", "args": "THE_MOVIE"},
+        {"step_id": 3, "tool": "get_streaming_info", "args": "THE_MOVIE"},
+    ]
+}
+
+
+def per_message_agents():
+    planner, executor, verifier = PlannerAgent(), ExecutorAgent(), VerifierAgent()
+    executor.execute_plan(PLAN)
+    executor.pool.shutdown(wait=False)
+
+
+def shared_runtime(runtime):
+    runtime.executor.execute_plan(PLAN)
+
+
+def measure(fn, iterations):
+    fn()  # Warm-up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+def main(iterations=200):
+    stub = lambda arg: {"title": arg} if arg == "Heat" else "ok"
+    with patch("agents.executor.search_movie_details", stub), \
+         patch("agents.executor.get_youtube_trailer", stub), \
+         patch("agents.executor.get_streaming_info", stub):
+        runtime = AgentRuntime()
+        before = measure(per_message_agents, iterations)
+        after = measure(lambda: shared_runtime(runtime), iterations)
+
+    print(json.dumps({
+        "iterations": iterations,
+        "per_message_agents_ms": round(before, 3),
+        "shared_runtime_ms": round(after, 3),
+        "saved_per_message_ms": round(before - after, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,126 @@
+"""
+Cold-start benchmark: what importing the entry points costs.
+
+Each module is imported in a fresh interpreter with `python -X importtime`,
+from an empty temporary directory, a few times. Reports per module:
+- import_ms: cumulative import time of the module itself (median of runs)
+- process_ms: wall clock of the whole interpreter run (median)
+- heavy: which heavy SDKs got imported (they should load on first use)
+- files_created: anything the import wrote to the working directory
+- slowest: the imports with the highest self time
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --output startup.json
+    python -m benchmarks.bench_startup --baseline startup.json   # fails on a >20% import_ms regression
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ("runtime", "batch", "main", "agents.planner", "tools.movie_tools")
+HEAVY_MODULES = ("groq", "httpx", "ddgs", "numpy", "sentence_transformers", "tiktoken", "http.server")
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """[(name, self_us, cumulative_us, depth)] from `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def import_once(module):
+    """One cold import of `module`: (importtime rows, wall clock seconds, files created, heavy modules loaded)."""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+               PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("GROQ_API_KEY", "startup-benchmark")
+    with tempfile.TemporaryDirectory() as cwd:
+        started = time.perf_counter()
+        # -X importtime also lists failed imports (optional packages), so what loaded comes from sys.modules
+        code = f"import {module}, sys; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                                cwd=cwd, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        created = sorted(os.listdir(cwd))
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    heavy = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+    return parse_importtime(result.stderr), elapsed, created, [m for m in heavy.split(",") if m]
+
+
+def measure(module, runs=3, top=8):
+    """Report dict for one module (see the module docstring)."""
+    import_ms, process_ms, created, rows, heavy = [], [], set(), [], []
+    for _ in range(runs):
+        rows, elapsed, files, heavy = import_once(module)
+        own = [cumulative for name, _, cumulative, depth in rows if name == module and depth == 0]
+        import_ms.append(own[-1] / 1000 if own else 0.0)
+        process_ms.append(elapsed * 1000)
+        created.update(files)
+    return {
+        "import_ms": round(statistics.median(import_ms), 1),
+        "process_ms": round(statistics.median(process_ms), 1),
+        "heavy": heavy,
+        "files_created": sorted(created),
+        "slowest": [{"module": name, "self_ms": round(self_us / 1000, 1)}
+                    for name, self_us, _, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:top]],
+    }
+
+
+def run_benchmark(modules=MODULES, runs=3):
+    return {"python": sys.version.split()[0], "runs": runs,
+            "modules": {module: measure(module, runs) for module in modules}}
+
+
+def compare(report, baseline, tolerance):
+    """Lists the modules whose import_ms regressed by more than `tolerance` (a fraction)."""
+    regressions = []
+    for module, after in report["modules"].items():
+        before = baseline["modules"].get(module, {}).get("import_ms")
+        if before and after["import_ms"] > before * (1 + tolerance):
+            regressions.append(f"{module}: {before}ms -> {after['import_ms']}ms "
+                               f"(+{(after['import_ms'] / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time (cold start) benchmark")
+    parser.add_argument("--modules", nargs="+", default=list(MODULES), help="Modules to import")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per module (median is reported)")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed import_ms regression (fraction)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args.modules, args.runs)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ Import time regressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("✅ No import time regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
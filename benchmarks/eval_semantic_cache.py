@@ -0,0 +1,97 @@
+"""
+Recall and false-hit rate of the semantic cache on a labeled set of
+paraphrases (benchmarks/fixtures/semantic_queries.json).
+
+For every "cached" movie the first description is stored, then the other
+descriptions are looked up. Every "near_misses" entry stores its "cached"
+query too; its queries differ from it in a sequel number, an ordinal or one
+content word, name another film and should miss, like the descriptions of
+"unseen" movies.
+- recall: share of the "cached" lookups that return the right title
+- false-hit rate: share of all lookups that return a wrong title
+
+    python -m benchmarks.eval_semantic_cache
+    python -m benchmarks.eval_semantic_cache --thresholds 0.7 0.8 0.82 0.85
+    python -m benchmarks.eval_semantic_cache --model sentence-transformers/all-MiniLM-L6-v2
+"""
+import argparse
+import json
+import os
+
+from tools.semantic_cache import SemanticCache, SEMANTIC_CACHE_THRESHOLD, make_embedder
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "semantic_queries.json")
+
+
+def load_labeled_set(path=FIXTURE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def evaluate(threshold=SEMANTIC_CACHE_THRESHOLD, embedder=None, labeled=None):
+    """
+    Returns {"threshold", "recall", "false_hit_rate", "positives", "negatives",
+    "near_misses", "misses": [...], "false_hits": [...]}.
+    """
+    labeled = labeled or load_labeled_set()
+    cache = SemanticCache(path="", threshold=threshold, embedder=embedder or make_embedder())
+    for movie in labeled["cached"]:
+        cache.put(movie["queries"][0], movie["title"])
+    for movie in labeled.get("near_misses", []):
+        cache.put(movie["cached"], movie["title"])
+
+    lookups = [(q, m["title"]) for m in labeled["cached"] for q in m["queries"][1:]]
+    near_misses = [(q, None) for m in labeled.get("near_misses", []) for q in m["queries"]]
+    negatives = [(q, None) for m in labeled["unseen"] for q in m["queries"]] + near_misses
+    correct, misses, false_hits = 0, [], []
+    for query, expected in lookups + negatives:
+        hit = cache.lookup(query)
+        if hit and hit["title"] == expected:
+            correct += 1
+        elif hit:
+            false_hits.append({"query": query, "expected": expected, "got": hit["title"], "similarity": hit["similarity"]})
+        elif expected:
+            misses.append(query)
+
+    total = len(lookups) + len(negatives)
+    return {
+        "threshold": threshold,
+        "embedder": cache.embedder.name,
+        "positives": len(lookups),
+        "negatives": len(negatives),
+        "near_misses": len(near_misses),
+        "recall": round(correct / len(lookups), 3) if lookups else 0.0,
+        "false_hit_rate": round(len(false_hits) / total, 3) if total else 0.0,
+        "misses": misses,
+        "false_hits": false_hits,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Semantic cache recall / false-hit evaluation")
+    parser.add_argument("--thresholds", type=float, nargs="+",
+                        default=[0.5, 0.6, 0.7, 0.8, 0.82, 0.85, 0.9], help="Similarity thresholds to sweep")
+    parser.add_argument("--model", default="", help="sentence-transformers model (default: hashed n-grams)")
+    parser.add_argument("--labeled", default=FIXTURE, help="Labeled set (JSON)")
+    parser.add_argument("--verbose", action="store_true", help="List the misses and false hits")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    labeled = load_labeled_set(args.labeled)
+    embedder = make_embedder(args.model)
+    print(f"{'threshold':>9}  {'recall':>6}  {'false hits':>10}   ({embedder.name})")
+    for threshold in args.thresholds:
+        report = evaluate(threshold, embedder, labeled)
+        print(f"{threshold:>9.2f}  {report['recall']:>6.3f}  {report['false_hit_rate']:>10.3f}")
+        if args.verbose:
+            for query in report["misses"]:
+                print(f"    miss: {query}")
+            for hit in report["false_hits"]:
+                print(f"    false hit: {hit['query']} -> {hit['got']} ({hit['similarity']})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+"""
+Offline replay of Groq, OMDb, YouTube and DuckDuckGo from recorded fixtures.
+
+`offline_pipeline(...)` swaps the network edges of the pipeline for fakes
+while keeping everything in between real (agents, executor scheduling,
+caches, rate-limit scheduler, HTTP retry logic):
+
+- Groq: the `client` of the shared GroqClient / AsyncGroqClient is replaced
+  by a fake that answers from the fixture scenarios.
+- OMDb / YouTube: served by an httpx.MockTransport through set_transport().
+- DuckDuckGo: tools.movie_tools._ddgs_text is patched.
+
+Every fake sleeps for a configurable latency and can inject errors.
+"""
+import asyncio
+import contextlib
+import json
+import os
+import random
+import re
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+from llm import groq_client
+from llm.groq_client import CompletionCache
+from llm.rate_limiter import RequestScheduler
+from llm.tokens import count_tokens
+from tools import http_client
+from tools import movie_tools
+from tools.movie_index import MovieIndex
+from tools.semantic_cache import SemanticCache
+from utils import cache as cache_module
+from utils.cache import TTLCache, SWRCache
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "pipeline.json")
+
+
+def load_fixtures(path=FIXTURES):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _key(text):
+    return re.sub(r"[^a-z0-9 ]", "", re.sub(r"\s+", " ", text.lower())).strip()
+
+
+class Latency:
+    """
+    Latency (ms, uniform jitter of +/-25%) and error rate for one backend.
+    ms_per_1k_tokens adds time proportional to the prompt size (LLM prefill).
+    """
+    def __init__(self, ms=0.0, error_rate=0.0, seed=None, ms_per_1k_tokens=0.0):
+        self.ms = ms
+        self.error_rate = error_rate
+        self.ms_per_1k_tokens = ms_per_1k_tokens
+        self.random = random.Random(seed)
+
+    def delay(self, tokens=0):
+        return (self.ms + self.ms_per_1k_tokens * tokens / 1000.0) * self.random.uniform(0.75, 1.25) / 1000.0
+
+    def fails(self):
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+
+class FixtureWorld:
+    """Answers every backend call from the fixture file."""
+    def __init__(self, fixtures):
+        self.scenarios = sorted(fixtures["scenarios"], key=lambda s: len(s["query"]), reverse=True)
+        self.omdb = {k.lower(): v for k, v in fixtures.get("omdb", {}).items()}
+        self.youtube = {k.lower(): v for k, v in fixtures.get("youtube", {}).items()}
+        self.ddgs = fixtures.get("ddgs", [])
+
+    def scenario_for(self, text):
+        text = _key(text)
+        for scenario in self.scenarios:
+            if _key(scenario["query"]) in text:
+                return scenario
+        return None
+
+    def scenario_for_search(self, query):
+        """The scenario whose plan searched for `query` (get_movie_title_from_search)."""
+        for scenario in self.scenarios:
+            steps = scenario.get("plan", {}).get("steps", [])
+            if any(s["tool"] == "get_movie_title_from_search" and _key(s["args"]) == _key(query) for s in steps):
+                return scenario
+        return self.scenario_for(query)
+
+    # --- Groq ---
+    def llm_answer(self, prompt):
+        scenario = self.scenario_for(prompt)
+        if "You are an AI Planner Agent" in prompt:
+            query = prompt.split("<<<")[-1].split(">>>")[0].strip()
+            scenario = self.scenario_for(query)
+            if scenario and "plan" in scenario:
+                return json.dumps(scenario["plan"])
+            return json.dumps({"steps": [{"step_id": 1, "tool": "get_movie_title_from_search", "args": query}]})
+        if "Identify the specific movie title" in prompt:
+            match = re.search(r'Search Query: "(.*)"', prompt)
+            scenario = self.scenario_for_search(match.group(1)) if match else None
+            return scenario["search_title"] if scenario and "search_title" in scenario else "Unknown Movie"
+        if scenario:
+            return scenario["answer"]
+        return "I'm sorry, I couldn't find that movie."
+
+    # --- OMDb / YouTube ---
+    def http_answer(self, request):
+        params = request.url.params
+        if "omdbapi" in request.url.host:
+            if "t" in params:
+                return self.omdb.get(params["t"].lower(), {"Response": "False", "Error": "Movie not found!"})
+            title = params.get("s", "").lower()
+            matches = [{"Title": v["Title"], "Year": v["Year"]} for k, v in self.omdb.items() if title and title in k]
+            return {"Response": "True", "Search": matches} if matches else {"Response": "False", "Error": "Movie not found!"}
+        if "googleapis" in request.url.host:
+            title = params.get("q", "").lower().replace(" official trailer", "")
+            return self.youtube.get(title, {"items": []})
+        return {}
+
+    # --- DuckDuckGo ---
+    def ddgs_answer(self, query):
+        lowered = query.lower()
+        if lowered.startswith("where to watch"):
+            title = query[len("where to watch "):].replace(" streaming", "")
+            return [{"title": f"Watch {title} | {site}", "href": f"https://{site.lower()}.example/{_key(title).replace(' ', '-')}",
+                     "body": f"Stream {title} on {site}."} for site in ("JustWatch", "Netflix", "Prime")]
+        for entry in self.ddgs:
+            if entry["match"].lower() in lowered:
+                return entry["results"]
+        return []
+
+
+def _completion(text, prompt):
+    prompt_tokens, completion_tokens = count_tokens(prompt), max(1, count_tokens(text))
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+                           usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                                 total_tokens=prompt_tokens + completion_tokens))
+
+
+class _FakeCompletions:
+    def __init__(self, world, latency, is_async):
+        self.world, self.latency, self.is_async = world, latency, is_async
+
+    def _answer(self, request):
+        if self.latency.fails():
+            raise RuntimeError("Error code: 503 - injected Groq failure")
+        prompt = request["messages"][-1]["content"]
+        return _completion(self.world.llm_answer(prompt), prompt)
+
+    def _delay(self, request):
+        return self.latency.delay(count_tokens(request["messages"][-1]["content"]))
+
+    def create(self, **request):
+        if self.is_async:
+            return self._create_async(request)
+        time.sleep(self._delay(request))
+        return self._answer(request)
+
+    async def _create_async(self, request):
+        await asyncio.sleep(self._delay(request))
+        return self._answer(request)
+
+
+class FakeGroq:
+    """Stands in for groq.Groq / groq.AsyncGroq."""
+    def __init__(self, world, latency, is_async=False):
+        self.chat = SimpleNamespace(completions=_FakeCompletions(world, latency, is_async))
+
+
+def _http_transports(world, latency):
+    def respond(request):
+        if latency.fails():
+            return httpx.Response(503)
+        return httpx.Response(200, json=world.http_answer(request))
+
+    def handler(request):
+        time.sleep(latency.delay())
+        return respond(request)
+
+    async def async_handler(request):
+        await asyncio.sleep(latency.delay())
+        return respond(request)
+
+    return httpx.MockTransport(handler), httpx.MockTransport(async_handler)
+
+
+@contextlib.contextmanager
+def offline_pipeline(fixtures=None, llm=None, http=None, ddgs=None, warm_caches=False, rate_limit=False):
+    """
+    Runs the block against the fixture world instead of the network.
+
+    llm / http / ddgs are Latency objects. Caches and the local movie index
+    start empty and memory-only unless warm_caches=True; the Groq rate
+    limiter is disabled unless rate_limit=True.
+    """
+    world = FixtureWorld(fixtures or load_fixtures())
+    llm, http, ddgs = llm or Latency(), http or Latency(), ddgs or Latency()
+
+    def fake_ddgs(query, max_results=3):
+        time.sleep(ddgs.delay())
+        if ddgs.fails():
+            raise RuntimeError("DDGS injected failure")
+        return world.ddgs_answer(query)[:max_results]
+
+    sync_client = groq_client.llm_client.client
+    async_client = groq_client.async_llm_client.client
+    groq_client.llm_client.client = FakeGroq(world, llm)
+    groq_client.async_llm_client.client = FakeGroq(world, llm, is_async=True)
+    transport, async_transport = _http_transports(world, http)
+    http_client.set_transport(transport, async_transport)
+
+    patches = [
+        patch.object(movie_tools, "_ddgs_text", fake_ddgs),
+        patch.object(movie_tools, "OMDB_API_KEY", movie_tools.OMDB_API_KEY or "offline"),
+        patch.object(movie_tools, "YOUTUBE_API_KEY", movie_tools.YOUTUBE_API_KEY or "offline"),
+    ]
+    if not warm_caches:
+        patches += [
+            patch.object(cache_module, "search_cache", TTLCache("search", db_path=None)),
+            patch.object(movie_tools, "details_cache", SWRCache("omdb", 3600, 3600, db_path=None)),
+            patch.object(movie_tools, "trailer_cache", SWRCache("trailer", 3600, 3600, db_path=None)),
+            patch.object(movie_tools, "streaming_cache", SWRCache("streaming", 3600, 3600, db_path=None)),
+            patch.object(movie_tools, "movie_index", MovieIndex(db_path=None)),
+            patch.object(movie_tools, "semantic_cache", SemanticCache(path="")),
+            patch.object(groq_client, "completion_cache", CompletionCache(db_path=None)),
+        ]
+    if not rate_limit:
+        patches.append(patch.object(groq_client, "scheduler", RequestScheduler(rpm=10 ** 7, tpm=10 ** 10)))
+
+    with contextlib.ExitStack() as stack:
+        for p in patches:
+            stack.enter_context(p)
+        try:
+            yield world
+        finally:
+            groq_client.llm_client.client = sync_client
+            groq_client.async_llm_client.client = async_client
+            http_client.set_transport()
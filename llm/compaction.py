@@ -0,0 +1,71 @@
+"""
+Prompt compaction: keeps the variable parts of planner and verifier prompts
+small.
+
+- trim_history: the most recent conversation lines that fit a token budget
+- compact: tool outputs as short "key: value" text instead of Python reprs,
+  with empty / "N/A" fields dropped and long strings cut
+
+The agents use it with PROMPT_COMPACTION=1. It is off by default until
+`python -m benchmarks.bench_prompts --live` shows the real model making the
+same plans from both prompts; the offline run only checks the prompts are
+built, since its stand-in model ignores them.
+"""
+import os
+
+from llm.tokens import count_tokens
+
+PROMPT_COMPACTION = os.getenv("PROMPT_COMPACTION", "0") == "1"
+HISTORY_TOKEN_BUDGET = int(os.getenv("PLANNER_HISTORY_TOKENS", 300))
+HISTORY_LINE_TOKENS = 60  # Enough for a title and the gist of an earlier answer
+TOOL_OUTPUT_TOKENS = int(os.getenv("VERIFIER_TOOL_OUTPUT_TOKENS", 160))
+
+EMPTY_VALUES = (None, "", "N/A", [], {})
+
+
+def truncate(text, max_tokens):
+    """`text` cut to about `max_tokens` tokens, on a word boundary."""
+    text = str(text)
+    if count_tokens(text) <= max_tokens:
+        return text
+    words, kept = text.split(), []
+    for word in words:
+        kept.append(word)
+        if count_tokens(" ".join(kept)) > max_tokens:
+            kept.pop()
+            break
+    return " ".join(kept) + " ..."
+
+
+def trim_history(chat_history, budget=HISTORY_TOKEN_BUDGET, current_request=None):
+    """
+    The newest lines of `chat_history` that fit in `budget` tokens, oldest
+    first. A trailing line that only repeats `current_request` is dropped
+    (the prompt states the request separately), and lines longer than
+    HISTORY_LINE_TOKENS (usually long answers) are cut.
+    """
+    lines = [line.strip() for line in (chat_history or "").splitlines() if line.strip()]
+    if lines and current_request and lines[-1].split(":", 1)[-1].strip() == current_request.strip():
+        lines.pop()
+
+    kept, used = [], 0
+    for line in reversed(lines):
+        line = truncate(line, min(HISTORY_LINE_TOKENS, budget))
+        cost = count_tokens(line)
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(reversed(kept))
+
+
+def compact(value, max_tokens=TOOL_OUTPUT_TOKENS):
+    """One tool output as compact text: dicts as 'key: value; ...', lists one item per line."""
+    if isinstance(value, dict):
+        text = "; ".join(f"{key}: {item}" for key, item in value.items() if item not in EMPTY_VALUES)
+    elif isinstance(value, (list, tuple)):
+        per_item = max(16, max_tokens // max(1, len(value)))
+        return "\n".join(f"- {compact(item, per_item)}" for item in value)
+    else:
+        text = str(value)
+    return truncate(text, max_tokens)
@@ -1,64 +1,407 @@
 import os
 import time
-from groq import Groq
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-class GroqClient:
-    def __init__(self, model_name: str = "llama-3.3-70b-versatile"):
-        self.api_key = os.getenv("GROQ_API_KEY")
-        if not self.api_key:
-            raise RuntimeError("GROQ_API_KEY not found in environment variables")
-        
-        self.client = Groq(api_key=self.api_key)
+import json
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterator, Optional
+
+from logger import get_logger
+from utils.cache import TTLCache
+from utils.tracing import span
+from utils.metrics import LLM_LATENCY, LLM_REQUESTS, LLM_TOKENS
+from llm.rate_limiter import scheduler, estimate_tokens, parse_retry_after, PRIORITY_DEFAULT
+from llm.tokens import token_ledger, count_tokens, usage_tokens
+from llm.routing import model_router, LARGE_MODEL
+
+logger = get_logger("LLM")
+
+DEFAULT_MODEL = LARGE_MODEL  # Per prompt type, the model comes from llm/routing.py
+DEFAULT_TEMPERATURE = 0.2
+MAX_RETRIES = 3
+INITIAL_WAIT = 2  # Fallback pause (seconds) when a 429 carries no retry-after hint
+OUTPUT_TOKEN_ESTIMATE = 256  # Reserved per call for the completion, reconciled with real usage afterwards
+
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL_SECONDS", 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1024))
+
+
+class CompletionCache:
+    """
+    Content-addressed cache of completions, keyed on model, prompt hash and
+    sampling parameters. Stored in a TTLCache, so it is bounded in memory and
+    persisted to SQLite. Tracks hit rate plus the tokens and latency saved.
+    """
+    def __init__(self, ttl: int = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES, **kwargs):
+        self.store = TTLCache("llm", ttl=ttl, max_entries=max_entries, **kwargs)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "tokens_saved": 0, "latency_saved_s": 0.0}
+
+    @staticmethod
+    def make_key(request: dict) -> str:
+        prompt_hash = hashlib.sha256(json.dumps(request["messages"], sort_keys=True).encode("utf-8")).hexdigest()
+        params = {k: v for k, v in request.items() if k not in ("messages", "model")}
+        return f"{request['model']}:{prompt_hash}:{json.dumps(params, sort_keys=True)}"
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.store.get(key)
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["tokens_saved"] += entry["tokens"]
+            self._stats["latency_saved_s"] += entry["latency_s"]
+        return entry["text"]
+
+    def put(self, key: str, text: str, tokens: int, latency: float):
+        self.store.set(key, {"text": text, "tokens": tokens, "latency_s": round(latency, 3)})
+
+    def discard(self, key: str):
+        self.store.delete(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["latency_saved_s"] = round(stats["latency_saved_s"], 3)
+        stats["entries"] = self.store.stats()["entries"]
+        return stats
+
+
+# Shared by the sync and async clients
+completion_cache = CompletionCache()
+
+
+def get_completion_cache_stats() -> dict:
+    return completion_cache.stats()
+
+
+def _build_request(prompt: str, model_name: str, temperature: float = DEFAULT_TEMPERATURE) -> dict:
+    return {
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ],
+        "model": model_name,
+        "temperature": temperature,
+    }
+
+
+def _read_response(chat_completion) -> str:
+    response_text = chat_completion.choices[0].message.content
+    if not response_text:
+        raise ValueError("Empty response from Groq")
+    return response_text
+
+
+def _total_tokens(chat_completion) -> int:
+    usage = getattr(chat_completion, "usage", None)
+    return getattr(usage, "total_tokens", 0) or 0
+
+
+def _usage(chat_completion):
+    """(prompt_tokens, completion_tokens) Groq reported for the call."""
+    return usage_tokens(getattr(chat_completion, "usage", None))
+
+
+def _stream_usage(chunk):
+    # Groq reports usage on the last streamed chunk under `x_groq`
+    return getattr(getattr(chunk, "x_groq", None), "usage", None)
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    error_msg = str(error)
+    return "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg
+
+
+def _handle_error(error: Exception, wait_time: float):
+    """
+    On a Rate Limit error (429), pauses the shared scheduler so the caller can
+    queue again. Anything else is a real crash (not just traffic): stop immediately.
+    """
+    rate_limited = _is_rate_limit(error)
+    LLM_REQUESTS.inc(outcome="rate_limited" if rate_limited else "error")
+    if not rate_limited:
+        raise RuntimeError(f"Groq generation failed: {error}")
+    pause = parse_retry_after(error) or wait_time
+    logger.warning("Groq Rate Limit Hit. Pausing all calls for %ss...", pause)
+    scheduler.penalize(pause)
+
+
+def _record_call(model_name: str, latency: float, tokens: int):
+    LLM_REQUESTS.inc(outcome="ok")
+    LLM_LATENCY.observe(latency, model=model_name)
+    LLM_TOKENS.inc(tokens, model=model_name)
+
+
+def _passes(validate: Callable[[str], object], text: str) -> bool:
+    try:
+        return bool(validate(text))
+    except Exception:
+        return False
+
+
+def _cacheable(validate: Optional[Callable[[str], object]], text: str) -> bool:
+    """Only answers that pass the caller's check are cached; an invalid one would be served for LLM_CACHE_TTL."""
+    return validate is None or _passes(validate, text)
+
+
+def _should_escalate(text: str, model: str, validate, prompt_name: str) -> bool:
+    """True if `text` from a smaller model fails `validate` (it was not cached, see _cacheable)."""
+    if validate is None or not model_router.can_escalate(model) or _passes(validate, text):
+        return False
+    logger.info("Escalating '%s' from %s to %s", prompt_name, model, model_router.large_model)
+    return True
+
+
+def _get_api_key() -> str:
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY not found in environment variables")
+    return api_key
+
+
+class _LazySDKClient(ABC):
+    """
+    Builds the Groq SDK client on first use: importing `groq` (pydantic,
+    httpx, ...) costs a few hundred ms, which should not be paid just by
+    importing the agents. Assigning `client` (tests, offline replay) skips it.
+    `model_name` pins every call to one model instead of routing per prompt type.
+    """
+    def __init__(self, model_name: Optional[str] = None):
+        self.api_key = _get_api_key()
         self.model_name = model_name
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @abstractmethod
+    def _build_client(self):
+        """The SDK client (Groq or AsyncGroq); called once, on first use."""
+
+    def _model_for(self, prompt_name: str) -> str:
+        return self.model_name or model_router.model_for(prompt_name)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+
+class GroqClient(_LazySDKClient):
+    def _build_client(self):
+        from groq import Groq
+        return Groq(api_key=self.api_key)
+
+    def generate_text(self, prompt: str, use_cache: bool = True, priority: int = PRIORITY_DEFAULT,
+                      prompt_name: str = "other", validate: Optional[Callable[[str], object]] = None) -> str:
+        """
+        Generates text with the model routed for `prompt_name` (see llm/routing.py).
+        Identical requests are answered from the completion cache unless use_cache=False;
+        an answer that fails `validate` is never cached.
+        Every call waits for a slot from the shared rate-limit scheduler (lower
+        priority value = served first). On '429 Resource Exhausted' the scheduler
+        is paused for the retry-after hint and the call queues again.
+        Tokens are accounted under `prompt_name` (see llm/tokens.py).
+        If a small model's answer fails `validate` (False or an exception), the
+        call is repeated on the large model.
+        """
+        model = self._model_for(prompt_name)
+        started = time.perf_counter()
+        text = self._generate(prompt, model, use_cache, priority, prompt_name, validate)
+        escalated = _should_escalate(text, model, validate, prompt_name)
+        if escalated:
+            text = self._generate(prompt, model_router.large_model, use_cache, priority, prompt_name, validate)
+        model_router.record_call(prompt_name, time.perf_counter() - started, escalated)
+        return text
+
+    def _generate(self, prompt: str, model: str, use_cache: bool, priority: int, prompt_name: str,
+                  validate: Optional[Callable[[str], object]] = None) -> str:
+        request = _build_request(prompt, model)
+        with span("llm.generate", model=model, priority=priority, prompt=prompt_name) as llm_span:
+            cache_key = CompletionCache.make_key(request) if use_cache else None
+            if cache_key:
+                cached = completion_cache.get(cache_key)
+                if cached is not None and not _cacheable(validate, cached):
+                    # Cached without this check (e.g. by stream_text): drop it and ask again
+                    completion_cache.discard(cache_key)
+                    cached = None
+                llm_span.set("cache", "miss" if cached is None else "hit")
+                if cached is not None:
+                    LLM_REQUESTS.inc(outcome="cached")
+                    token_ledger.record(prompt_name, count_tokens(prompt), cached=True)
+                    model_router.record_model(prompt_name, model, cached=True)
+                    return cached
 
-    def generate_text(self, prompt: str) -> str:
+            estimated_tokens = estimate_tokens(prompt) + OUTPUT_TOKEN_ESTIMATE
+            wait_time = INITIAL_WAIT
+
+            for attempt in range(MAX_RETRIES):
+                llm_span.set("retries", attempt)
+                scheduler.acquire(estimated_tokens, priority)
+                try:
+                    # Call the API
+                    started = time.perf_counter()
+                    chat_completion = self.client.chat.completions.create(**request)
+                    scheduler.record_usage(estimated_tokens, _total_tokens(chat_completion))
+                    llm_span.set("tokens", _total_tokens(chat_completion))
+                    response_text = _read_response(chat_completion)
+                    _record_call(model, time.perf_counter() - started, _total_tokens(chat_completion))
+                    token_ledger.record(prompt_name, count_tokens(prompt), *_usage(chat_completion))
+                    model_router.record_model(prompt_name, model, time.perf_counter() - started, *_usage(chat_completion))
+                    if cache_key and _cacheable(validate, response_text):
+                        completion_cache.put(cache_key, response_text, _total_tokens(chat_completion),
+                                             time.perf_counter() - started)
+                    return response_text
+
+                except Exception as e:
+                    _handle_error(e, wait_time)
+                    wait_time *= 2
+
+            raise RuntimeError("Max retries exceeded. The API is too busy right now.")
+
+    def stream_text(self, prompt: str, use_cache: bool = True, priority: int = PRIORITY_DEFAULT,
+                    prompt_name: str = "other") -> Iterator[str]:
         """
-        Generates text using Llama 3.3 Versatile.
-        Includes aggressive retry logic to handle '429 Resource Exhausted' errors.
+        Streams the completion, yielding text chunks as Groq generates them.
+        Same cache, scheduling and 429 policy as generate_text; retries only
+        happen before the first chunk. A cached answer is yielded in one piece.
         """
-        max_retries = 3
-        wait_time = 2  # Initial wait time in seconds
-
-        for attempt in range(max_retries):
-            try:
-                # Call the API
-                chat_completion = self.client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": prompt,
-                        }
-                    ],
-                    model=self.model_name,
-                    temperature = 0.2
-                )
-                response_text = chat_completion.choices[0].message.content
-                
-                if not response_text:
-                    raise ValueError("Empty response from Groq")
-
-                return response_text
-
-            except Exception as e:
-                error_msg = str(e)
-                # Check if it's a Rate Limit error (429)
-                if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                    print(f"\nGroq Rate Limit Hit. Waiting {wait_time}s...")
-                    time.sleep(wait_time)
-                    wait_time *= 2 
-                else:
-                    # If it's a real crash (not just traffic), stop immediately
-                    raise RuntimeError(f"Groq generation failed: {e}")
-        
-        raise RuntimeError("Max retries exceeded. The API is too busy right now.")
-
-# Singleton instance
+        model = self._model_for(prompt_name)
+        request = _build_request(prompt, model)
+        with span("llm.stream", model=model, priority=priority, prompt=prompt_name) as llm_span:
+            cache_key = CompletionCache.make_key(request) if use_cache else None
+            if cache_key:
+                cached = completion_cache.get(cache_key)
+                llm_span.set("cache", "miss" if cached is None else "hit")
+                if cached is not None:
+                    LLM_REQUESTS.inc(outcome="cached")
+                    token_ledger.record(prompt_name, count_tokens(prompt), cached=True)
+                    model_router.record_model(prompt_name, model, cached=True)
+                    model_router.record_call(prompt_name, 0.0)
+                    yield cached
+                    return
+
+            estimated_tokens = estimate_tokens(prompt) + OUTPUT_TOKEN_ESTIMATE
+            wait_time = INITIAL_WAIT
+
+            for attempt in range(MAX_RETRIES):
+                llm_span.set("retries", attempt)
+                scheduler.acquire(estimated_tokens, priority)
+                try:
+                    started = time.perf_counter()
+                    stream = self.client.chat.completions.create(**request, stream=True)
+                    break
+                except Exception as e:
+                    _handle_error(e, wait_time)
+                    wait_time *= 2
+            else:
+                raise RuntimeError("Max retries exceeded. The API is too busy right now.")
+
+            parts, usage = [], None
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+                usage = _stream_usage(chunk) or usage
+            total_tokens = getattr(usage, "total_tokens", 0) or 0
+
+            response_text = "".join(parts)
+            if not response_text:
+                raise ValueError("Empty response from Groq")
+            scheduler.record_usage(estimated_tokens, total_tokens)
+            llm_span.set("tokens", total_tokens)
+            _record_call(model, time.perf_counter() - started, total_tokens)
+            token_ledger.record(prompt_name, count_tokens(prompt), *usage_tokens(usage))
+            model_router.record_model(prompt_name, model, time.perf_counter() - started, *usage_tokens(usage))
+            model_router.record_call(prompt_name, time.perf_counter() - started)
+            if cache_key:
+                completion_cache.put(cache_key, response_text, total_tokens, time.perf_counter() - started)
+
+
+class AsyncGroqClient(_LazySDKClient):
+    """
+    Async twin of GroqClient. Waiting on Groq (or on a rate-limit backoff)
+    yields to the event loop instead of blocking a thread, so one loop can
+    serve many conversations at once.
+    """
+    def _build_client(self):
+        from groq import AsyncGroq
+        return AsyncGroq(api_key=self.api_key)
+
+    async def generate_text(self, prompt: str, use_cache: bool = True, priority: int = PRIORITY_DEFAULT,
+                            prompt_name: str = "other", validate: Optional[Callable[[str], object]] = None) -> str:
+        """Same contract, routing, cache, scheduling and retry policy as GroqClient.generate_text."""
+        model = self._model_for(prompt_name)
+        started = time.perf_counter()
+        text = await self._generate(prompt, model, use_cache, priority, prompt_name, validate)
+        escalated = _should_escalate(text, model, validate, prompt_name)
+        if escalated:
+            text = await self._generate(prompt, model_router.large_model, use_cache, priority, prompt_name, validate)
+        model_router.record_call(prompt_name, time.perf_counter() - started, escalated)
+        return text
+
+    async def _generate(self, prompt: str, model: str, use_cache: bool, priority: int, prompt_name: str,
+                        validate: Optional[Callable[[str], object]] = None) -> str:
+        request = _build_request(prompt, model)
+        with span("llm.generate", model=model, priority=priority, prompt=prompt_name) as llm_span:
+            cache_key = CompletionCache.make_key(request) if use_cache else None
+            if cache_key:
+                cached = completion_cache.get(cache_key)
+                if cached is not None and not _cacheable(validate, cached):
+                    # Cached without this check (e.g. by stream_text): drop it and ask again
+                    completion_cache.discard(cache_key)
+                    cached = None
+                llm_span.set("cache", "miss" if cached is None else "hit")
+                if cached is not None:
+                    LLM_REQUESTS.inc(outcome="cached")
+                    token_ledger.record(prompt_name, count_tokens(prompt), cached=True)
+                    model_router.record_model(prompt_name, model, cached=True)
+                    return cached
+
+            estimated_tokens = estimate_tokens(prompt) + OUTPUT_TOKEN_ESTIMATE
+            wait_time = INITIAL_WAIT
+
+            for attempt in range(MAX_RETRIES):
+                llm_span.set("retries", attempt)
+                await scheduler.acquire_async(estimated_tokens, priority)
+                try:
+                    started = time.perf_counter()
+                    chat_completion = await self.client.chat.completions.create(**request)
+                    scheduler.record_usage(estimated_tokens, _total_tokens(chat_completion))
+                    llm_span.set("tokens", _total_tokens(chat_completion))
+                    response_text = _read_response(chat_completion)
+                    _record_call(model, time.perf_counter() - started, _total_tokens(chat_completion))
+                    token_ledger.record(prompt_name, count_tokens(prompt), *_usage(chat_completion))
+                    model_router.record_model(prompt_name, model, time.perf_counter() - started, *_usage(chat_completion))
+                    if cache_key and _cacheable(validate, response_text):
+                        completion_cache.put(cache_key, response_text, _total_tokens(chat_completion),
+                                             time.perf_counter() - started)
+                    return response_text
+
+                except Exception as e:
+                    _handle_error(e, wait_time)
+                    wait_time *= 2
+
+            raise RuntimeError("Max retries exceeded. The API is too busy right now.")
+
+# Singleton instances (cheap: the SDK clients are built on first use).
+# GROQ_API_KEY must be in the environment by now; entry points load .env first.
 try:
     llm_client = GroqClient()
+    async_llm_client = AsyncGroqClient()
 except Exception as e:
-    print(f"Warning: Failed to initialize LLM Client. {e}")
-    llm_client = None
\ No newline at end of file
+    logger.warning("Failed to initialize LLM Client. %s", e)
+    llm_client = None
+    async_llm_client = None
@@ -0,0 +1,214 @@
+"""
+Client-side rate limiting for Groq.
+
+Every LLM call first asks the shared RequestScheduler for a slot. The scheduler
+holds two token buckets (requests per minute and tokens per minute) and a
+priority queue of waiting callers; a single dispatcher thread hands out slots
+in priority order as the buckets refill. Threads and coroutines wait in the
+same queue. When Groq still answers 429, its retry-after hint pauses the whole
+scheduler, so callers do not each back off and then retry all at once.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+
+GROQ_RPM = int(os.getenv("GROQ_RPM", 30))
+GROQ_TPM = int(os.getenv("GROQ_TPM", 12000))
+
+PRIORITY_INTERACTIVE = 0  # A user is watching (e.g. the verifier's answer)
+PRIORITY_DEFAULT = 1
+PRIORITY_BACKGROUND = 2   # Batch jobs, cache warmers
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        """Gives back (positive) or charges (negative) tokens after the fact."""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class _Waiter:
+    __slots__ = ("tokens", "grant", "cancelled")
+
+    def __init__(self, tokens, grant):
+        self.tokens = tokens
+        self.grant = grant
+        self.cancelled = False
+
+
+class RequestScheduler:
+    def __init__(self, rpm=GROQ_RPM, tpm=GROQ_TPM, burst=None):
+        self.requests = TokenBucket(rpm, capacity=burst)
+        self.tokens = TokenBucket(tpm)
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority, seq, waiter)
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._dispatcher = None
+        self._stats = {"granted": 0, "rate_limited": 0, "wait_total_s": 0.0, "paused_total_s": 0.0}
+
+    # --- Dispatcher ---
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, name="groq-scheduler", daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch(self):
+        with self._cond:
+            while True:
+                while self._queue and self._queue[0][2].cancelled:
+                    heapq.heappop(self._queue)
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+
+                waiter = self._queue[0][2]
+                now = time.monotonic()
+                delay = max(self._paused_until - now,
+                            self.requests.wait_time(1, now),
+                            self.tokens.wait_time(waiter.tokens, now))
+                if delay > 0:
+                    # Woken early if a higher-priority caller arrives or the pause changes
+                    self._cond.wait(timeout=delay)
+                    continue
+
+                heapq.heappop(self._queue)
+                self.requests.take(1)
+                self.tokens.take(waiter.tokens)
+                self._stats["granted"] += 1
+                waiter.grant()
+
+    def _enqueue(self, tokens, priority, grant):
+        waiter = _Waiter(tokens, grant)
+        with self._cond:
+            self._ensure_dispatcher()
+            heapq.heappush(self._queue, (priority, next(self._seq), waiter))
+            self._cond.notify()
+        return waiter
+
+    # --- Public API ---
+    def acquire(self, tokens, priority=PRIORITY_DEFAULT):
+        """Blocks the calling thread until a request slot and `tokens` are available."""
+        started = time.monotonic()
+        granted = threading.Event()
+        self._enqueue(tokens, priority, granted.set)
+        granted.wait()
+        self._add_wait(time.monotonic() - started)
+
+    async def acquire_async(self, tokens, priority=PRIORITY_DEFAULT):
+        """Async version of acquire; waits without blocking the event loop."""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        waiter = self._enqueue(tokens, priority, grant)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            waiter.cancelled = True
+            raise
+        self._add_wait(time.monotonic() - started)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Reconciles the token bucket with the usage Groq actually reported."""
+        if actual_tokens:
+            with self._cond:
+                self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def penalize(self, retry_after):
+        """Called on a 429: pause every caller for `retry_after` seconds."""
+        with self._cond:
+            self._stats["rate_limited"] += 1
+            self._stats["paused_total_s"] += retry_after
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self.requests.drain()
+            self._cond.notify()
+
+    def configure(self, rpm=None, tpm=None):
+        """Changes the limits in place, e.g. so a batch job leaves headroom for interactive users."""
+        with self._cond:
+            if rpm:
+                self.requests = TokenBucket(rpm)
+            if tpm:
+                self.tokens = TokenBucket(tpm)
+            self._cond.notify()
+
+    def _add_wait(self, seconds):
+        with self._cond:
+            self._stats["wait_total_s"] += seconds
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = sum(1 for _, _, w in self._queue if not w.cancelled)
+            stats["paused_for_s"] = round(max(0.0, self._paused_until - time.monotonic()), 3)
+        stats["wait_total_s"] = round(stats["wait_total_s"], 3)
+        return stats
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used before Groq reports usage."""
+    return max(1, len(text) // 4)
+
+
+def parse_retry_after(error):
+    """
+    Extracts a retry-after hint (seconds) from a Groq rate-limit error, or None.
+    Understands 'retry-after: 2' as well as the '1m3.5s' style reset headers.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        value = headers.get(name)
+        if not value:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+        seconds = sum(float(number) * units[unit] for number, unit in _DURATION_PART.findall(value))
+        if seconds:
+            return seconds
+    return None
+
+
+# Shared by every GroqClient / AsyncGroqClient in the process
+scheduler = RequestScheduler()
+
+
+def get_scheduler_stats():
+    return scheduler.stats()
@@ -0,0 +1,115 @@
+"""
+Which Groq model answers which prompt type.
+
+Planning and title extraction are short structured tasks that a small
+model answers several times faster, using less of the rate limit. The
+verifier writes the answer the user reads and stays on the large model.
+The policy is LLM_ROUTES, "prompt_name=model" pairs where model is
+`small`, `large` or a Groq model id:
+
+    LLM_ROUTES=planner=small,title=small      # default
+    LLM_ROUTES=                               # everything on the large model
+
+Prompt types without a route use the large model. When a caller passes a
+`validate` check (the planner passes validate_plan, title extraction a
+one-line title check) and the small model's output fails it, the call is
+repeated on the large model: an escalation.
+
+Calls, escalations, latency and tokens per route are in get_routing_stats().
+"""
+import os
+import threading
+
+from utils.metrics import LLM_ESCALATIONS
+
+LARGE_MODEL = os.getenv("GROQ_LARGE_MODEL", "llama-3.3-70b-versatile")
+SMALL_MODEL = os.getenv("GROQ_SMALL_MODEL", "llama-3.1-8b-instant")
+LLM_ROUTES = os.getenv("LLM_ROUTES", "planner=small,title=small")
+
+_ALIASES = {"small": SMALL_MODEL, "large": LARGE_MODEL}
+
+
+def parse_routes(spec):
+    """{prompt_name: model id} from "planner=small,title=llama-3.1-8b-instant"."""
+    routes = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, model = entry.partition("=")
+        model = model.strip()
+        routes[name.strip()] = _ALIASES.get(model.lower(), model)
+    return routes
+
+
+class ModelRouter:
+    def __init__(self, routes=None, large_model=LARGE_MODEL):
+        self.routes = parse_routes(LLM_ROUTES) if routes is None else dict(routes)
+        self.large_model = large_model
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def model_for(self, prompt_name):
+        return self.routes.get(prompt_name, self.large_model)
+
+    def can_escalate(self, model):
+        return model != self.large_model
+
+    # --- Stats ---
+    def _route(self, prompt_name):
+        stats = self._stats.get(prompt_name)
+        if stats is None:
+            stats = self._stats.setdefault(prompt_name, {"calls": 0, "escalations": 0, "latency_total_s": 0.0,
+                                                         "models": {}})
+        return stats
+
+    def record_model(self, prompt_name, model, latency=0.0, prompt_tokens=0, completion_tokens=0, cached=False):
+        """One completion from `model` (an API call, or a cache hit) for this route."""
+        with self._lock:
+            models = self._route(prompt_name)["models"]
+            entry = models.get(model)
+            if entry is None:
+                entry = models.setdefault(model, {"calls": 0, "cached": 0, "latency_total_s": 0.0,
+                                                  "prompt_tokens": 0, "completion_tokens": 0})
+            entry["calls"] += 1
+            entry["cached"] += cached
+            entry["latency_total_s"] += latency
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+
+    def record_call(self, prompt_name, latency, escalated=False):
+        """One routed call end to end, escalation included."""
+        with self._lock:
+            stats = self._route(prompt_name)
+            stats["calls"] += 1
+            stats["latency_total_s"] += latency
+            if escalated:
+                stats["escalations"] += 1
+        if escalated:
+            LLM_ESCALATIONS.inc(route=prompt_name)
+
+    def stats(self):
+        """Per route: its model, call count, escalation rate, average latency and tokens per model."""
+        report = {}
+        with self._lock:
+            for name, stats in self._stats.items():
+                calls = stats["calls"]
+                report[name] = {
+                    "model": self.model_for(name),
+                    "calls": calls,
+                    "escalations": stats["escalations"],
+                    "escalation_rate": round(stats["escalations"] / calls, 4) if calls else 0.0,
+                    "avg_latency_s": round(stats["latency_total_s"] / calls, 4) if calls else 0.0,
+                    "models": {model: {**entry, "latency_total_s": round(entry["latency_total_s"], 4)}
+                               for model, entry in stats["models"].items()},
+                }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# Shared by the sync and async clients
+model_router = ModelRouter()
+
+
+def get_routing_stats():
+    return model_router.stats()
@@ -0,0 +1,107 @@
+"""
+Token accounting per prompt type (planner, verifier, title, ...).
+
+Every Groq call records the prompt and completion tokens Groq reports, next
+to a local estimate made before the call. The estimate uses tiktoken's
+cl100k_base encoding when tiktoken is installed (close to Llama 3's
+tokenizer for English), and a word/punctuation heuristic otherwise. The
+ledger tells how big each prompt type is, what it costs in rate-limit budget
+and how far the local estimate is from the real count.
+"""
+import re
+import threading
+
+from utils.metrics import LLM_PROMPT_TOKENS
+
+_encoding = None  # tiktoken's encoding, loaded by the first count_tokens() call
+_encoding_checked = False
+
+# Words, single punctuation marks, and runs of whitespace containing a newline
+_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]|\s*\n\s*")
+
+
+def _load_encoding():
+    global _encoding, _encoding_checked
+    if not _encoding_checked:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # Not installed, or the encoding could not be loaded offline
+            _encoding = None
+        _encoding_checked = True
+    return _encoding
+
+
+def count_tokens(text):
+    """Local estimate of the tokens in `text`."""
+    if not text:
+        return 0
+    encoding = _encoding if _encoding_checked else _load_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # BPE keeps common words whole and splits long or rare ones: ~1 token per 6 letters
+    return sum(1 + (len(piece) - 1) // 6 if piece[0].isalpha() else 1 for piece in _PIECES.findall(text))
+
+
+def usage_tokens(usage):
+    """(prompt_tokens, completion_tokens) from a Groq usage object (0 when missing)."""
+    counts = []
+    for field in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, field, 0)
+        counts.append(value if isinstance(value, int) else 0)
+    return tuple(counts)
+
+
+class TokenLedger:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prompts = {}
+
+    def _entry(self, name):
+        return self._prompts.setdefault(name, {"calls": 0, "cached": 0, "estimated_prompt_tokens": 0,
+                                               "prompt_tokens": 0, "completion_tokens": 0,
+                                               "reported_calls": 0, "estimated_reported": 0})
+
+    def record(self, name, estimated, prompt_tokens=0, completion_tokens=0, cached=False):
+        """
+        One call of prompt type `name`. `estimated` is the local count; the
+        token counts are what Groq reported (none for cached answers).
+        """
+        with self._lock:
+            entry = self._entry(name)
+            entry["calls"] += 1
+            entry["cached"] += cached
+            entry["estimated_prompt_tokens"] += estimated
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            if prompt_tokens:
+                entry["reported_calls"] += 1
+                entry["estimated_reported"] += estimated
+        if prompt_tokens or completion_tokens:
+            LLM_PROMPT_TOKENS.inc(prompt_tokens, prompt=name, kind="prompt")
+            LLM_PROMPT_TOKENS.inc(completion_tokens, prompt=name, kind="completion")
+
+    def stats(self):
+        """Per prompt type: totals, averages and the local estimate's error against Groq's counts."""
+        with self._lock:
+            prompts = {name: dict(entry) for name, entry in self._prompts.items()}
+        for entry in prompts.values():
+            calls, reported = entry["calls"], entry.pop("reported_calls")
+            estimated_reported = entry.pop("estimated_reported")
+            entry["avg_estimated_prompt_tokens"] = round(entry["estimated_prompt_tokens"] / calls, 1) if calls else 0.0
+            entry["avg_prompt_tokens"] = round(entry["prompt_tokens"] / reported, 1) if reported else None
+            entry["estimate_error"] = (round(estimated_reported / entry["prompt_tokens"] - 1, 3)
+                                       if entry["prompt_tokens"] else None)
+        return prompts
+
+    def reset(self):
+        with self._lock:
+            self._prompts.clear()
+
+
+# Shared by the sync and async Groq clients
+token_ledger = TokenLedger()
+
+
+def get_token_stats():
+    return token_ledger.stats()
@@ -1,39 +1,206 @@
+"""
+Logging for the whole app, kept off the request hot path.
+
+Callers only put records on a bounded in-memory queue (QueueHandler); a
+background QueueListener thread formats them and does the console and file
+I/O. If the queue is full, records are dropped (and counted) rather than
+blocking a request.
+
+- Console: '👉 message' (LOG_FORMAT=text) or one JSON object per line
+  (LOG_FORMAT=json)
+- File: JSON lines in logs/agent.log (LOG_FILE_LEVEL and up, ERROR by
+  default), rotated at LOG_MAX_BYTES with LOG_BACKUPS old files kept. The
+  file is only created once something is written to it.
+- Levels: LOG_LEVEL for everything, LOG_LEVELS="Executor=DEBUG,Cache=WARNING"
+  per module, or set_level() at runtime
+- DEBUG records are rate-limited to LOG_DEBUG_RATE per second per module
+
+Messages use %-style arguments (logger.debug("hit for %s", query)) so a
+disabled level costs nothing, and the message is only built on the
+listener thread. Extra fields (extra={"similarity": 0.8}) and the current
+trace id go into the JSON records.
+"""
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
 import sys
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
+
+# 1. Settings
+ROOT_LOGGER = "AI_Movie_Assistant"
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FILE = os.path.join(LOG_DIR, "agent.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_FILE_LEVEL = os.getenv("LOG_FILE_LEVEL", "ERROR")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 5 * 1024 * 1024))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", 5))
+LOG_DEBUG_RATE = float(os.getenv("LOG_DEBUG_RATE", 20))  # 0 = unlimited
+LOG_QUEUE_SIZE = 10000
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "trace_id"}
+
+
+# 2. Formatting (runs on the listener thread)
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, trace_id, extra fields, exc."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name[len(ROOT_LOGGER) + 1:] or record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _RotatingFile(logging.handlers.RotatingFileHandler):
+    """Rotating log file whose directory and file are created on the first write."""
+
+    def __init__(self, path):
+        super().__init__(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename) or ".", exist_ok=True)
+        return super()._open()
+
+
+# 3. The hot path: filters and the queue
+class DebugRateLimit(logging.Filter):
+    """
+    Lets at most `rate` DEBUG records per second through for each logger
+    (token bucket, bursts of up to `rate`); the rest are dropped and counted.
+    """
+
+    def __init__(self, rate=LOG_DEBUG_RATE):
+        super().__init__()
+        self.rate = rate
+        self.dropped = 0
+        self._buckets = {}  # logger name -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or not self.rate:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(record.name, (self.rate, now))
+            tokens = min(self.rate, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            self._buckets[record.name] = (tokens - allowed, now)
+            if not allowed:
+                self.dropped += 1
+        return allowed
+
+
+class _Listener(logging.handlers.QueueListener):
+    """QueueListener whose stop waits for room in a full queue instead of raising queue.Full."""
 
-# 1. Create logs directory if it doesn't exist
-LOG_DIR = "logs"
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
 
-# 2. Generate a unique filename based on the current time
-timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-LOG_FILE = os.path.join(LOG_DIR, f"error_log_{timestamp}.log")
 
-# 3. Configure the Logger
-logger = logging.getLogger("AI_Movie_Assistant")
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a bounded queue for a QueueListener that owns `handlers`.
+    The listener thread starts with the first record; a full queue drops.
+    """
+
+    def __init__(self, handlers, maxsize=LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.listener = _Listener(self.queue, *handlers, respect_handler_level=True)
+        self.dropped = 0
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def prepare(self, record):
+        # No formatting here (the listener does it, in-process, so args and
+        # exc_info can cross as they are); only the caller's trace id is captured
+        record.trace_id = _trace_id()
+        return record
+
+    def enqueue(self, record):
+        if not self._started:
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        with self._start_lock:
+            if not self._started:
+                self.listener.start()
+                self._started = True
+                atexit.register(self.stop)
+
+    def stop(self):
+        """Writes out everything queued so far and stops the listener thread."""
+        with self._start_lock:
+            if self._started:
+                self.listener.stop()
+                self._started = False
+
+    def after_fork(self):
+        # A forked child (API workers) inherits the queue but not the listener thread
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.listener = _Listener(self.queue, *self.listener.handlers, respect_handler_level=True)
+        self.dropped = 0
+        self._started = False
+        self._start_lock = threading.Lock()
+
+
+def _trace_id():
+    tracing = sys.modules.get("utils.tracing")  # Not imported here: tracing itself logs
+    return tracing.current_span().trace_id if tracing else None
 
-# Global Gate: We allow INFO and up to enter the system
-logger.setLevel(logging.INFO)
 
+def _level(name):
+    return logging.getLevelName(name.strip().upper()) if isinstance(name, str) else name
+
+
+# 4. Configure the Logger
+logger = logging.getLogger(ROOT_LOGGER)
+logger.setLevel(_level(LOG_LEVEL))
+logger.propagate = False  # Our handlers only; no duplicates through the root logger
+
+console_handler = logging.StreamHandler(sys.stdout)
+console_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter('👉 %(message)s'))
+file_handler = _RotatingFile(LOG_FILE)
+file_handler.setLevel(_level(LOG_FILE_LEVEL))
+file_handler.setFormatter(JsonFormatter())
+
+debug_rate_limit = DebugRateLimit()
+queue_handler = QueueLogHandler([console_handler, file_handler])
+queue_handler.addFilter(debug_rate_limit)
 if not logger.handlers:
-    # --- HANDLER 1: FILE (Strict - Errors Only) ---
-    # This ensures the log file stays empty unless something actually breaks.
-    file_handler = logging.FileHandler(LOG_FILE, encoding='utf-8')
-    file_handler.setLevel(logging.ERROR)  # <--- HERE IS THE MAGIC
-    file_format = logging.Formatter('%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')
-    file_handler.setFormatter(file_format)
-    logger.addHandler(file_handler)
-
-    # --- HANDLER 2: CONSOLE (Verbose - See everything running) ---
-    # This lets you watch the agents work in your terminal window.
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO) # <--- Shows Info + Errors
-    console_format = logging.Formatter('👉 %(message)s')
-    console_handler.setFormatter(console_format)
-    logger.addHandler(console_handler)
+    logger.addHandler(queue_handler)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=queue_handler.after_fork)
+
+
+def set_level(module_name, level):
+    """Sets one module's level at runtime, e.g. set_level("Executor", "DEBUG"). "" is the whole app."""
+    (logger.getChild(module_name) if module_name else logger).setLevel(_level(level))
+
+
+for _entry in filter(None, (part.strip() for part in LOG_LEVELS.split(","))):
+    _module, _, _module_level = _entry.partition("=")
+    set_level(_module.strip(), _module_level)
+
 
 def get_logger(module_name):
     """
@@ -41,4 +208,7 @@ def get_logger(module_name):
     """
     return logger.getChild(module_name)
 
-print(f"📝 Error Logging initialized at: {LOG_FILE}")
\ No newline at end of file
+
+def get_logging_stats():
+    return {"queued": queue_handler.queue.qsize(), "dropped_queue_full": queue_handler.dropped,
+            "dropped_rate_limited": debug_rate_limit.dropped}
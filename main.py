@@ -2,14 +2,13 @@ import os
 import logging
 from dotenv import load_dotenv
 
-from agents.planner import PlannerAgent
-from agents.executor import ExecutorAgent
-from agents.verifier import VerifierAgent
-
-
-# Load environment variables
+# Load environment variables (before the project modules read them)
 load_dotenv()
 
+from runtime import get_runtime
+from utils.tracing import trace
+from utils.metrics import start_metrics_server, track_phase
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
@@ -18,14 +17,13 @@ def init_agents():
     """
     Initialize and return all agents.
     """
-    planner = PlannerAgent()
-    executor = ExecutorAgent()
-    verifier = VerifierAgent()
-    return planner, executor, verifier
+    runtime = get_runtime()
+    return runtime.planner, runtime.executor, runtime.verifier
 
 
 def main():
     planner, executor, verifier = init_agents()
+    start_metrics_server()
 
     logging.info("🍿 AI Movie Night Planner Initialized! (Type 'exit' to quit)")
     logging.info("----------------------------------------------------------")
@@ -42,30 +40,30 @@ def main():
             if not user_query:
                 continue
 
-            # --- Phase 1: Planning ---
-            logging.info("🧠 Planning...")
-            plan = planner.create_plan(user_query)
-
-            if not plan or "steps" not in plan:
-                logging.error("❌ Failed to generate a valid plan. Please try again.")
-                continue
-
-            # --- Phase 2: Execution ---
-            logging.info("⚙️ Executing...")
-            execution_results = executor.execute_plan(plan)
-
-            if not execution_results:
-                logging.error("❌ Execution failed or returned no results.")
-                continue
-
-            # --- Phase 3: Verification & Response ---
-            logging.info("📝 Verifying...")
-            final_response = verifier.verify_and_respond(
-                user_query,
-                execution_results
-            )
-
-            print(f"\nAssistant:\n{final_response}")
+            with trace("user_query", query=user_query), track_phase("query"):
+                # --- Phase 1: Planning ---
+                logging.info("🧠 Planning...")
+                plan = planner.create_plan(user_query)
+
+                if not plan or "steps" not in plan:
+                    logging.error("❌ Failed to generate a valid plan. Please try again.")
+                    continue
+
+                # --- Phase 2: Execution ---
+                logging.info("⚙️ Executing...")
+                execution_results = executor.execute_plan(plan)
+
+                if not execution_results:
+                    logging.error("❌ Execution failed or returned no results.")
+                    continue
+
+                # --- Phase 3: Verification & Response ---
+                logging.info("📝 Verifying...")
+                print("\nAssistant:")
+                # Print tokens as they arrive instead of waiting for the full answer
+                for chunk in verifier.verify_and_respond_stream(user_query, execution_results):
+                    print(chunk, end="", flush=True)
+                print()
 
         except Exception:
             logging.exception("Unexpected error occurred in main loop")
@@ -0,0 +1,139 @@
+import threading
+
+from agents.planner import PlannerAgent, get_planner_stats
+from agents.executor import ExecutorAgent
+from agents.verifier import VerifierAgent
+from llm import groq_client
+from llm.groq_client import get_completion_cache_stats
+from llm.rate_limiter import get_scheduler_stats
+from llm.routing import get_routing_stats
+from llm.tokens import get_token_stats
+from logger import get_logging_stats
+from tools import movie_tools
+from tools.http_client import get_http, get_http_stats
+from tools.movie_index import get_movie_index_stats
+from tools.movie_tools import get_tool_cache_stats
+from tools.resilience import get_resilience_stats
+from tools.semantic_cache import get_semantic_cache_stats
+from utils import cache
+from utils.cache import get_cache_stats
+from utils.metrics import registry
+
+
+class AgentRuntime:
+    """
+    The agents for one process. They are stateless between requests (chat
+    history lives with the caller), so every session can share them, along
+    with the LLM client, HTTP pools and caches they use.
+    """
+    def __init__(self):
+        self.planner = PlannerAgent()
+        self.executor = ExecutorAgent()
+        self.verifier = VerifierAgent()
+        self.warmed = False
+        self._warm_lock = threading.Lock()
+
+    def warm_up(self):
+        """
+        Does now what is otherwise deferred to first use: importing the Groq
+        SDK and httpx, building their clients, and opening the cache, index
+        and semantic cache files. For long-running processes that would
+        rather pay this at start-up than in their first request. Idempotent.
+        """
+        with self._warm_lock:
+            if not self.warmed:
+                self._warm_up()
+                self.warmed = True
+        return self
+
+    def _warm_up(self):
+        for client in (groq_client.llm_client, groq_client.async_llm_client):
+            if client is not None:
+                client.client
+        get_http()._get_client()
+        for store in (cache.search_cache, groq_client.completion_cache.store, movie_tools.details_cache.store,
+                      movie_tools.trailer_cache.store, movie_tools.streaming_cache.store):
+            store.open()
+        movie_tools.movie_index.open()
+        movie_tools.semantic_cache.open()
+        from ddgs import DDGS  # noqa: F401 (import cost only)
+
+    def stats(self):
+        """One snapshot of every cache, pool and scheduler counter."""
+        return {
+            "planner": get_planner_stats(),
+            "executor": self.executor.execution_stats(),
+            "speculation": self.executor.speculation_stats(),
+            "search_cache": get_cache_stats(),
+            "tool_caches": get_tool_cache_stats(),
+            "semantic_cache": get_semantic_cache_stats(),
+            "movie_index": get_movie_index_stats(),
+            "completion_cache": get_completion_cache_stats(),
+            "scheduler": get_scheduler_stats(),
+            "tokens": get_token_stats(),
+            "llm_routes": get_routing_stats(),
+            "http": get_http_stats(),
+            "backends": get_resilience_stats(),
+            "logging": get_logging_stats(),
+        }
+
+
+def _cache_lookups():
+    """(hits, misses) per cache, from the stats each cache already keeps."""
+    search = get_cache_stats()
+    lookups = {"search": (search["hits"] + search["backend_hits"], search["misses"])}
+    semantic = get_semantic_cache_stats()
+    lookups["semantic"] = (semantic["hits"], semantic["misses"])
+    for tool, stats in get_tool_cache_stats().items():
+        lookups[tool] = (stats["fresh_hits"] + stats["stale_hits"], stats["misses"])
+    completions = get_completion_cache_stats()
+    lookups["llm"] = (completions["hits"], completions["misses"])
+    return lookups
+
+
+def collect_metrics():
+    """Scrape-time metrics read from the caches, the Groq scheduler and the HTTP pool."""
+    lookups = _cache_lookups()
+    yield ("cache_lookups_total", "counter", "Cache lookups by cache and result.",
+           [({"cache": name, "result": result}, count)
+            for name, (hits, misses) in lookups.items() for result, count in (("hit", hits), ("miss", misses))])
+    yield ("cache_hit_ratio", "gauge", "Share of cache lookups that were hits.",
+           [({"cache": name}, round(hits / (hits + misses), 4) if hits + misses else 0.0)
+            for name, (hits, misses) in lookups.items()])
+
+    scheduler = get_scheduler_stats()
+    yield ("groq_rate_limited_total", "counter", "Groq 429 responses.", [({}, scheduler["rate_limited"])])
+    yield ("groq_backoff_seconds_total", "counter", "Seconds all Groq calls were paused after 429s.",
+           [({}, scheduler["paused_total_s"])])
+    yield ("groq_queue_wait_seconds_total", "counter", "Seconds callers waited for a Groq rate-limit slot.",
+           [({}, scheduler["wait_total_s"])])
+    yield ("groq_queued", "gauge", "Callers waiting for a Groq rate-limit slot.", [({}, scheduler["queued"])])
+
+    http = get_http_stats()
+    for field, help_text in (("requests", "HTTP requests by host."), ("retries", "HTTP retries by host."),
+                             ("errors", "HTTP transport errors by host."),
+                             ("new_connections", "New TCP connections opened, by host.")):
+        yield (f"http_{field}_total", "counter", help_text, [({"host": host}, stats[field]) for host, stats in http.items()])
+
+
+registry.register_collector(collect_metrics)
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime(warm: bool = False) -> AgentRuntime:
+    """
+    Returns the process-wide runtime, building it on first use. Importing
+    the project does no I/O and loads no SDKs; warm=True does all of that
+    now (see AgentRuntime.warm_up), also if an earlier caller built the
+    runtime without warming it.
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AgentRuntime()
+        runtime = _runtime
+    if warm:
+        runtime.warm_up()
+    return runtime
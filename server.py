@@ -0,0 +1,325 @@
+"""
+Headless JSON API: the plan/execute/verify pipeline over HTTP.
+
+    python server.py                          # API_WORKERS processes on API_PORT
+    python server.py --workers 4 --port 8000
+
+Endpoints:
+- POST /v1/ask   {"query": "...", "history": "..."} -> {"answer", "plan", "results", "trace_id"}
+- GET  /healthz  liveness: the worker process is serving
+- GET  /readyz   readiness: warmed up and not draining (503 otherwise)
+- GET  /stats    AgentRuntime.stats() of the worker that answered
+- GET  /metrics  Prometheus metrics of the worker that answered
+
+Workers are forked processes accepting on one shared listening socket, so
+requests spread across cores. They share the SQLite-backed caches on disk
+(search, tool results, LLM completions, movie index), and each gets an
+equal share of the Groq rate limit (GROQ_RPM / GROQ_TPM). A worker that
+dies is replaced, after a growing delay if workers keep dying within
+WORKER_MIN_UPTIME seconds of starting; after API_MAX_CRASHES such exits in a
+row (e.g. GROQ_API_KEY missing) the server gives up with exit code 1.
+
+Each worker runs at most API_MAX_CONCURRENCY questions at once. Up to
+API_MAX_QUEUE more may wait, for at most API_QUEUE_TIMEOUT seconds. Beyond
+that a request gets 429 with a Retry-After header instead of queueing
+without bound. On SIGTERM/SIGINT workers report not ready, answer new
+requests with 503, finish the ones in flight (for up to API_DRAIN_SECONDS)
+and exit.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()  # Before the project modules read their settings
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm.rate_limiter import GROQ_RPM, GROQ_TPM, scheduler
+from logger import get_logger
+from runtime import get_runtime
+from utils.metrics import render, track_phase
+from utils.tracing import trace
+
+logger = get_logger("Server")
+
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", 8000))
+API_WORKERS = int(os.getenv("API_WORKERS", os.cpu_count() or 1))
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", 8))
+API_MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", 16))
+API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", 10))
+API_DRAIN_SECONDS = float(os.getenv("API_DRAIN_SECONDS", 10))
+API_MAX_CRASHES = int(os.getenv("API_MAX_CRASHES", 5))
+MAX_BODY_BYTES = 64 * 1024
+RETRY_AFTER_SECONDS = 1
+WORKER_MIN_UPTIME = 5.0     # A worker exiting sooner than this crashed on start-up
+RESTART_BASE_DELAY = 0.5    # Doubled for every crash in a row
+RESTART_MAX_DELAY = 30.0
+
+
+class Admission:
+    """
+    Bounds the questions one worker works on: `max_concurrency` run, up to
+    `max_queue` more wait. enter() is False when the request should get a 429.
+    """
+
+    def __init__(self, max_concurrency=API_MAX_CONCURRENCY, max_queue=API_MAX_QUEUE,
+                 queue_timeout=API_QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.draining = False
+        self._cond = threading.Condition()
+        self._stats = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    def enter(self):
+        with self._cond:
+            if self.in_flight + self.waiting >= self.max_concurrency + self.max_queue:
+                self._stats["rejected"] += 1
+                return False
+            self.waiting += 1
+            admitted = self._cond.wait_for(lambda: self.in_flight < self.max_concurrency, self.queue_timeout)
+            self.waiting -= 1
+            if not admitted:
+                self._stats["timed_out"] += 1
+                return False
+            self.in_flight += 1
+            self._stats["admitted"] += 1
+            return True
+
+    def leave(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def drain(self, timeout=API_DRAIN_SECONDS):
+        """Stops admitting requests and waits for the admitted ones. False if some were still running."""
+        with self._cond:
+            self.draining = True
+            return self._cond.wait_for(lambda: self.in_flight == 0 and self.waiting == 0, timeout)
+
+    def stats(self):
+        with self._cond:
+            return {"in_flight": self.in_flight, "waiting": self.waiting, "draining": self.draining, **self._stats}
+
+
+def answer(runtime, query, history=""):
+    """One question through plan -> execute -> verify. Returns (status, body)."""
+    with trace("user_query", query=query) as root, track_phase("query"):
+        plan = runtime.planner.create_plan(query, chat_history=history)
+        if not plan or "steps" not in plan:
+            return 502, {"error": "Failed to generate a valid plan.", "trace_id": root.trace_id}
+        results = runtime.executor.execute_plan(plan)
+        response = runtime.verifier.verify_and_respond(query, results)
+        return 200, {"answer": response, "plan": plan, "results": results, "trace_id": root.trace_id}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive for load balancers and clients
+
+    def _send(self, status, body, headers=None):
+        payload = body.encode("utf-8") if isinstance(body, str) else json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; version=0.0.4" if isinstance(body, str) else "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/healthz":
+            self._send(200, {"status": "ok", "pid": os.getpid()})
+        elif self.path == "/readyz":
+            ready = server.ready and not server.admission.draining
+            self._send(200 if ready else 503, {"ready": ready, **server.admission.stats()})
+        elif self.path == "/stats":
+            self._send(200, {"admission": server.admission.stats(), **server.runtime.stats()})
+        elif self.path == "/metrics":
+            self._send(200, render())
+        else:
+            self._send(404, {"error": "Not found."})
+
+    def do_POST(self):
+        if self.path != "/v1/ask":
+            return self._send(404, {"error": "Not found."})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body's end is unknown, so the connection cannot be reused
+            self.close_connection = True
+            return self._send(400, {"error": "Content-Length must be a non-negative integer."})
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return self._send(413, {"error": "Request body too large."})
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            query = str(request.get("query", "")).strip()
+        except (ValueError, AttributeError):
+            return self._send(400, {"error": "Body must be a JSON object."})
+        if not query:
+            return self._send(400, {"error": "'query' is required."})
+
+        admission = self.server.admission
+        if admission.draining:
+            return self._send(503, {"error": "Server is shutting down."}, {"Connection": "close"})
+        if not admission.enter():
+            return self._send(429, {"error": "Too many requests."}, {"Retry-After": str(RETRY_AFTER_SECONDS)})
+        try:
+            status, body = answer(self.server.runtime, query, str(request.get("history", "")))
+        except Exception as e:
+            logger.exception("Request failed: %s", e)
+            status, body = 500, {"error": "Internal error."}
+        finally:
+            admission.leave()
+        self._send(status, body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, sock, runtime, admission=None):
+        super().__init__(sock.getsockname()[:2], ApiHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock  # Shared with the other workers
+        self.runtime = runtime
+        self.admission = admission or Admission()
+        self.ready = False
+
+    def drain_and_stop(self, timeout=API_DRAIN_SECONDS):
+        self.ready = False
+        if not self.admission.drain(timeout):
+            logger.warning("Drain timed out with %s requests in flight", self.admission.in_flight)
+        self.shutdown()
+
+
+def listen(host=API_HOST, port=API_PORT):
+    return socket.create_server((host, port), backlog=128)
+
+
+def serve_worker(sock, workers=1):
+    """Runs one worker on `sock` until SIGTERM/SIGINT, then drains. Returns the exit code."""
+    if workers > 1:
+        scheduler.configure(rpm=max(1, GROQ_RPM // workers), tpm=max(1, GROQ_TPM // workers))
+    server = ApiServer(sock, get_runtime(warm=True))
+
+    def on_signal(signum, frame):
+        threading.Thread(target=server.drain_and_stop, name="api-drain", daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    server.ready = True
+    logger.info("Worker %s serving on %s:%s", os.getpid(), *sock.getsockname()[:2])
+    server.serve_forever()
+    server.server_close()
+    return 0
+
+
+class RestartPolicy:
+    """
+    When to replace a dead worker. Exits within `min_uptime` of starting are
+    crashes: each one in a row doubles the delay, and `max_crashes` of them
+    mean the workers cannot start at all.
+    """
+
+    def __init__(self, max_crashes=API_MAX_CRASHES, min_uptime=WORKER_MIN_UPTIME,
+                 base_delay=RESTART_BASE_DELAY, max_delay=RESTART_MAX_DELAY):
+        self.max_crashes = max_crashes
+        self.min_uptime = min_uptime
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.crashes = 0
+
+    def on_exit(self, uptime):
+        """Seconds to wait before starting a new worker, or None to give up."""
+        if uptime >= self.min_uptime:
+            self.crashes = 0
+            return 0.0
+        self.crashes += 1
+        if self.crashes >= self.max_crashes:
+            return None
+        return min(self.max_delay, self.base_delay * 2 ** (self.crashes - 1))
+
+
+def _fork_worker(sock, workers):
+    pid = os.fork()
+    if pid == 0:
+        raise SystemExit(serve_worker(sock, workers))
+    return pid
+
+
+def serve(host=API_HOST, port=API_PORT, workers=API_WORKERS):
+    """Pre-fork server: binds once, runs `workers` processes, replaces dead ones, drains on shutdown."""
+    sock = listen(host, port)
+    if workers <= 1 or not hasattr(os, "fork"):
+        return serve_worker(sock)
+
+    children = {_fork_worker(sock, workers): time.monotonic() for _ in range(workers)}
+    policy = RestartPolicy()
+    stopping = False
+    exit_code = 0
+
+    def on_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    logger.info("🎬 Movie API on %s:%s with %s workers", host, port, workers)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        delay = policy.on_exit(time.monotonic() - started)
+        if delay is None:
+            logger.error("Workers keep exiting on start-up (%s in a row), shutting down", policy.crashes)
+            exit_code = 1
+            on_signal(signal.SIGTERM, None)
+            continue
+        logger.warning("Worker %s exited (status %s), starting a new one in %.1fs", pid, status, delay)
+        time.sleep(delay)
+        if not stopping:
+            children[_fork_worker(sock, workers)] = time.monotonic()
+    sock.close()
+    return exit_code
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless JSON API for the movie assistant")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Worker processes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    return serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from batch import run_batch, read_queries, dedupe, load_checkpoint
+from benchmarks.replay import offline_pipeline
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input = os.path.join(self.tmp.name, "queries.jsonl")
+        self.output = os.path.join(self.tmp.name, "answers.jsonl")
+        with open(self.input, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"query": "Who directed Heat?"}) + "\n")
+            f.write(json.dumps("Find the trailer for Inception") + "\n")
+            f.write("\n")
+            f.write(json.dumps({"query": "who directed  heat"}) + "\n")
+
+    def read_output(self):
+        records = []
+        with open(self.output, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+        return records
+
+    def test_dedupe_groups_rows(self):
+        jobs = dedupe(read_queries(self.input))
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(jobs[0]["rows"], [1, 4])
+
+    def test_csv_input(self):
+        path = os.path.join(self.tmp.name, "queries.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write("id,query\n1,Who directed Heat?\n2,\n")
+        self.assertEqual(read_queries(path), [(1, "Who directed Heat?")])
+
+    def test_answers_each_unique_query_once(self):
+        with offline_pipeline():
+            answered, failed, skipped = run_batch(self.input, self.output, concurrency=2)
+
+        self.assertEqual((answered, failed, skipped), (2, 0, 0))
+        records = self.read_output()
+        self.assertEqual(len(records), 2)
+        heat = next(r for r in records if r["rows"] == [1, 4])
+        self.assertIn("Michael Mann", heat["answer"])
+
+    def test_resume_skips_answered_and_retries_failed(self):
+        with open(self.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"key": "who directed heat", "answer": "Michael Mann", "error": None}) + "\n")
+            f.write(json.dumps({"key": "find the trailer for inception", "answer": None, "error": "boom"}) + "\n")
+            f.write('{"key": "half a reco')  # Interrupted mid-write
+
+        self.assertEqual(load_checkpoint(self.output), {"who directed heat"})
+        with offline_pipeline():
+            answered, failed, skipped = run_batch(self.input, self.output)
+
+        self.assertEqual((answered, failed, skipped), (1, 0, 1))
+        self.assertIsNone(self.read_output()[-1]["error"])
+        self.assertEqual(load_checkpoint(self.output), {"who directed heat", "find the trailer for inception"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.bench_pipeline import run_benchmark, compare, percentile
+from benchmarks.replay import offline_pipeline
+from runtime import AgentRuntime
+
+class TestOfflinePipeline(unittest.TestCase):
+
+    def test_replays_fixture_answers(self):
+        with offline_pipeline():
+            runtime = AgentRuntime()
+            query = "Find the trailer for Inception"
+            results = runtime.executor.execute_plan(runtime.planner.create_plan(query))
+            answer = runtime.verifier.verify_and_respond(query, results)
+
+        self.assertEqual(results["search_movie_details"]["director"], "Christopher Nolan")
+        self.assertTrue(results["get_youtube_trailer"].startswith("https://www.youtube.com/watch?v="))
+        self.assertIn("Inception", answer)
+
+    def test_report_shape(self):
+        report = run_benchmark(sessions=2, rounds=1)
+        self.assertEqual(report["failed_plans"], 0)
+        self.assertGreater(report["requests"], 0)
+        for phase in ("plan", "execute", "verify", "total"):
+            self.assertIn("p95", report["latency_ms"][phase])
+
+    def test_compare_flags_p95_regressions(self):
+        def report(p95):
+            return {"latency_ms": {phase: {"p95": p95} for phase in ("plan", "execute", "verify", "total")}}
+        self.assertEqual(compare(report(110), report(100), tolerance=0.2), [])
+        self.assertEqual(len(compare(report(130), report(100), tolerance=0.2)), 4)
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
+
+if __name__ == '__main__':
+    unittest.main()
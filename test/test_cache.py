@@ -0,0 +1,109 @@
+import unittest
+import asyncio
+import tempfile
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.cache import TTLCache, SWRCache
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit_and_miss_counters(self):
+        cache = TTLCache("test", db_path=self.db_path)
+        self.assertIsNone(cache.get("inception"))
+        cache.set("inception", "Inception")
+        self.assertEqual(cache.get("inception"), "Inception")
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_lru_eviction(self):
+        cache = TTLCache("test", db_path=None, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # 'b' is now least recently used
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        cache = TTLCache("test", db_path=self.db_path)
+        cache.set("heat", "Heat", ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("heat"))
+
+    def test_persists_across_instances(self):
+        TTLCache("test", db_path=self.db_path).set("memento", {"title": "Memento"})
+        reloaded = TTLCache("test", db_path=self.db_path)
+        self.assertEqual(reloaded.get("memento"), {"title": "Memento"})
+        self.assertEqual(reloaded.stats()["hits"], 1)  # Served from memory, loaded at startup
+
+class TestSWRCache(unittest.TestCase):
+
+    def test_concurrent_misses_share_one_fetch(self):
+        cache = SWRCache("test", fresh_ttl=60, stale_ttl=60, db_path=None)
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"title": "Heat"}
+
+        threads = [threading.Thread(target=cache.get_or_fetch, args=("heat", fetch)) for _ in range(5)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["coalesced"], 4)
+
+    def test_async_concurrent_misses_share_one_fetch(self):
+        cache = SWRCache("test", fresh_ttl=60, stale_ttl=60, db_path=None)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "https://www.youtube.com/watch?v=abc"
+
+        async def run():
+            return await asyncio.gather(*(cache.get_or_fetch_async("heat", fetch) for _ in range(5)))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(set(results), {"https://www.youtube.com/watch?v=abc"})
+
+    def test_stale_value_served_while_refreshing(self):
+        cache = SWRCache("test", fresh_ttl=0, stale_ttl=60, db_path=None)
+        cache.put("heat", "old")
+        refreshed = threading.Event()
+
+        def fetch():
+            refreshed.set()
+            return "new"
+
+        self.assertEqual(cache.get_or_fetch("heat", fetch), "old")
+        self.assertTrue(refreshed.wait(1))
+        self.assertEqual(cache.stats()["stale_hits"], 1)
+
+    def test_uncacheable_results_are_not_stored(self):
+        cache = SWRCache("test", fresh_ttl=60, stale_ttl=60, db_path=None)
+        cache.get_or_fetch("heat", lambda: "Error: boom", cacheable=lambda v: not v.startswith("Error"))
+        self.assertIsNone(cache.store.get("heat"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from llm import groq_client
+from llm.groq_client import GroqClient, CompletionCache
+from llm.rate_limiter import RequestScheduler, parse_retry_after, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from llm.routing import ModelRouter, parse_routes, SMALL_MODEL, LARGE_MODEL
+from agents.planner import PlannerAgent
+
+def fake_completion(text, total_tokens=120):
+    completion = MagicMock()
+    completion.choices[0].message.content = text
+    completion.usage.total_tokens = total_tokens
+    return completion
+
+class TestCompletionCache(unittest.TestCase):
+
+    def setUp(self):
+        cache = patch.object(groq_client, "completion_cache", CompletionCache(db_path=None))
+        self.cache = cache.start()
+        self.addCleanup(cache.stop)
+
+        self.client = GroqClient()
+        self.client.client = MagicMock()
+        self.client.client.chat.completions.create.return_value = fake_completion("Heat")
+
+    def test_repeated_prompt_served_from_cache(self):
+        self.assertEqual(self.client.generate_text("Who directed Heat?"), "Heat")
+        self.assertEqual(self.client.generate_text("Who directed Heat?"), "Heat")
+
+        self.assertEqual(self.client.client.chat.completions.create.call_count, 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["tokens_saved"], 120)
+
+    def test_opt_out_skips_cache(self):
+        self.client.generate_text("Who directed Heat?", use_cache=False)
+        self.client.generate_text("Who directed Heat?", use_cache=False)
+
+        self.assertEqual(self.client.client.chat.completions.create.call_count, 2)
+        self.assertEqual(self.cache.stats()["hits"], 0)
+
+    def test_key_depends_on_model_and_sampling(self):
+        request = groq_client._build_request("hi", "model-a")
+        self.assertNotEqual(CompletionCache.make_key(request),
+                            CompletionCache.make_key(groq_client._build_request("hi", "model-b")))
+        self.assertNotEqual(CompletionCache.make_key(request),
+                            CompletionCache.make_key(groq_client._build_request("hi", "model-a", temperature=0.7)))
+
+    def test_stream_yields_chunks_and_caches_full_text(self):
+        def chunk(text):
+            part = MagicMock()
+            part.choices[0].delta.content = text
+            part.x_groq = None
+            return part
+
+        self.client.client.chat.completions.create.return_value = iter([chunk("Directed by "), chunk("Michael Mann")])
+
+        self.assertEqual(list(self.client.stream_text("Who directed Heat?")), ["Directed by ", "Michael Mann"])
+        # Second time the whole answer comes from the cache in one piece
+        self.assertEqual(list(self.client.stream_text("Who directed Heat?")), ["Directed by Michael Mann"])
+        self.assertEqual(self.client.client.chat.completions.create.call_count, 1)
+
+class TestRequestScheduler(unittest.TestCase):
+
+    def test_interactive_callers_jump_the_queue(self):
+        scheduler = RequestScheduler(rpm=600, burst=1)  # One slot every 0.1s
+        scheduler.acquire(1)  # Use up the burst so the next callers queue
+        order = []
+
+        def call(name, priority):
+            scheduler.acquire(1, priority)
+            order.append(name)
+
+        background = [threading.Thread(target=call, args=(f"bg{i}", PRIORITY_BACKGROUND)) for i in range(2)]
+        for t in background: t.start()
+        time.sleep(0.02)
+        interactive = threading.Thread(target=call, args=("verifier", PRIORITY_INTERACTIVE))
+        interactive.start()
+        for t in background + [interactive]: t.join()
+
+        self.assertEqual(order[0], "verifier")
+
+    def test_penalize_pauses_everyone(self):
+        scheduler = RequestScheduler(rpm=6000)
+        scheduler.penalize(0.2)
+        started = time.monotonic()
+        scheduler.acquire(1)
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+        self.assertEqual(scheduler.stats()["rate_limited"], 1)
+
+    def test_parse_retry_after(self):
+        error = MagicMock()
+        error.response.headers = {"retry-after": "7"}
+        self.assertEqual(parse_retry_after(error), 7.0)
+        error.response.headers = {"x-ratelimit-reset-tokens": "1m2.5s"}
+        self.assertEqual(parse_retry_after(error), 62.5)
+        error.response.headers = {"x-ratelimit-reset-requests": "250ms"}
+        self.assertAlmostEqual(parse_retry_after(error), 0.25)
+        self.assertIsNone(parse_retry_after(Exception("boom")))
+
+    @patch("llm.groq_client.scheduler")
+    def test_rate_limit_pauses_scheduler_and_retries(self, mock_scheduler):
+        client = GroqClient()
+        client.client = MagicMock()
+        client.client.chat.completions.create.side_effect = [Exception("Error code: 429"), fake_completion("ok")]
+
+        self.assertEqual(client.generate_text("hello", use_cache=False), "ok")
+        mock_scheduler.penalize.assert_called_once()
+        self.assertEqual(mock_scheduler.acquire.call_count, 2)
+
+class TestModelRouting(unittest.TestCase):
+
+    def setUp(self):
+        self.router = ModelRouter({"planner": "small-model"}, large_model="large-model")
+        for p in (patch.object(groq_client, "completion_cache", CompletionCache(db_path=None)),
+                  patch.object(groq_client, "model_router", self.router)):
+            p.start()
+            self.addCleanup(p.stop)
+        self.client = GroqClient()
+        self.client.client = MagicMock()
+        self.create = self.client.client.chat.completions.create
+
+    def models_called(self):
+        return [call.kwargs["model"] for call in self.create.call_args_list]
+
+    def test_routes_by_prompt_type(self):
+        self.create.return_value = fake_completion('{"steps": []}')
+        self.client.generate_text("plan this", prompt_name="planner")
+        self.client.generate_text("answer this", prompt_name="verifier")
+        self.assertEqual(self.models_called(), ["small-model", "large-model"])
+
+    def test_invalid_small_answer_escalates_to_large_model(self):
+        plan = '{"steps": [{"tool": "search_movie_details", "args": "Heat"}]}'
+        self.create.side_effect = [fake_completion("Sure! Here is a plan: search for Heat."), fake_completion(plan)]
+        text = self.client.generate_text("plan this", prompt_name="planner", validate=PlannerAgent._parse_plan)
+        self.assertEqual(text, plan)
+        self.assertEqual(self.models_called(), ["small-model", "large-model"])
+
+        # The invalid small answer is not cached; the large one is
+        self.create.side_effect = None
+        self.create.return_value = fake_completion('{"steps": []}')
+        self.assertEqual(self.client.generate_text("plan this", prompt_name="planner", validate=PlannerAgent._parse_plan), '{"steps": []}')
+        stats = self.router.stats()["planner"]
+        self.assertEqual((stats["calls"], stats["escalations"], stats["escalation_rate"]), (2, 1, 0.5))
+        self.assertEqual(stats["models"]["small-model"]["calls"], 2)
+        self.assertEqual(stats["models"]["large-model"]["calls"], 1)
+
+    def test_planner_retry_is_not_served_the_cached_bad_plan(self):
+        plan = '{"steps": [{"tool": "search_movie_details", "args": "Heat"}]}'
+        self.create.side_effect = [fake_completion("no plan"), fake_completion("still no plan"), fake_completion(plan)]
+        planner = PlannerAgent(use_fast_path=False)
+        planner.llm = self.client
+
+        self.assertEqual(planner.create_plan("Who directed Heat?")["steps"][0]["args"], "Heat")
+        self.assertEqual(self.models_called(), ["small-model", "large-model", "small-model"])
+        self.assertEqual(groq_client.completion_cache.stats()["hits"], 0)
+        self.assertEqual(groq_client.completion_cache.stats()["entries"], 0)  # Neither invalid answer was cached
+
+    def test_invalid_large_answer_is_not_served_again(self):
+        plan = '{"steps": [{"tool": "search_movie_details", "args": "Heat"}]}'
+        self.create.side_effect = [fake_completion("no plan"), fake_completion("still no plan"),
+                                   fake_completion("no plan"), fake_completion(plan)]
+        for _ in range(2):
+            text = self.client.generate_text("plan this", prompt_name="planner", validate=PlannerAgent._parse_plan)
+        self.assertEqual(text, plan)
+        self.assertEqual(self.models_called(), ["small-model", "large-model"] * 2)
+        self.assertEqual(self.router.stats()["planner"]["escalations"], 2)
+
+    def test_invalid_cached_answer_is_dropped(self):
+        self.create.return_value = fake_completion("no plan")
+        self.client.generate_text("plan this", prompt_name="verifier")  # Cached: nothing to check it against
+        self.create.return_value = fake_completion('{"steps": []}')
+        text = self.client.generate_text("plan this", prompt_name="verifier", validate=PlannerAgent._parse_plan)
+        self.assertEqual(text, '{"steps": []}')
+        self.assertEqual(self.create.call_count, 2)
+
+    def test_valid_answer_and_large_routes_never_escalate(self):
+        self.create.return_value = fake_completion("not json")
+        self.client.generate_text("answer this", prompt_name="verifier", validate=PlannerAgent._parse_plan)
+        self.assertEqual(self.models_called(), ["large-model"])
+
+    def test_parse_routes(self):
+        self.assertEqual(parse_routes("planner=small, title=LARGE,other=some-model"),
+                         {"planner": SMALL_MODEL, "title": LARGE_MODEL, "other": "some-model"})
+        self.assertEqual(parse_routes(""), {})
+
+if __name__ == '__main__':
+    unittest.main()
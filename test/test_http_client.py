@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import sys
+import os
+
+import httpx
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import http_client
+
+class TestHttpTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+
+        def handler(request):
+            self.calls += 1
+            if self.calls == 1:
+                return httpx.Response(503)
+            return httpx.Response(200, json={"Response": "True", "Title": request.url.params["t"]})
+
+        self.transport = http_client.HttpTransport(transport=httpx.MockTransport(handler),
+                                                   async_transport=httpx.MockTransport(handler))
+        # No sleeping between retries in tests
+        backoff = patch('tools.http_client._backoff', return_value=0)
+        backoff.start()
+        self.addCleanup(backoff.stop)
+
+    def test_retries_transient_status(self):
+        data = self.transport.get_json("http://www.omdbapi.com/", params={"t": "Heat"})
+
+        self.assertEqual(data["Title"], "Heat")
+        stats = self.transport.stats()["www.omdbapi.com"]
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["retries"], 1)
+
+    def test_async_retries_transient_status(self):
+        data = asyncio.run(self.transport.get_json_async("http://www.omdbapi.com/", params={"t": "Thief"}))
+        self.assertEqual(data["Title"], "Thief")
+
+    def test_gives_up_after_max_retries(self):
+        transport = http_client.HttpTransport(transport=httpx.MockTransport(lambda request: httpx.Response(500)),
+                                              max_retries=1)
+        with self.assertRaises(httpx.HTTPStatusError):
+            transport.get_json("http://www.omdbapi.com/")
+        self.assertEqual(transport.stats()["www.omdbapi.com"]["requests"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import json
+import logging
+import threading
+import time
+import os
+import sys
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logger as app_logging
+from logger import JsonFormatter, DebugRateLimit, QueueLogHandler
+from utils.tracing import Tracer
+
+class _SlowHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.unblock = threading.Event()
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.records.append(self.format(record))
+
+class TestLoggingPipeline(unittest.TestCase):
+
+    def make_logger(self, handler, **kwargs):
+        queue_handler = QueueLogHandler([handler], **kwargs)
+        self.addCleanup(queue_handler.stop)
+        log = logging.getLogger(f"test.{self.id()}")
+        log.propagate = False
+        log.setLevel(logging.DEBUG)
+        log.addHandler(queue_handler)
+        return log, queue_handler
+
+    def test_caller_does_not_wait_for_slow_output(self):
+        slow = _SlowHandler()
+        log, _ = self.make_logger(slow)
+        started = time.perf_counter()
+        for i in range(50):
+            log.info("request %s", i)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        slow.unblock.set()
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        slow = _SlowHandler()
+        log, queue_handler = self.make_logger(slow, maxsize=5)
+        for i in range(20):
+            log.info("request %s", i)
+        self.assertGreater(queue_handler.dropped, 0)
+        slow.unblock.set()
+        queue_handler.stop()
+        self.assertEqual(slow.records[0], "request 0")
+
+    def test_json_records_carry_extra_fields_and_trace_id(self):
+        slow = _SlowHandler()
+        slow.unblock.set()
+        slow.setFormatter(JsonFormatter())
+        log, queue_handler = self.make_logger(slow)
+        with Tracer(enabled=True, path=None).trace("user_query") as root:
+            log.warning("Index hit for %s", "Heat", extra={"confidence": 0.91})
+        queue_handler.stop()
+        entry = json.loads(slow.records[0])
+        self.assertEqual((entry["level"], entry["msg"], entry["confidence"]), ("WARNING", "Index hit for Heat", 0.91))
+        self.assertEqual(entry["trace_id"], root.trace_id)
+
+    def test_debug_rate_limit(self):
+        limit = DebugRateLimit(rate=5)
+        record = lambda level: logging.LogRecord("MovieTools", level, "", 0, "msg", None, None)
+        allowed = sum(limit.filter(record(logging.DEBUG)) for _ in range(50))
+        self.assertEqual(allowed, 5)
+        self.assertEqual(limit.dropped, 45)
+        self.assertTrue(limit.filter(record(logging.WARNING)))
+
+    def test_per_module_level_at_runtime(self):
+        child = app_logging.get_logger("MovieTools")
+        self.addCleanup(child.setLevel, logging.NOTSET)
+        self.assertFalse(child.isEnabledFor(logging.DEBUG))
+        app_logging.set_level("MovieTools", "debug")
+        self.assertTrue(child.isEnabledFor(logging.DEBUG))
+        self.assertFalse(app_logging.get_logger("Executor").isEnabledFor(logging.DEBUG))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import os
+import sys
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.memory import ConversationMemory, movies_from_results
+from llm.tokens import count_tokens
+
+HEAT = {"search_movie_details": {"title": "Heat", "year": "1995", "rating": "8.3", "director": "Michael Mann",
+                                 "plot": "A group of professional thieves..."}}
+INCEPTION = {"get_movie_title_from_search": "Found via search: Inception",
+             "search_movie_details": {"title": "Inception", "year": "2010", "director": "Christopher Nolan"}}
+
+class TestConversationMemory(unittest.TestCase):
+
+    def turn(self, memory, question, answer, results=None):
+        memory.add_user(question)
+        memory.add_assistant(answer, results)
+
+    def test_tracks_current_and_earlier_movies(self):
+        memory = ConversationMemory()
+        self.turn(memory, "Who directed Heat?", "Michael Mann.", HEAT)
+        self.turn(memory, "Movie about dreams within dreams", "That is Inception.", INCEPTION)
+        memory.add_user("Who directed it?")
+        context = memory.context(current_request="Who directed it?")
+        self.assertTrue(context.startswith("Current movie: Inception (2010); director: Christopher Nolan"))
+        self.assertIn("Earlier movies: Heat (1995)", context)
+        self.assertIn("Assistant: That is Inception.", context)
+        self.assertFalse(context.endswith("Who directed it?"))
+
+    def test_turn_without_a_movie_keeps_current_one(self):
+        memory = ConversationMemory()
+        self.turn(memory, "Who directed Heat?", "Michael Mann.", HEAT)
+        self.turn(memory, "asdf", "I'm sorry, I couldn't find that movie.", {"get_movie_title_from_search": "Error: ..."})
+        self.assertEqual(memory.stats()["current_movies"], ["Heat"])
+
+    def test_bulk_results_become_current_movies(self):
+        bulk = {"search_movies_bulk": [{"title": "Heat", "year": "1995"}, "Error: Movie not found!",
+                                       {"title": "Ronin", "year": "1998"}]}
+        self.assertEqual([m["title"] for m in movies_from_results(bulk)], ["Heat", "Ronin"])
+
+    def test_history_and_context_are_bounded(self):
+        memory = ConversationMemory(max_messages=10, context_tokens=120)
+        for i in range(100):
+            self.turn(memory, f"Question {i} " + "about movies " * 50, "Answer " * 200, HEAT)
+        self.assertEqual(memory.stats()["messages"], 10)
+        self.assertEqual(memory.dropped_turns, 95)
+        self.assertLessEqual(count_tokens(memory.context()), 120)
+        self.assertIn("(95 earlier turns not shown)", memory.context())
+
+    def test_pages_newest_first(self):
+        memory = ConversationMemory(page_size=4)
+        for i in range(5):
+            self.turn(memory, f"q{i}", f"a{i}")
+        self.assertEqual(memory.page_count, 3)
+        self.assertEqual([m["content"] for m in memory.page(0)], ["q3", "a3", "q4", "a4"])
+        self.assertEqual([m["content"] for m in memory.page(2)], ["q0", "a0"])
+        self.assertEqual(memory.page(3), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch
+import socket
+import sys
+import os
+import urllib.request
+
+import httpx
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import metrics
+from utils.metrics import Registry, OMDB_LOOKUPS, start_metrics_server
+from tools import http_client, movie_tools
+from utils.cache import SWRCache
+import runtime  # Registers the scrape-time collector
+
+class TestRegistry(unittest.TestCase):
+
+    def test_render_counters_gauges_and_histograms(self):
+        registry = Registry()
+        registry.counter("hits_total", "Hits.").inc(tool="omdb")
+        registry.counter("hits_total", "Hits.").inc(2, tool="omdb")
+        registry.gauge("in_flight", "In flight.").set(3)
+        histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        histogram.observe(0.05, phase="plan")
+        histogram.observe(0.5, phase="plan")
+
+        text = registry.render()
+        self.assertIn("# TYPE movie_agent_hits_total counter", text)
+        self.assertIn('movie_agent_hits_total{tool="omdb"} 3', text)
+        self.assertIn("movie_agent_in_flight 3", text)
+        self.assertIn('movie_agent_latency_seconds_bucket{phase="plan",le="0.1"} 1', text)
+        self.assertIn('movie_agent_latency_seconds_bucket{phase="plan",le="+Inf"} 2', text)
+        self.assertIn('movie_agent_latency_seconds_count{phase="plan"} 2', text)
+
+    def test_collectors_run_at_scrape_time(self):
+        registry = Registry()
+        calls = []
+        registry.register_collector(lambda: calls.append(1) or [("queued", "gauge", "Queued.", [({}, 4)])])
+        self.assertEqual(calls, [])
+        self.assertIn("movie_agent_queued 4", registry.render())
+
+    def test_runtime_collector_exposes_cache_and_scheduler_stats(self):
+        text = metrics.render()
+        self.assertIn('movie_agent_cache_hit_ratio{cache="search"}', text)
+        self.assertIn("movie_agent_groq_rate_limited_total", text)
+
+    def test_http_endpoint(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        with patch.object(metrics, "_server", None):
+            server = start_metrics_server(port=port, host="127.0.0.1")
+            self.addCleanup(server.shutdown)
+            body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        self.assertIn("movie_agent_phase_latency_seconds", body)
+
+class TestToolMetrics(unittest.TestCase):
+
+    def test_omdb_fuzzy_fallback_is_counted(self):
+        def handler(request):
+            if "t" in request.url.params:
+                return httpx.Response(200, json={"Response": "False", "Error": "Movie not found!"})
+            return httpx.Response(200, json={"Response": "True", "Search": [{"Title": "Heat", "Year": "1995"}]})
+
+        http_client.set_transport(httpx.MockTransport(handler))
+        self.addCleanup(http_client.set_transport)
+        cache = patch.object(movie_tools, "details_cache", SWRCache("omdb", 60, 60, db_path=None))
+        cache.start()
+        self.addCleanup(cache.stop)
+
+        before = OMDB_LOOKUPS.value(result="fuzzy")
+        self.assertEqual(movie_tools.search_movie_details("Heat Movie")["title"], "Heat")
+        self.assertEqual(OMDB_LOOKUPS.value(result="fuzzy"), before + 1)
+
+if __name__ == '__main__':
+    unittest.main()
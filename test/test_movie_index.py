@@ -0,0 +1,111 @@
+import unittest
+from unittest.mock import patch
+import gzip
+import os
+import sys
+import tempfile
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import movie_tools
+from tools.movie_index import MovieIndex, MATURE_INDEX_SIZE, MIN_CONFIDENCE, sequel_numbers, tokens
+from utils.cache import TTLCache
+from utils import cache as cache_module
+
+HEAT = {"Response": "True", "Title": "Heat", "Year": "1995", "Director": "Michael Mann",
+        "Actors": "Al Pacino, Robert De Niro", "Genre": "Action, Crime",
+        "Plot": "A group of professional thieves start to feel the heat from the LAPD after their latest heist."}
+RUBBER = {"Response": "True", "Title": "Rubber", "Year": "2010", "Director": "Quentin Dupieux",
+          "Actors": "Stephen Spinella", "Genre": "Comedy, Horror",
+          "Plot": "A homicidal car tire, discovering it has destructive psionic power, sets its sights on a desert town."}
+MEMENTO = {"Response": "True", "Title": "Memento", "Year": "2000", "Director": "Christopher Nolan",
+           "Actors": "Guy Pearce", "Genre": "Mystery", "Plot": "A man with short-term memory loss hunts his wife's murderer."}
+INCEPTION = {"Response": "True", "Title": "Inception", "Year": "2010", "Director": "Christopher Nolan",
+             "Actors": "Leonardo DiCaprio", "Genre": "Sci-Fi", "Plot": "A thief who steals secrets through dream-sharing technology."}
+
+def add_fillers(index, count=MATURE_INDEX_SIZE):
+    """Unrelated movies, so the index is past its small-index discount."""
+    index.add_many({"title": f"Filler Picture {i}", "year": "1990", "keywords": ["drama"]} for i in range(count))
+
+class TestMovieIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = MovieIndex(db_path=None)
+        for data in (HEAT, RUBBER, MEMENTO, INCEPTION):
+            self.index.add_omdb(data)
+        add_fillers(self.index)
+
+    def test_tokens_drop_stopwords_and_stem(self):
+        self.assertEqual(tokens("The movie where a tire kills people"), ["tire", "kill", "people"])
+
+    def test_exact_title_beats_plot_mentions(self):
+        match = self.index.lookup("Heat")
+        self.assertEqual((match["title"], match["confidence"]), ("Heat", 1.0))
+
+    def test_description_matches_cast_and_plot(self):
+        self.assertEqual(self.index.lookup("homicidal car tire")["title"], "Rubber")
+        self.assertEqual(self.index.lookup("Al Pacino De Niro heist")["title"], "Heat")
+
+    def test_ambiguous_and_unknown_queries_are_not_confident(self):
+        self.assertLess(self.index.lookup("Christopher Nolan")["confidence"], 0.8)
+        self.assertIsNone(self.index.lookup("The Matrix"))
+
+    def test_same_movie_is_merged(self):
+        self.index.add_omdb({"Response": "True", "Search": [{"Title": "Heat", "Year": "1995"}, {"Title": "Heat", "Year": "1986"}]})
+        self.assertEqual(self.index.count(), 5 + MATURE_INDEX_SIZE)
+        self.assertEqual(self.index.lookup("Pacino heist")["title"], "Heat")  # Cast kept after the bare re-add
+
+    def test_sequels_and_one_word_descriptions_are_not_confident(self):
+        for query in ("Heat 2", "Inception 2", "Inception II", "the second Heat", "a thief", "the wife", "leonardo dicaprio"):
+            self.assertLess(self.index.lookup(query)["confidence"], MIN_CONFIDENCE, query)
+
+    def test_small_index_only_trusts_exact_titles(self):
+        index = MovieIndex(db_path=None)
+        for data in (HEAT, MEMENTO, INCEPTION):
+            index.add_omdb(data)
+        self.assertEqual(index.lookup("Heat")["confidence"], 1.0)
+        for query in ("Heat 2", "a thief", "leonardo dicaprio", "thief steals secrets dream"):
+            self.assertLess(index.lookup(query)["confidence"], MIN_CONFIDENCE, query)
+
+    def test_sequel_numbers(self):
+        self.assertEqual(sequel_numbers("Toy Story 3"), {3})
+        self.assertEqual(sequel_numbers("the third toy story"), {3})
+        self.assertEqual(sequel_numbers("Rocky IV"), {4})
+        self.assertEqual(sequel_numbers("Blade Runner 2049"), set())
+
+    def test_load_imdb_tsv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "title.basics.tsv.gz")
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                f.write("tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\tendYear\truntimeMinutes\tgenres\n")
+                f.write("tt0245429\tmovie\tSpirited Away\tSen to Chihiro no kamikakushi\t0\t2001\t\\N\t125\tAnimation,Fantasy\n")
+                f.write("tt0903747\ttvSeries\tBreaking Bad\tBreaking Bad\t0\t2008\t2013\t49\tCrime,Drama\n")
+            index = MovieIndex(db_path=None)
+            self.assertEqual(index.load_tsv(path), 1)
+        self.assertEqual(index.lookup("Sen to Chihiro")["title"], "Spirited Away")
+        self.assertIsNone(index.lookup("Breaking Bad"))
+
+class TestTitleSearchUsesIndex(unittest.TestCase):
+
+    def setUp(self):
+        index = MovieIndex(db_path=None)
+        index.add_omdb(RUBBER)
+        add_fillers(index)
+        for p in (patch.object(movie_tools, "movie_index", index),
+                  patch.object(cache_module, "search_cache", TTLCache("search", db_path=None))):
+            p.start()
+            self.addCleanup(p.stop)
+
+    @patch("tools.movie_tools._web_search")
+    def test_confident_match_skips_web_search(self, mock_search):
+        self.assertEqual(movie_tools.get_movie_title_from_search("homicidal car tire"), "Found via search: Rubber")
+        mock_search.assert_not_called()
+
+    @patch("tools.movie_tools._web_search", return_value=[])
+    def test_low_confidence_falls_back_to_web_search(self, mock_search):
+        self.assertEqual(movie_tools.get_movie_title_from_search("a tire in a heist movie with Pacino"), "Search failed.")
+        mock_search.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,17 @@
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import sys
 import os
+import time
+import asyncio
+import threading
 
 # Add parent directory to path so we can import modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from agents.planner import PlannerAgent
 from agents.executor import ExecutorAgent
+from agents.verifier import VerifierAgent
 
 class TestMovieAgent(unittest.TestCase):
 
@@ -15,7 +19,7 @@ class TestMovieAgent(unittest.TestCase):
         """Setup runs before every test."""
         # Mock the LLM client so we don't need a real Groq Key for CI
         self.mock_llm = MagicMock()
-        self.planner = PlannerAgent()
+        self.planner = PlannerAgent(use_fast_path=False) # Exercise the LLM path
         self.planner.llm = self.mock_llm # Inject mock
         
         self.executor = ExecutorAgent()
@@ -55,5 +59,244 @@ class TestMovieAgent(unittest.TestCase):
         self.assertIn("search_movie_details", results)
         self.assertEqual(results["search_movie_details"]["title"], "Mock Movie")
 
+    @patch('agents.executor.get_streaming_info')
+    @patch('agents.executor.get_youtube_trailer')
+    @patch('agents.executor.get_movie_title_from_search')
+    def test_executor_runs_title_dependent_steps_in_parallel(self, mock_title, mock_trailer, mock_streaming):
+        """Steps using THE_MOVIE wait for the search step, then overlap each other."""
+        def slow(result):
+            def tool(arg):
+                time.sleep(0.2)
+                return f"{result} for {arg}"
+            return tool
+
+        mock_title.return_value = "Found via search: Memento"
+        mock_trailer.side_effect = slow("trailer")
+        mock_streaming.side_effect = slow("streaming")
+
+        plan = {
+            "steps": [
+                { "step_id": 1, "tool": "get_movie_title_from_search", "args": "guy with no short term memory" },
+                { "step_id": 2, "tool": "get_youtube_trailer", "args": "THE_MOVIE" },
+                { "step_id": 3, "tool": "get_streaming_info", "args": "THE_MOVIE" }
+            ]
+        }
+
+        stats = {}
+        results = self.executor.execute_plan(plan, run_stats=stats)
+
+        self.assertEqual(list(results), ["get_movie_title_from_search", "get_youtube_trailer", "get_streaming_info"])
+        self.assertEqual(results["get_youtube_trailer"], "trailer for Memento")
+        self.assertEqual(results["get_streaming_info"], "streaming for Memento")
+        self.assertLess(stats["wall_clock_s"], stats["summed_step_latency_s"])
+
+    @patch('agents.executor.search_movie_details')
+    def test_sync_executor_inside_running_loop(self, mock_search):
+        """An async host calling the sync API gets results instead of asyncio.run's RuntimeError."""
+        mock_search.return_value = {"title": "Heat"}
+        plan = { "steps": [ { "step_id": 1, "tool": "search_movie_details", "args": "Heat" } ] }
+
+        async def host():
+            return self.executor.execute_plan(plan)
+
+        self.assertEqual(asyncio.run(host())["search_movie_details"], {"title": "Heat"})
+
+    @patch('agents.executor.get_youtube_trailer')
+    def test_executor_step_timeout(self, mock_trailer):
+        """A hung step is reported as an error instead of stalling the pipeline."""
+        mock_trailer.side_effect = lambda arg: time.sleep(0.5)
+        self.executor.step_timeout = 0.05
+
+        plan = { "steps": [ { "step_id": 1, "tool": "get_youtube_trailer", "args": "Heat" } ] }
+        results = self.executor.execute_plan(plan)
+
+        self.assertIn("timed out", results["get_youtube_trailer"])
+        self.assertEqual(self.executor.execution_stats()["timeouts"], 1)
+
+    @patch('agents.executor.get_youtube_trailer')
+    def test_queued_steps_do_not_time_out(self, mock_trailer):
+        """Sessions share the pool; waiting for a worker does not count against a step's timeout."""
+        mock_trailer.side_effect = lambda arg: time.sleep(0.2) or f"trailer for {arg}"
+        executor = ExecutorAgent(max_workers=2, step_timeout=0.5)
+        plan = { "steps": [ { "step_id": 1, "tool": "get_youtube_trailer", "args": "Heat" } ] }
+
+        runs = [{} for _ in range(8)]
+        sessions = [threading.Thread(target=executor.execute_plan, args=(plan, stats)) for stats in runs]
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+
+        self.assertEqual([stats["timeouts"] for stats in runs], [0] * 8)
+        self.assertEqual(executor.execution_stats()["runs"], 8)
+
+    def test_fast_path_skips_llm(self):
+        """Recognisable requests are planned without calling the LLM."""
+        planner = PlannerAgent()
+        planner.llm = self.mock_llm
+
+        plan = planner.create_plan("Show me the trailer for Inception")
+
+        self.mock_llm.generate_text.assert_not_called()
+        self.assertEqual([s["tool"] for s in plan["steps"]], ["search_movie_details", "get_youtube_trailer"])
+        self.assertEqual(plan["steps"][0]["args"], "Inception")
+        self.assertEqual(plan["steps"][1]["args"], "THE_MOVIE")
+
+    def test_fast_path_falls_back_when_unsure(self):
+        """Follow-ups and vague requests still go to the LLM."""
+        from agents.fast_planner import fast_path_plan
+        self.assertIsNone(fast_path_plan("Who directed it?"))
+        self.assertIsNone(fast_path_plan("Find the trailer for the latest Mission Impossible movie coming out in 2025."))
+
+        plan = fast_path_plan("What is the movie where a car tire comes to life and kills people? I want the trailer.")
+        self.assertEqual([s["tool"] for s in plan["steps"]],
+                         ["get_movie_title_from_search", "search_movie_details", "get_youtube_trailer"])
+
+    def test_planner_logic_async(self):
+        """The async planner shares parsing with the sync one."""
+        self.planner.async_llm = AsyncMock()
+        self.planner.async_llm.generate_text.return_value = '{"steps": [{"tool": "get_youtube_trailer", "args": "Heat"}]}'
+
+        plan = asyncio.run(self.planner.create_plan_async("Heat trailer"))
+
+        self.assertEqual(plan["steps"][0]["step_id"], 1)
+        self.assertEqual(plan["steps"][0]["tool"], "get_youtube_trailer")
+
+    @patch('agents.executor.search_movie_details_async', new_callable=AsyncMock)
+    @patch('agents.executor.get_movie_title_from_search_async', new_callable=AsyncMock)
+    def test_executor_logic_async(self, mock_title, mock_search):
+        """The async executor resolves placeholders like the sync one."""
+        mock_title.return_value = "Found via search: Heat"
+        mock_search.return_value = {"title": "Heat", "year": "1995"}
+
+        plan = {
+            "steps": [
+                { "step_id": 1, "tool": "get_movie_title_from_search", "args": "bank robbery movie with De Niro" },
+                { "step_id": 2, "tool": "search_movie_details", "args": "THE_MOVIE" }
+            ]
+        }
+
+        results = asyncio.run(self.executor.execute_plan_async(plan))
+
+        mock_search.assert_awaited_once_with("Heat")
+        self.assertEqual(results["search_movie_details"]["year"], "1995")
+
+    def test_verifier_stream_records_timings(self):
+        """The streaming verifier yields chunks and reports time-to-first-token."""
+        verifier = VerifierAgent()
+        verifier.llm = MagicMock()
+        verifier.llm.stream_text.return_value = iter(["Heat ", "(1995)"])
+        timings = {}
+
+        chunks = list(verifier.verify_and_respond_stream("Heat", {"search_movie_details": {"title": "Heat"}}, timings))
+
+        self.assertEqual("".join(chunks), "Heat (1995)")
+        self.assertIsNotNone(timings["ttft_s"])
+        self.assertGreaterEqual(timings["total_s"], timings["ttft_s"])
+
+    def test_runtime_is_built_once(self):
+        """Every caller shares the same agents."""
+        from runtime import get_runtime
+        self.assertIs(get_runtime(), get_runtime())
+        self.assertIs(get_runtime().executor, get_runtime().executor)
+
+    def test_warm_runtime_after_cold_one(self):
+        """warm=True warms the shared runtime even if a cold caller built it, and only once."""
+        import runtime
+        with patch.object(runtime, "_runtime", None), patch.object(runtime.AgentRuntime, "_warm_up") as warm_up:
+            cold = runtime.get_runtime()
+            self.assertFalse(cold.warmed)
+            self.assertIs(runtime.get_runtime(warm=True), cold)
+            runtime.get_runtime(warm=True)
+        self.assertTrue(cold.warmed)
+        warm_up.assert_called_once()
+
+class TestBulkLookup(unittest.TestCase):
+
+    def setUp(self):
+        import httpx
+        from tools import http_client, movie_tools
+        from utils.cache import SWRCache
+
+        self.requested = []
+
+        def handler(request):
+            title = request.url.params["t"]
+            self.requested.append(title)
+            return httpx.Response(200, json={"Response": "True", "Title": title, "Year": "1995"})
+
+        http_client.set_transport(httpx.MockTransport(handler), httpx.MockTransport(handler))
+        self.addCleanup(http_client.set_transport)
+        cache = patch.object(movie_tools, "details_cache", SWRCache("omdb", 60, 60, db_path=None))
+        self.cache = cache.start()
+        self.addCleanup(cache.stop)
+        self.tools = movie_tools
+
+    def test_bulk_dedupes_and_keeps_input_order(self):
+        self.tools.search_movie_details("Ronin")  # Already cached
+        self.requested.clear()
+
+        results = self.tools.search_movies_bulk(["Heat", "Ronin", "heat", "Thief - IMDb"])
+
+        self.assertEqual([r["title"] for r in results], ["Heat", "Ronin", "Heat", "Thief"])
+        self.assertEqual(sorted(self.requested), ["Heat", "Thief"])
+
+    def test_bulk_async(self):
+        results = asyncio.run(self.tools.search_movies_bulk_async("Heat, Collateral and Heat"))
+        self.assertEqual([r["title"] for r in results], ["Heat", "Collateral", "Heat"])
+        self.assertEqual(sorted(self.requested), ["Collateral", "Heat"])
+
+    def test_compare_is_one_bulk_step(self):
+        from agents.fast_planner import fast_path_plan
+        plan = fast_path_plan("Compare Heat, Collateral and Thief")
+        self.assertEqual([(s["tool"], s["args"]) for s in plan["steps"]],
+                         [("search_movies_bulk", "Heat | Collateral | Thief")])
+
+        results = ExecutorAgent().execute_plan(plan)
+        self.assertEqual([r["title"] for r in results["search_movies_bulk"]], ["Heat", "Collateral", "Thief"])
+
+class TestSpeculativeExecution(unittest.TestCase):
+
+    PLAN = {
+        "steps": [
+            { "step_id": 1, "tool": "get_movie_title_from_search", "args": "tire that comes to life" },
+            { "step_id": 2, "tool": "search_movie_details", "args": "THE_MOVIE" }
+        ]
+    }
+
+    def run_with_candidate(self, candidate, final, run_stats=None):
+        from tools.movie_tools import title_candidate_listener
+        lookups = []
+
+        def title_search(query):
+            title_candidate_listener.get()(candidate)  # Top search hit, before the LLM refines it
+            time.sleep(0.2)
+            return f"Found via search: {final}"
+
+        def details(title):
+            lookups.append(title)
+            time.sleep(0.1)
+            return {"title": title}
+
+        executor = ExecutorAgent(speculative=True)
+        with patch('agents.executor.get_movie_title_from_search', side_effect=title_search), \
+             patch('agents.executor.search_movie_details', side_effect=details):
+            results = executor.execute_plan(self.PLAN, run_stats=run_stats)
+        return executor, results, lookups
+
+    def test_confirmed_candidate_is_reused(self):
+        stats = {}
+        executor, results, lookups = self.run_with_candidate("Rubber", "Rubber", stats)
+        self.assertEqual(results["search_movie_details"], {"title": "Rubber"})
+        self.assertEqual(lookups, ["Rubber"])
+        self.assertEqual(stats["speculation"]["hits"], 1)
+        self.assertGreater(executor.speculation_stats()["saved_s"], 0.05)
+
+    def test_wrong_candidate_is_redone(self):
+        executor, results, lookups = self.run_with_candidate("Rubber Soul", "Rubber")
+        self.assertEqual(results["search_movie_details"], {"title": "Rubber"})
+        self.assertEqual(lookups, ["Rubber Soul", "Rubber"])
+        self.assertEqual(executor.speculation_stats()["hit_rate"], 0.0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
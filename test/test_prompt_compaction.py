@@ -0,0 +1,72 @@
+import unittest
+from types import SimpleNamespace
+import os
+import sys
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from llm.compaction import trim_history, compact
+from llm.tokens import TokenLedger, count_tokens, usage_tokens
+from agents.planner import PlannerAgent
+from benchmarks.bench_prompts import run_benchmark
+
+HISTORY = "\n".join([
+    "User: Who directed Heat?",
+    "Assistant: " + "Heat (1995) is directed by Michael Mann. " * 20,
+    "User: Show me the trailer for Inception",
+    "Assistant: Here is the trailer for Inception (2010).",
+    "User: Who directed it?",
+])
+
+class TestPromptCompaction(unittest.TestCase):
+
+    def test_trim_history_fits_budget_and_keeps_newest(self):
+        trimmed = trim_history(HISTORY, budget=40, current_request="Who directed it?")
+        self.assertLessEqual(count_tokens(trimmed), 40)
+        self.assertTrue(trimmed.endswith("Here is the trailer for Inception (2010)."))
+        self.assertNotIn("Who directed it?", trimmed)  # Stated separately in the prompt
+
+    def test_long_answers_are_cut(self):
+        trimmed = trim_history(HISTORY, budget=300)
+        self.assertIn("Heat (1995)", trimmed)
+        self.assertLess(count_tokens(trimmed), count_tokens(HISTORY))
+
+    def test_compact_drops_empty_fields(self):
+        text = compact({"Title": "Heat", "Year": "1995", "Awards": "N/A", "Ratings": []})
+        self.assertEqual(text, "Title: Heat; Year: 1995")
+        self.assertEqual(compact([{"Title": "Heat"}, {"Title": "Ronin"}]), "- Title: Heat\n- Title: Ronin")
+
+    def test_compact_planner_prompt_is_smaller(self):
+        planner = PlannerAgent(use_fast_path=False, compact_prompts=True)
+        full = planner._build_full_prompt("Who directed it?", HISTORY)
+        compact_prompt = planner._build_prompt("Who directed it?", HISTORY)
+        self.assertIn("<<< Who directed it? >>>", compact_prompt)
+        self.assertIn("Inception", compact_prompt)
+        self.assertLess(count_tokens(compact_prompt), count_tokens(full) * 0.8)
+
+class TestTokenLedger(unittest.TestCase):
+
+    def test_records_usage_and_estimate_error(self):
+        ledger = TokenLedger()
+        prompt, completion = usage_tokens(SimpleNamespace(prompt_tokens=110, completion_tokens=20))
+        ledger.record("planner", 100, prompt, completion)
+        ledger.record("planner", 100, cached=True)
+        stats = ledger.stats()["planner"]
+        self.assertEqual((stats["calls"], stats["cached"]), (2, 1))
+        self.assertEqual(stats["avg_prompt_tokens"], 110)
+        self.assertEqual(stats["estimate_error"], round(100 / 110 - 1, 3))
+
+    def test_missing_usage_counts_as_zero(self):
+        self.assertEqual(usage_tokens(None), (0, 0))
+
+class TestPromptBenchmark(unittest.TestCase):
+
+    def test_same_plans_with_fewer_tokens(self):
+        report = run_benchmark()
+        self.assertTrue(report["identical_plans"], report["differing_plans"])
+        for name in ("planner", "verifier"):
+            self.assertGreater(report["token_reduction"][name], 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import movie_tools
+from tools.movie_index import MovieIndex, MATURE_INDEX_SIZE
+from tools.resilience import Backend, BackendUnavailable, CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+from utils.cache import TTLCache
+from utils import cache as cache_module
+
+HEAT = {"Response": "True", "Title": "Heat", "Year": "1995", "Director": "Michael Mann",
+        "Actors": "Al Pacino, Robert De Niro", "Genre": "Action, Crime",
+        "Plot": "A group of professional thieves start to feel the heat from the LAPD after their latest heist."}
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _fail():
+    raise ConnectionError("backend down")
+
+def _raising(error):
+    def call():
+        raise error
+    return call
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        backend = Backend("test", hedge=False, breaker=CircuitBreaker("test", failure_threshold=3))
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                backend.call(_fail)
+        self.assertEqual(backend.breaker.state, OPEN)
+        with self.assertRaises(BackendUnavailable):
+            backend.call(lambda: "never called")
+        self.assertEqual(backend.stats()["breaker"]["rejected"], 1)
+
+    def test_half_open_trial_closes_or_reopens(self):
+        clock = _Clock()
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30, clock=clock)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        clock.now = 31
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow())  # Only one trial call at a time
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+        clock.now = 62
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_only_outages_count_as_failures(self):
+        from ddgs.exceptions import DDGSException
+        backend = Backend("test", hedge=False, breaker=CircuitBreaker("test", failure_threshold=2))
+        for error in (ValueError("not JSON"), KeyError("Title"), ValueError("bad request")):
+            with self.assertRaises(Exception):
+                backend.call(_raising(error))
+        self.assertEqual(backend.breaker.state, CLOSED)
+        for error in (TimeoutError("slow"), DDGSException("https://html.duckduckgo.com 502")):
+            with self.assertRaises(Exception):
+                backend.call(_raising(error))
+        self.assertEqual(backend.breaker.state, OPEN)
+
+    def test_search_without_hits_is_not_a_failure(self):
+        from ddgs.exceptions import DDGSException
+
+        class _DDGS:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def text(self, query, max_results):
+                raise DDGSException(movie_tools.NO_RESULTS)
+
+        with patch("ddgs.DDGS", _DDGS):
+            for _ in range(10):
+                self.assertEqual(movie_tools._web_search("an obscure short film"), [])
+        self.assertEqual(movie_tools.ddgs_backend.breaker.state, CLOSED)
+
+class TestHedging(unittest.TestCase):
+
+    def slow_first_call(self):
+        calls = []
+
+        def fetch():
+            calls.append(len(calls))
+            time.sleep(1.0 if len(calls) == 1 else 0.01)
+            return f"answer {len(calls)}"
+        return fetch
+
+    def test_slow_call_is_hedged_and_hedge_wins(self):
+        backend = Backend("test")
+        with patch.object(backend.latency, "hedge_delay", return_value=0.05):
+            started = time.perf_counter()
+            self.assertEqual(backend.call(self.slow_first_call()), "answer 2")
+        self.assertLess(time.perf_counter() - started, 0.5)
+        stats = backend.stats()
+        self.assertEqual((stats["hedged"], stats["hedge_wins"], stats["hedge_win_rate"]), (1, 1, 1.0))
+
+    def test_fast_call_is_not_hedged(self):
+        backend = Backend("test")
+        self.assertEqual(backend.call(lambda: "quick"), "quick")
+        self.assertEqual(backend.stats()["hedged"], 0)
+
+    def test_async_hedge_cancels_the_loser(self):
+        backend = Backend("test")
+        attempts = []
+
+        async def fetch():
+            attempts.append(None)
+            await asyncio.sleep(1.0 if len(attempts) == 1 else 0.01)
+            return len(attempts)
+
+        with patch.object(backend.latency, "hedge_delay", return_value=0.05):
+            started = time.perf_counter()
+            self.assertEqual(asyncio.run(backend.call_async(fetch)), 2)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(backend.stats()["hedge_wins"], 1)
+
+class TestTitleSearchFallback(unittest.TestCase):
+
+    def setUp(self):
+        index = MovieIndex(db_path=None)
+        index.add_omdb(HEAT)
+        index.add_many({"title": f"Filler Picture {i}", "year": "1990"} for i in range(MATURE_INDEX_SIZE))
+        for p in (patch.object(movie_tools, "movie_index", index),
+                  patch.object(cache_module, "search_cache", TTLCache("search", db_path=None))):
+            p.start()
+            self.addCleanup(p.stop)
+
+    @patch("tools.movie_tools.INDEX_MIN_CONFIDENCE", 1.1)
+    @patch("tools.movie_tools._web_search", side_effect=BackendUnavailable("ddgs is unavailable (circuit open)"))
+    def test_open_circuit_falls_back_to_index(self, mock_search):
+        self.assertEqual(movie_tools.get_movie_title_from_search("Pacino De Niro heist"), "Found via search: Heat")
+        self.assertEqual(movie_tools.get_movie_title_from_search("a dog on the moon"), "Search failed.")
+
+if __name__ == '__main__':
+    unittest.main()
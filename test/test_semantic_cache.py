@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import movie_tools
+from tools.movie_index import MovieIndex
+from tools.semantic_cache import SemanticCache, HashingEmbedder, SEMANTIC_CACHE_THRESHOLD, series_position
+from utils.cache import TTLCache
+from utils import cache as cache_module
+from benchmarks.eval_semantic_cache import evaluate
+
+class TestSemanticCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SemanticCache(path="")
+        self.cache.put("movie where a car tire comes to life and kills people", "Rubber")
+        self.cache.put("movie where thieves steal secrets from people's dreams", "Inception")
+
+    def test_rewording_hits(self):
+        hit = self.cache.lookup("Film where the car tire comes to life and kills all the people!")
+        self.assertEqual(hit["title"], "Rubber")
+        self.assertGreaterEqual(hit["similarity"], SEMANTIC_CACHE_THRESHOLD)
+
+    def test_unrelated_query_misses(self):
+        self.assertIsNone(self.cache.lookup("movie about a giant shark attacking a beach town"))
+        self.assertIsNone(self.cache.lookup("the movie"))  # Only stopwords
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    def test_other_film_of_a_series_is_refused(self):
+        cache = SemanticCache(path="", threshold=0.5)
+        cache.put("toy story 2", "Toy Story 2")
+        cache.put("the first harry potter movie", "Harry Potter and the Sorcerer's Stone")
+        self.assertIsNone(cache.lookup("toy story 3"))
+        self.assertIsNone(cache.lookup("the third toy story"))
+        self.assertIsNone(cache.lookup("the last harry potter movie"))
+        self.assertEqual(cache.lookup("Toy Story II")["title"], "Toy Story 2")
+        self.assertEqual(cache.stats()["refused"], 3)
+
+    def test_one_changed_word_misses_at_default_threshold(self):
+        self.cache.put("movie where a guy cannot form new memories", "Memento")
+        self.assertIsNone(self.cache.lookup("movie where a guy cannot form new friendships"))
+
+    def test_series_position(self):
+        self.assertEqual(series_position("Rocky IV, the second sequel"), ({4, 2}, {"sequel"}))
+        self.assertEqual(series_position("the final Harry Potter part 1"), (set(), {"final"}))
+
+    def test_embedding_is_stable_and_normalized(self):
+        a = HashingEmbedder().features("short-term memory loss")
+        self.assertEqual(a, HashingEmbedder().features("short term memory loss"))
+        self.assertAlmostEqual(sum(v * v for v in a.values()), 1.0)
+
+    def test_oldest_entries_are_evicted(self):
+        cache = SemanticCache(path="", max_entries=2)
+        for title in ("Heat", "Rubber", "Memento"):
+            cache.put(f"the {title} query", title)
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertIsNone(cache.lookup("the Heat query"))
+        self.assertEqual(cache.lookup("the Memento query")["title"], "Memento")
+
+    def test_persists_to_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "semantic")
+            cache = SemanticCache(path=path)
+            cache.put("movie where a car tire comes to life and kills people", "Rubber")
+            cache.flush()
+            reloaded = SemanticCache(path=path)
+            self.assertEqual(reloaded.lookup("car tire comes to life and kills people")["title"], "Rubber")
+
+    def test_processes_sharing_the_files_keep_each_others_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "semantic")
+            first, second = SemanticCache(path=path), SemanticCache(path=path)  # Two workers
+            first.open(), second.open()
+            first.put("movie where a car tire comes to life and kills people", "Rubber")
+            second.put("movie where thieves steal secrets from people's dreams", "Inception")
+            first.flush()
+            second.flush()
+            reloaded = SemanticCache(path=path)
+            self.assertEqual(reloaded.stats()["entries"], 0)  # Loaded on first use
+            self.assertEqual(reloaded.lookup("car tire comes to life and kills people")["title"], "Rubber")
+            self.assertEqual(reloaded.lookup("thieves steal secrets from people's dreams")["title"], "Inception")
+            self.assertEqual(reloaded.stats()["entries"], 2)
+            self.assertFalse([name for name in os.listdir(tmp) if name.endswith(".tmp")])
+
+    def test_labeled_set_has_no_false_hits_at_default_threshold(self):
+        report = evaluate()
+        self.assertGreater(report["near_misses"], 0)
+        self.assertEqual(report["false_hits"], [])
+        self.assertGreater(report["recall"], 0.0)
+
+class TestTitleSearchUsesSemanticCache(unittest.TestCase):
+
+    def setUp(self):
+        self.semantic = SemanticCache(path="")
+        for p in (patch.object(movie_tools, "semantic_cache", self.semantic),
+                  patch.object(movie_tools, "movie_index", MovieIndex(db_path=None)),
+                  patch.object(movie_tools, "llm_client", None),
+                  patch.object(cache_module, "search_cache", TTLCache("search", db_path=None))):
+            p.start()
+            self.addCleanup(p.stop)
+
+    @patch("tools.movie_tools._web_search", return_value=[{"title": "Rubber", "body": "A tire comes to life."}])
+    def test_paraphrase_skips_web_search(self, mock_search):
+        first = movie_tools.get_movie_title_from_search("movie where a car tire comes to life and kills people")
+        second = movie_tools.get_movie_title_from_search("the movie where a car tire comes to life and kills")
+        self.assertEqual(first, second)
+        mock_search.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server import Admission, ApiServer, RestartPolicy, listen
+
+PLAN = {"steps": [{"step_id": 1, "tool": "search_movie_details", "args": "Heat"}]}
+
+class _Agent:
+    def __init__(self, method, fn):
+        setattr(self, method, fn)
+
+class _Runtime:
+    """Stands in for AgentRuntime; each question takes `delay` seconds."""
+
+    def __init__(self, delay=0.0):
+        self.planner = _Agent("create_plan", lambda query, chat_history="": PLAN)
+        self.executor = _Agent("execute_plan", lambda plan: {"search_movie_details": {"title": "Heat"}})
+        self.verifier = _Agent("verify_and_respond", self.verify)
+        self.delay = delay
+
+    def verify(self, query, results):
+        time.sleep(self.delay)
+        return f"{results['search_movie_details']['title']} is a 1995 crime film."
+
+    def stats(self):
+        return {"planner": {}}
+
+class TestApiServer(unittest.TestCase):
+
+    def start(self, runtime, admission=None):
+        server = ApiServer(listen("127.0.0.1", 0), runtime, admission)
+        server.ready = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def request(self, server, method, path, body=None):
+        conn = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        self.addCleanup(conn.close)
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read()), response
+
+    def test_ask_runs_the_pipeline(self):
+        server = self.start(_Runtime())
+        status, body, _ = self.request(server, "POST", "/v1/ask", {"query": "Who directed Heat?"})
+        self.assertEqual(status, 200)
+        self.assertEqual(body["answer"], "Heat is a 1995 crime film.")
+        self.assertEqual(body["plan"], PLAN)
+
+    def test_bad_requests(self):
+        server = self.start(_Runtime())
+        self.assertEqual(self.request(server, "POST", "/v1/ask", {"query": " "})[0], 400)
+        self.assertEqual(self.request(server, "POST", "/v1/ask", ["Heat"])[0], 400)
+        self.assertEqual(self.request(server, "GET", "/nope")[0], 404)
+
+    def test_bad_content_length_answers_400(self):
+        server = self.start(_Runtime())
+        for length in ("abc", "-1"):
+            conn = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+            self.addCleanup(conn.close)
+            conn.putrequest("POST", "/v1/ask")
+            conn.putheader("Content-Length", length)
+            conn.endheaders()
+            self.assertEqual(conn.getresponse().status, 400)
+
+    def test_saturated_worker_answers_429(self):
+        server = self.start(_Runtime(delay=0.5), Admission(max_concurrency=1, max_queue=0))
+        busy = threading.Thread(target=self.request, args=(server, "POST", "/v1/ask", {"query": "Heat"}))
+        busy.start()
+        time.sleep(0.1)
+        status, _, response = self.request(server, "POST", "/v1/ask", {"query": "Heat"})
+        busy.join()
+        self.assertEqual((status, response.getheader("Retry-After")), (429, "1"))
+        self.assertEqual(server.admission.stats()["rejected"], 1)
+
+    def test_drain_finishes_in_flight_requests(self):
+        server = self.start(_Runtime(delay=0.3))
+        answers = []
+        worker = threading.Thread(target=lambda: answers.append(self.request(server, "POST", "/v1/ask", {"query": "Heat"})))
+        worker.start()
+        time.sleep(0.1)
+        drain = threading.Thread(target=server.admission.drain, args=(5,))
+        drain.start()
+        time.sleep(0.05)
+        self.assertEqual(self.request(server, "GET", "/readyz")[0], 503)
+        self.assertEqual(self.request(server, "POST", "/v1/ask", {"query": "Heat"})[0], 503)
+        self.assertEqual(self.request(server, "GET", "/healthz")[0], 200)
+        worker.join()
+        drain.join()
+        self.assertEqual(answers[0][0], 200)
+
+class TestAdmission(unittest.TestCase):
+
+    def test_queued_request_waits_for_a_slot(self):
+        admission = Admission(max_concurrency=1, max_queue=1, queue_timeout=2)
+        self.assertTrue(admission.enter())
+        threading.Timer(0.1, admission.leave).start()
+        self.assertTrue(admission.enter())
+        self.assertEqual(admission.stats()["admitted"], 2)
+
+    def test_queue_timeout(self):
+        admission = Admission(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+        self.assertTrue(admission.enter())
+        self.assertFalse(admission.enter())
+        self.assertEqual(admission.stats()["timed_out"], 1)
+
+class TestRestartPolicy(unittest.TestCase):
+
+    def test_crashing_workers_back_off_then_give_up(self):
+        policy = RestartPolicy(max_crashes=4, min_uptime=5, base_delay=0.5, max_delay=1.5)
+        self.assertEqual([policy.on_exit(0.1) for _ in range(3)], [0.5, 1.0, 1.5])
+        self.assertIsNone(policy.on_exit(0.1))
+
+    def test_worker_that_ran_a_while_is_replaced_at_once(self):
+        policy = RestartPolicy(max_crashes=2)
+        self.assertEqual(policy.on_exit(0.1), RestartPolicy().base_delay)
+        self.assertEqual(policy.on_exit(60), 0.0)
+        self.assertEqual(policy.on_exit(0.1), RestartPolicy().base_delay)  # The count starts over
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.bench_startup import measure, parse_importtime
+from tools.movie_index import MovieIndex
+from utils.cache import TTLCache
+
+class TestStartup(unittest.TestCase):
+
+    def test_importing_runtime_loads_no_sdk_and_writes_nothing(self):
+        report = measure("runtime", runs=1)
+        self.assertEqual(report["heavy"], [])
+        self.assertEqual(report["files_created"], [])
+        self.assertGreater(report["import_ms"], 0)
+
+    def test_parse_importtime(self):
+        rows = parse_importtime("import time: self [us] | cumulative | imported package\n"
+                                "import time:       120 |        120 |   utils.tracing\n"
+                                "import time:       900 |       1020 | runtime\n")
+        self.assertEqual(rows, [("utils.tracing", 120, 120, 1), ("runtime", 900, 1020, 0)])
+
+class TestLazyBackends(unittest.TestCase):
+
+    def test_sqlite_files_created_on_first_use(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path, index_path = os.path.join(tmp, "cache.db"), os.path.join(tmp, "index.db")
+            cache, index = TTLCache("lazy", db_path=cache_path), MovieIndex(db_path=index_path)
+            self.assertFalse(os.path.exists(cache_path) or os.path.exists(index_path))
+
+            cache.set("k", "v")
+            index.add({"title": "Heat", "year": "1995"})
+            self.assertTrue(os.path.exists(cache_path) and os.path.exists(index_path))
+            self.assertEqual(TTLCache("lazy", db_path=cache_path).get("k"), "v")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import tracing
+from utils.tracing import Tracer, NOOP_SPAN, trace, span, current_span
+from agents.executor import ExecutorAgent
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(tracing, "tracer", Tracer(enabled=True, path=None))
+        self.tracer = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def spans(self, name):
+        return [s for s in self.tracer.spans if s["name"] == name]
+
+    def test_nested_spans_share_the_trace(self):
+        with trace("user_query", query="Heat") as root:
+            with span("create_plan") as child:
+                child.set("route", "fast_path")
+                current_span().incr("retries")
+
+        root_record, child_record = self.spans("user_query")[0], self.spans("create_plan")[0]
+        self.assertIsNone(root_record["parent_id"])
+        self.assertEqual(child_record["parent_id"], root_record["span_id"])
+        self.assertEqual(child_record["trace_id"], root.trace_id)
+        self.assertEqual(child_record["attrs"], {"route": "fast_path", "retries": 1})
+
+    def test_errors_are_recorded(self):
+        with self.assertRaises(ValueError):
+            with trace("user_query"):
+                raise ValueError("boom")
+        record = self.spans("user_query")[0]
+        self.assertEqual(record["status"], "error")
+        self.assertIn("boom", record["attrs"]["error"])
+
+    def test_disabled_and_outside_a_trace_are_noops(self):
+        self.assertIs(span("orphan"), NOOP_SPAN)
+        with patch.object(tracing, "tracer", Tracer(enabled=False, path=None)):
+            self.assertIs(trace("user_query"), NOOP_SPAN)
+        self.assertEqual(self.tracer.spans, [])
+
+    def test_executor_steps_are_children_in_threads_and_tasks(self):
+        def stub(arg):
+            with span("tool"):
+                return {"title": arg}
+        plan = {"steps": [{"step_id": 1, "tool": "search_movie_details", "args": "Heat"},
+                          {"step_id": 2, "tool": "get_streaming_info", "args": "THE_MOVIE"}]}
+
+        with patch("agents.executor.search_movie_details", stub), patch("agents.executor.get_streaming_info", stub):
+            with trace("user_query"):
+                ExecutorAgent().execute_plan(plan)
+
+        execute = self.spans("execute_plan")[0]
+        steps = self.spans("step")
+        self.assertEqual(len(steps), 2)
+        self.assertTrue(all(s["parent_id"] == execute["span_id"] for s in steps))
+        step_ids = {s["span_id"] for s in steps}
+        self.assertTrue(all(t["parent_id"] in step_ids for t in self.spans("tool")))
+
+    def test_async_tasks_inherit_the_span(self):
+        async def child():
+            with span("child"):
+                await asyncio.sleep(0)
+
+        async def main():
+            with trace("user_query"):
+                await asyncio.gather(child(), child())
+
+        asyncio.run(main())
+        root = self.spans("user_query")[0]
+        self.assertEqual([s["parent_id"] for s in self.spans("child")], [root["span_id"]] * 2)
+
+    def test_jsonl_export(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "traces.jsonl")
+            tracer = Tracer(enabled=True, path=path)
+            with tracer.trace("user_query"):
+                with tracer.span("verify"):
+                    pass
+            tracer.close()
+            with open(path, encoding="utf-8") as f:
+                names = [json.loads(line)["name"] for line in f]
+        self.assertEqual(names, ["verify", "user_query"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+"""
+Shared HTTP transport for the movie tools (OMDb, YouTube).
+
+One pooled httpx client per process (and one async client per event loop) so
+calls reuse keep-alive connections instead of paying a new TCP+TLS handshake
+every time. Every request gets connect/read timeouts, bounded retries with
+jittered backoff, and a per-host concurrency cap. Per-host latency and
+connection reuse are tracked for `get_http_stats()`.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+from utils.tracing import span, current_span
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 10))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 2))
+PER_HOST_CONCURRENCY = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", 8))
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 32))
+KEEPALIVE_EXPIRY = 30.0
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 4.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _httpx():
+    # httpx takes ~100ms to import; deferred until the first client is built
+    import httpx
+    return httpx
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+class HttpTransport:
+    def __init__(self, transport=None, async_transport=None, max_retries=MAX_RETRIES,
+                 per_host_concurrency=PER_HOST_CONCURRENCY):
+        # `transport` / `async_transport` let tests and benchmarks swap in e.g. httpx.MockTransport
+        self.transport = transport
+        self.async_transport = async_transport
+        self.max_retries = max_retries
+        self.per_host_concurrency = per_host_concurrency
+
+        self._lock = threading.Lock()
+        self._client = None
+        self._host_slots = {}
+        self._async_state = weakref.WeakKeyDictionary()  # event loop -> (AsyncClient, {host: Semaphore})
+        self._stats = {}
+
+    # --- Clients (built on first use) ---
+    @staticmethod
+    def _client_options():
+        httpx = _httpx()
+        return {"timeout": httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                "limits": httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS,
+                                       keepalive_expiry=KEEPALIVE_EXPIRY)}
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = _httpx().Client(transport=self.transport, **self._client_options())
+            return self._client
+
+    def _get_host_slot(self, host):
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_concurrency)
+            return self._host_slots[host]
+
+    def _get_async_state(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._async_state:
+                client = _httpx().AsyncClient(transport=self.async_transport, **self._client_options())
+                self._async_state[loop] = (client, {})
+            return self._async_state[loop]
+
+    # --- Stats ---
+    def _host_stats(self, host):
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = self._stats.setdefault(host, {
+                "requests": 0, "retries": 0, "errors": 0, "new_connections": 0,
+                "latency_total_s": 0.0, "latency_max_s": 0.0,
+            })
+        return stats
+
+    def _record(self, host, latency=None, retried=False, failed=False):
+        with self._lock:
+            stats = self._host_stats(host)
+            if latency is not None:
+                stats["requests"] += 1
+                stats["latency_total_s"] += latency
+                stats["latency_max_s"] = max(stats["latency_max_s"], latency)
+            if retried:
+                stats["retries"] += 1
+            if failed:
+                stats["errors"] += 1
+
+    def _on_connect(self, host):
+        current_span().incr("new_connections")
+        with self._lock:
+            self._host_stats(host)["new_connections"] += 1
+
+    def _trace(self, host):
+        def trace(event, info):
+            if event == "connection.connect_tcp.started":
+                self._on_connect(host)
+        return trace
+
+    def _async_trace(self, host):
+        async def trace(event, info):
+            if event == "connection.connect_tcp.started":
+                self._on_connect(host)
+        return trace
+
+    def stats(self):
+        """Per-host request count, latency and connection reuse."""
+        report = {}
+        with self._lock:
+            for host, stats in self._stats.items():
+                requests = stats["requests"]
+                report[host] = dict(stats)
+                report[host]["latency_avg_s"] = round(stats["latency_total_s"] / requests, 4) if requests else 0.0
+                report[host]["reused_connections"] = max(0, requests - stats["new_connections"])
+        return report
+
+    # --- Requests ---
+    def _should_retry(self, attempt, response=None):
+        if attempt >= self.max_retries:
+            return False
+        return response is None or response.status_code in RETRY_STATUSES
+
+    def get_json(self, url, params=None):
+        """GET `url` and decode the JSON body, retrying transient failures."""
+        host = urlsplit(url).netloc
+        client = self._get_client()
+
+        with span("http.get", host=host, path=urlsplit(url).path) as http_span:
+            for attempt in range(self.max_retries + 1):
+                http_span.set("retries", attempt)
+                started = time.perf_counter()
+                try:
+                    with self._get_host_slot(host):
+                        response = client.get(url, params=params, extensions={"trace": self._trace(host)})
+                except _httpx().TransportError:
+                    self._record(host, time.perf_counter() - started, failed=True)
+                    if not self._should_retry(attempt):
+                        raise
+                else:
+                    self._record(host, time.perf_counter() - started)
+                    http_span.set("status", response.status_code)
+                    if not self._should_retry(attempt, response):
+                        if response.status_code in RETRY_STATUSES:
+                            response.raise_for_status()
+                        return response.json()
+
+                self._record(host, retried=True)
+                time.sleep(_backoff(attempt))
+
+    async def get_json_async(self, url, params=None):
+        """Async version of get_json."""
+        host = urlsplit(url).netloc
+        client, host_slots = self._get_async_state()
+        slot = host_slots.get(host)
+        if slot is None:
+            slot = host_slots.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+
+        with span("http.get", host=host, path=urlsplit(url).path) as http_span:
+            for attempt in range(self.max_retries + 1):
+                http_span.set("retries", attempt)
+                started = time.perf_counter()
+                try:
+                    async with slot:
+                        response = await client.get(url, params=params, extensions={"trace": self._async_trace(host)})
+                except _httpx().TransportError:
+                    self._record(host, time.perf_counter() - started, failed=True)
+                    if not self._should_retry(attempt):
+                        raise
+                else:
+                    self._record(host, time.perf_counter() - started)
+                    http_span.set("status", response.status_code)
+                    if not self._should_retry(attempt, response):
+                        if response.status_code in RETRY_STATUSES:
+                            response.raise_for_status()
+                        return response.json()
+
+                self._record(host, retried=True)
+                await asyncio.sleep(_backoff(attempt))
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# Shared instance used by tools/movie_tools.py (always fetch it through get_http())
+http_client = HttpTransport()
+
+
+def get_http():
+    return http_client
+
+
+def set_transport(transport=None, async_transport=None, **kwargs):
+    """
+    Replaces the shared transport, e.g. with httpx.MockTransport for tests
+    and offline benchmarks. Call with no arguments to go back to the network.
+    """
+    global http_client
+    http_client.close()
+    http_client = HttpTransport(transport=transport, async_transport=async_transport, **kwargs)
+    return http_client
+
+
+def get_http_stats():
+    return http_client.stats()
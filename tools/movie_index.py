@@ -0,0 +1,437 @@
+"""
+Local movie index: resolves a title or a description to a movie without web
+search.
+
+Movies (title, year, aliases, director/cast and plot/genre keywords) live in
+SQLite next to the search cache, with two FTS5 tables on top:
+
+- movie_terms: an inverted index over word tokens, ranked with BM25
+  (title and aliases weigh more than people, people more than plot words).
+- movie_grams: a trigram index over titles and aliases, for queries that
+  are a (possibly misspelled) title.
+
+lookup() ranks the candidates from both and returns the best one with a
+confidence between 0 and 1: how much of the query it explains (IDF-weighted
+term coverage, or trigram similarity for title-like queries), lowered when
+the runner-up is nearly as good. Only an exact title is trusted as-is; the
+confidence also drops when:
+- a description matches fewer than MIN_MATCHED_TERMS terms ("a thief"),
+  only names people ("leonardo dicaprio"), or has terms no movie in the
+  index mentions
+- the query and the title disagree on a sequel number ("Heat 2" vs Heat)
+- the index is still small (below MATURE_INDEX_SIZE movies): a description
+  or near-title that fits the one movie it knows may well fit others it
+  does not
+Callers only trust it above a threshold and fall back to DuckDuckGo + LLM
+otherwise.
+
+The index grows from every OMDb response the tools see, and can be seeded
+from an IMDb-datasets-style TSV dump:
+
+    python -m tools.movie_index build title.basics.tsv.gz
+    python -m tools.movie_index lookup "the one where a tire comes to life"
+"""
+import argparse
+import csv
+import gzip
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+
+from logger import get_logger
+
+logger = get_logger("MovieIndex")
+
+MOVIE_INDEX_DB = os.getenv("MOVIE_INDEX_DB", "movie_index.db")
+MIN_CONFIDENCE = float(os.getenv("MOVIE_INDEX_MIN_CONFIDENCE", 0.8))
+CANDIDATES = 20
+TITLE_QUERY_MAX_CHARS = 60  # Longer queries are descriptions, not titles
+AMBIGUITY_MARGIN = 0.9      # Runner-up within 90% of the best -> ambiguous
+AMBIGUITY_PENALTY = 0.75
+MIN_MATCHED_TERMS = 2       # Fewer matched description terms scale confidence down proportionally
+UNKNOWN_TERM_PENALTY = 0.8  # Per query term no movie in the index mentions
+PEOPLE_ONLY_PENALTY = 0.6   # Every matched term is a cast/crew name: many movies fit
+SEQUEL_PENALTY = 0.4        # Query and title disagree on a sequel number
+MATURE_INDEX_SIZE = int(os.getenv("MOVIE_INDEX_MATURE_SIZE", 500))
+
+# BM25 column weights: title, aliases, people, keywords
+BM25_WEIGHTS = (10.0, 8.0, 4.0, 1.0)
+
+# Sequel markers, compared as numbers: "Toy Story 3" = "Toy Story III" = "the third Toy Story"
+ROMAN_NUMERALS = {"ii": 2, "iii": 3, "iv": 4, "vi": 6, "vii": 7, "viii": 8, "ix": 9}
+ORDINALS = {"second": 2, "third": 3, "fourth": 4, "fifth": 5, "sixth": 6, "seventh": 7, "eighth": 8,
+            "ninth": 9, "tenth": 10, "2nd": 2, "3rd": 3, "4th": 4, "5th": 5}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "he", "her", "his",
+    "in", "into", "is", "it", "its", "of", "on", "or", "she", "that", "the", "their", "them", "they",
+    "this", "to", "was", "were", "where", "which", "who", "whom", "with", "what", "about", "after",
+    "one", "some", "movie", "movies", "film", "films", "title", "called", "named",
+}
+IMDB_MOVIE_TYPES = {"movie", "tvMovie", "video"}
+TSV_NULL = "\\N"
+
+
+def normalize(text):
+    """Lowercase, accents and punctuation removed, whitespace collapsed."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.findall(r"\w+", text))
+
+
+def _stem(word):
+    """A deliberately tiny suffix stripper, so 'killing'/'kills' meet 'kill'."""
+    for suffix, minimum in (("ing", 6), ("ed", 5), ("es", 5), ("s", 4)):
+        if len(word) >= minimum and word.endswith(suffix) and not word.endswith("ss"):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokens(text):
+    """Unique index terms of `text`, in order of first appearance."""
+    seen = {}
+    for word in normalize(text).split():
+        if word not in STOPWORDS and (len(word) > 1 or word.isdigit()):
+            seen.setdefault(_stem(word), None)
+    return list(seen)
+
+
+def sequel_numbers(text):
+    """Sequel numbers in `text`: digits (not years), roman numerals and ordinals."""
+    numbers = set()
+    for word in normalize(text).split():
+        if word.isdigit() and len(word) < 4:
+            numbers.add(int(word))
+        elif word in ROMAN_NUMERALS or word in ORDINALS:
+            numbers.add(ROMAN_NUMERALS.get(word) or ORDINALS[word])
+    numbers.discard(1)  # "Part 1", "Chapter One" name the first film as often as not
+    return numbers
+
+
+def index_size_factor(movies):
+    """0..1, reaching 1 at MATURE_INDEX_SIZE movies (log scale)."""
+    return min(1.0, math.log10(1 + movies) / math.log10(1 + MATURE_INDEX_SIZE))
+
+
+def trigrams(text):
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def title_similarity(a, b):
+    """Dice coefficient of the character trigrams of two titles (1.0 = same title)."""
+    ga, gb = trigrams(a), trigrams(b)
+    if not ga or not gb:
+        return 0.0
+    return 2 * len(ga & gb) / (len(ga) + len(gb))
+
+
+def _split_list(value):
+    if not value or value == TSV_NULL or value == "N/A":
+        return []
+    return [part.strip() for part in re.split(r"[|,]", value) if part.strip() and part.strip() != TSV_NULL]
+
+
+def _fts_query(terms):
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+class MovieIndex:
+    """
+    On-disk movie index. Like TTLCache, SQLite failures degrade to "no match"
+    instead of raising, and db_path=None keeps the index in memory.
+    """
+
+    def __init__(self, db_path=MOVIE_INDEX_DB):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "matches": 0, "misses": 0, "added": 0}
+        self._conn = None
+        self._opened = False
+        self._open_lock = threading.Lock()
+
+    # --- Backend ---
+    def open(self):
+        """Opens (creating if needed) the SQLite file. Idempotent; called on first use."""
+        if self._opened:
+            return
+        with self._open_lock:
+            if not self._opened:
+                self._open()
+                self._opened = True
+
+    def _open(self):
+        try:
+            self._conn = sqlite3.connect(self.db_path or ":memory:", timeout=5.0,
+                                         check_same_thread=False, isolation_level=None)
+            if self.db_path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS movies ("
+                " id INTEGER PRIMARY KEY,"
+                " key TEXT NOT NULL UNIQUE,"
+                " title TEXT NOT NULL,"
+                " year TEXT,"
+                " aliases TEXT NOT NULL,"
+                " people TEXT NOT NULL,"
+                " keywords TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS movie_terms USING fts5(title, aliases, people, keywords)")
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS movie_grams USING fts5(names, tokenize='trigram')")
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS movie_vocab USING fts5vocab(movie_terms, 'row')")
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Movie index unavailable: %s", e)
+            self._conn = None
+
+    def _query(self, sql, params=()):
+        self.open()
+        if self._conn is None:
+            return []
+        try:
+            with self._lock:
+                return self._conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Movie index error: %s", e)
+            return []
+
+    # --- Writing ---
+    def _upsert(self, movie):
+        """Inserts or merges one movie dict. Caller holds the lock and the transaction."""
+        title = (movie.get("title") or "").strip()
+        if not title or title == "N/A":
+            return False
+        year = (movie.get("year") or "").strip()
+        year = "" if year in (TSV_NULL, "N/A") else year
+        key = f"{normalize(title)}|{year[:4]}"
+
+        row = self._conn.execute("SELECT id, aliases, people, keywords FROM movies WHERE key = ?", (key,)).fetchone()
+        aliases = [a for a in movie.get("aliases", []) if a and normalize(a) != normalize(title)]
+        people = " ".join(movie.get("people", []))
+        keywords = " ".join(movie.get("keywords", []))
+        if row:
+            movie_id = row[0]
+            aliases = sorted(set(json.loads(row[1])) | set(aliases))
+            people = people or row[2]
+            keywords = keywords or row[3]
+            self._conn.execute("UPDATE movies SET title = ?, year = ?, aliases = ?, people = ?, keywords = ?, updated_at = ?"
+                               " WHERE id = ?", (title, year, json.dumps(aliases), people, keywords, time.time(), movie_id))
+            self._conn.execute("DELETE FROM movie_terms WHERE rowid = ?", (movie_id,))
+            self._conn.execute("DELETE FROM movie_grams WHERE rowid = ?", (movie_id,))
+        else:
+            movie_id = self._conn.execute(
+                "INSERT INTO movies (key, title, year, aliases, people, keywords, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, title, year, json.dumps(aliases), people, keywords, time.time())).lastrowid
+
+        self._conn.execute("INSERT INTO movie_terms (rowid, title, aliases, people, keywords) VALUES (?, ?, ?, ?, ?)",
+                           (movie_id, " ".join(tokens(title)), " ".join(tokens(" ".join(aliases))),
+                            " ".join(tokens(people)), " ".join(tokens(keywords))))
+        self._conn.execute("INSERT INTO movie_grams (rowid, names) VALUES (?, ?)",
+                           (movie_id, " | ".join(normalize(name) for name in [title] + aliases)))
+        return True
+
+    def add_many(self, movies):
+        """
+        Adds movie dicts (title, year, aliases, people, keywords) in one
+        transaction. A movie with the same title and year is merged. Returns
+        how many were stored.
+        """
+        self.open()
+        if self._conn is None:
+            return 0
+        added = 0
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    for movie in movies:
+                        added += self._upsert(movie)
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self._stats["added"] += added
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Movie index error: %s", e)
+            return 0
+        return added
+
+    def add(self, movie):
+        return self.add_many([movie]) == 1
+
+    def add_omdb(self, data):
+        """Grows the index from a raw OMDb response (?t= or ?s=)."""
+        if data.get("Response") != "True":
+            return 0
+        if "Search" in data:
+            return self.add_many({"title": r.get("Title"), "year": r.get("Year")} for r in data["Search"])
+        plot = data.get("Plot")
+        return self.add_many([{
+            "title": data.get("Title"),
+            "year": data.get("Year"),
+            "people": _split_list(data.get("Director")) + _split_list(data.get("Actors")),
+            "keywords": _split_list(data.get("Genre")) + ([plot] if plot and plot != "N/A" else []),
+        }])
+
+    def load_tsv(self, path, batch_size=5000):
+        """
+        Seeds the index from a tab-separated dump (plain or .gz) with IMDb's
+        title.basics columns (primaryTitle, originalTitle, startYear,
+        titleType, genres). Optional extra columns: aliases, directors, keywords.
+        Rows whose titleType is not a movie are skipped. Returns the number stored.
+        """
+        opener = gzip.open if path.endswith(".gz") else open
+        stored, batch = 0, []
+        csv.field_size_limit(sys.maxsize)
+        with opener(path, "rt", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                if row.get("titleType", "movie") not in IMDB_MOVIE_TYPES:
+                    continue
+                batch.append({
+                    "title": row.get("primaryTitle") or row.get("title"),
+                    "year": row.get("startYear") or row.get("year"),
+                    "aliases": [row.get("originalTitle")] + _split_list(row.get("aliases")),
+                    "people": _split_list(row.get("directors")),
+                    "keywords": _split_list(row.get("genres")) + _split_list(row.get("keywords")),
+                })
+                if len(batch) >= batch_size:
+                    stored += self.add_many(batch)
+                    batch = []
+        return stored + self.add_many(batch)
+
+    # --- Lookup ---
+    def _candidates(self, terms, text):
+        ids = {}
+        if terms:
+            for (movie_id,) in self._query(
+                    f"SELECT rowid FROM movie_terms WHERE movie_terms MATCH ? ORDER BY bm25(movie_terms, {', '.join(map(str, BM25_WEIGHTS))}) LIMIT ?",
+                    (_fts_query(terms), CANDIDATES)):
+                ids[movie_id] = None
+        grams = {g for g in trigrams(text) if " " not in g}
+        if grams and len(text) <= TITLE_QUERY_MAX_CHARS:
+            for (movie_id,) in self._query("SELECT rowid FROM movie_grams WHERE movie_grams MATCH ? ORDER BY rank LIMIT ?",
+                                           (_fts_query(sorted(grams)), CANDIDATES)):
+                ids[movie_id] = None
+        return list(ids)
+
+    def _idf(self, terms):
+        """({term: idf}, terms no movie mentions, number of movies)."""
+        total = self._query("SELECT COUNT(*) FROM movies")
+        total = total[0][0] if total else 0
+        placeholders = ",".join("?" * len(terms))
+        df = dict(self._query(f"SELECT term, doc FROM movie_vocab WHERE term IN ({placeholders})", terms)) if terms else {}
+        # Terms no movie mentions count like the rarest ones: the query says something we cannot explain
+        idf = {t: math.log(1 + (total - df.get(t, 1) + 0.5) / (df.get(t, 1) + 0.5)) for t in terms}
+        return idf, [t for t in terms if t not in df], total
+
+    @staticmethod
+    def _description_score(terms, idf, idf_total, unknown, columns):
+        """Coverage of the query by one movie's terms, discounted as described in the module docstring."""
+        doc_terms = set(" ".join(columns).split())
+        matched = [t for t in terms if t in doc_terms]
+        score = sum(idf[t] for t in matched) / idf_total
+        score *= min(1.0, len(matched) / MIN_MATCHED_TERMS) * UNKNOWN_TERM_PENALTY ** len(unknown)
+        if matched and set(matched) <= set(columns[2].split()):
+            score *= PEOPLE_ONLY_PENALTY
+        return score
+
+    def lookup(self, text):
+        """
+        Best match for a title or description as {"title", "year", "confidence"},
+        or None when nothing in the index shares a term or trigram with it.
+        """
+        with self._lock:
+            self._stats["lookups"] += 1
+        terms = tokens(text)
+        ids = self._candidates(terms, text)
+        if not ids:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        idf, unknown, movies = self._idf(terms)
+        idf_total = sum(idf.values()) or 1.0
+        size_factor = index_size_factor(movies)
+        placeholders = ",".join("?" * len(ids))
+        rows = self._query(
+            f"SELECT m.id, m.title, m.year, m.aliases, t.title, t.aliases, t.people, t.keywords"
+            f" FROM movies m JOIN movie_terms t ON t.rowid = m.id WHERE m.id IN ({placeholders})", ids)
+
+        scored = []
+        is_title_query = len(text) <= TITLE_QUERY_MAX_CHARS
+        for _, title, year, aliases, *columns in rows:
+            names = [title] + json.loads(aliases)
+            coverage = self._description_score(terms, idf, idf_total, unknown, columns) * size_factor
+            similarity = 0.0
+            if is_title_query:
+                similarity = max(title_similarity(text, name) for name in names)
+                similarity *= 1.0 if similarity == 1.0 else size_factor
+            score = max(coverage, similarity)
+            if all(sequel_numbers(text) != sequel_numbers(name) for name in names):
+                score *= SEQUEL_PENALTY
+            scored.append((score, similarity, title, year))
+        if not scored:
+            return None
+
+        scored.sort(key=lambda s: (s[0], s[1]), reverse=True)
+        confidence, similarity, title, year = scored[0]
+        # A title query is only ambiguous against other titles, not against plots mentioning the word
+        rival = lambda s: s[1] if similarity >= confidence else s[0]
+        if any(rival(other) >= confidence * AMBIGUITY_MARGIN and normalize(other[2]) != normalize(title)
+               for other in scored[1:]):
+            confidence *= AMBIGUITY_PENALTY
+        with self._lock:
+            self._stats["matches"] += 1
+        return {"title": title, "year": year, "confidence": round(confidence, 3)}
+
+    def count(self):
+        rows = self._query("SELECT COUNT(*) FROM movies")
+        return rows[0][0] if rows else 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["movies"] = self.count()
+        return stats
+
+
+# Shared by the sync and async title search tools
+movie_index = MovieIndex()
+
+
+def get_movie_index_stats():
+    return movie_index.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the local movie index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Load an IMDb-style TSV dump (.tsv or .tsv.gz)")
+    build.add_argument("path")
+    lookup = commands.add_parser("lookup", help="Resolve a title or description")
+    lookup.add_argument("query")
+    commands.add_parser("stats", help="Show index size")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        stored = movie_index.load_tsv(args.path)
+        print(f"📚 Indexed {stored} movies in {time.perf_counter() - started:.1f}s ({movie_index.count()} total)")
+    elif args.command == "lookup":
+        started = time.perf_counter()
+        match = movie_index.lookup(args.query)
+        print(json.dumps(match), f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+    else:
+        print(json.dumps(movie_index.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
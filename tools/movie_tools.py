@@ -1,143 +1,464 @@
 import os
-import requests
+import asyncio
+import contextvars
 import re
-import sys
-from ddgs import DDGS
-# Add parent directory to path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from dotenv import load_dotenv
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from logger import get_logger
 # Import our new Cache System
-from utils.cache import get_cached_result, set_cached_result
+from utils.cache import get_cached_result, set_cached_result, SWRCache
+from tools.http_client import get_http
+from tools.movie_index import movie_index, MIN_CONFIDENCE as INDEX_MIN_CONFIDENCE
+from tools.resilience import BackendUnavailable, ddgs_backend, omdb_backend
+from tools.semantic_cache import semantic_cache
+from utils.tracing import span, current_span
+from utils.metrics import OMDB_LOOKUPS, DDGS_SEARCHES, MOVIE_INDEX_LOOKUPS
 
-load_dotenv()
+logger = get_logger("MovieTools")
 
+# Read at import: entry points load .env before importing the tools
 OMDB_API_KEY = os.getenv("OMDB_API_KEY")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
+OMDB_URL = "http://www.omdbapi.com/"
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+NO_RESULTS = "No results found."  # ddgs' message for a search without hits
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Tool result caches, keyed on clean_movie_title(). OMDb metadata barely changes,
+# streaming availability does, so each tool gets its own (fresh, stale) window.
+details_cache = SWRCache("omdb", fresh_ttl=7 * DAY, stale_ttl=7 * DAY)
+trailer_cache = SWRCache("trailer", fresh_ttl=3 * DAY, stale_ttl=4 * DAY)
+streaming_cache = SWRCache("streaming", fresh_ttl=6 * HOUR, stale_ttl=18 * HOUR)
+
+# Most OMDb lookups one bulk request runs at once (below the HTTP per-host cap)
+BULK_MAX_PARALLEL = int(os.getenv("OMDB_BULK_MAX_PARALLEL", 4))
+BULK_SEPARATORS = re.compile(r"\s*(?:\||;|,|\n)\s*")
+
+# Set by the executor's speculative mode: called with the top search hit's
+# (cleaned) title while the LLM is still refining it
+title_candidate_listener = contextvars.ContextVar("title_candidate_listener", default=None)
+
+# Index matches good enough to answer with when the web search is down
+# (below INDEX_MIN_CONFIDENCE they would normally go to DuckDuckGo + LLM)
+FALLBACK_MIN_CONFIDENCE = float(os.getenv("MOVIE_INDEX_FALLBACK_CONFIDENCE", 0.5))
+
+# Longer title-extraction answers are explanations, not titles (escalated to the large model)
+MAX_TITLE_WORDS = 12
+
+# Results that mean "try again later", never cached
+UNCACHEABLE_RESULTS = {"Trailer not found.", "Streaming info not found.", "Streaming info unavailable."}
+
 try:
-    from llm.groq_client import llm_client
+    from llm.groq_client import llm_client, async_llm_client
 except ImportError:
     llm_client = None
+    async_llm_client = None
 
 def clean_movie_title(raw_title):
     """
     Cleans up the movie title to ensure OMDb accepts it.
     """
     if not raw_title: return ""
-    
+
     # 1. Remove the internal prefix
     title = raw_title.replace("Found via search:", "")
-    
+
     # 2. Remove quotes and years like (2014)
     title = re.sub(r"['\"]", "", title)
     title = re.sub(r'\(\d{4}\)', '', title)
-    
+
     # 3. Remove common suffixes that confuse OMDb
     separators = [" - ", " | ", " : ", " Official"]
     for sep in separators:
         if sep in title:
             title = title.split(sep)[0]
-            
+
     return title.strip()
+
+# --- Shared helpers (used by both the sync and the async tools) ---
+
+def _ddgs_text(query, max_results=3):
+    from ddgs import DDGS  # Imported on the first search, not with the tools
+    from ddgs.exceptions import DDGSException
+    with DDGS() as ddgs:
+        try:
+            return list(ddgs.text(query, max_results=max_results))
+        except DDGSException as e:
+            # ddgs raises when a search simply finds nothing; that is an answer, not an outage
+            if type(e) is DDGSException and str(e) == NO_RESULTS:
+                return []
+            raise
+
+def _web_search(query):
+    with span("ddgs.text", query=query) as search_span:
+        try:
+            results = ddgs_backend.call(_ddgs_text, query)
+        except BackendUnavailable:
+            DDGS_SEARCHES.inc(outcome="circuit_open")
+            raise
+        except Exception:
+            DDGS_SEARCHES.inc(outcome="error")
+            raise
+        DDGS_SEARCHES.inc(outcome="ok" if results else "empty")
+        search_span.set("results", len(results))
+        return results
+
+def _announce_candidate(results):
+    listener = title_candidate_listener.get()
+    if listener and results:
+        listener(clean_movie_title(results[0]['title']))
+
+def _title_prompt(query, results):
+    snippets = "\n".join([f"- {r['title']}: {r['body']}" for r in results])
+    return f"""
+            Search Query: "{query}"
+            Search Results:
+            {snippets}
+
+            Identify the specific movie title described. Return ONLY the title.
+            """
+
+def _valid_title(text):
+    """Whether the title extraction answered with one title (not a list, a refusal or an explanation)."""
+    text = text.strip()
+    return "\n" not in text and 0 < len(clean_movie_title(text).split()) <= MAX_TITLE_WORDS
+
+def _semantic_lookup(query):
+    """Title cached for an earlier query that means the same thing, else None."""
+    hit = semantic_cache.lookup(query)
+    current_span().set("semantic_similarity", hit["similarity"] if hit else 0.0)
+    if hit:
+        logger.debug("🧠 Semantic Cache Hit! '%s' ~ '%s' (%s) -> '%s'", query, hit["query"], hit["similarity"], hit["title"])
+        return hit["title"]
+    return None
+
+def _index_lookup(query):
+    """The local index's title for `query` if it is confident enough, else None."""
+    match = movie_index.lookup(query)
+    current_span().set("index_confidence", match["confidence"] if match else 0.0)
+    if match and match["confidence"] >= INDEX_MIN_CONFIDENCE:
+        MOVIE_INDEX_LOOKUPS.inc(result="hit")
+        logger.debug("📚 Index Hit! '%s' for '%s' (confidence %s)", match["title"], query, match["confidence"])
+        return match["title"]
+    MOVIE_INDEX_LOOKUPS.inc(result="low_confidence" if match else "miss")
+    return None
+
+def _index_fallback(query):
+    """Best index title for `query` when the web search failed, if it is at least FALLBACK_MIN_CONFIDENCE."""
+    match = movie_index.lookup(query)
+    if match and match["confidence"] >= FALLBACK_MIN_CONFIDENCE:
+        MOVIE_INDEX_LOOKUPS.inc(result="fallback")
+        logger.info("Web search unavailable, using index match '%s' for '%s'", match["title"], query)
+        return match["title"]
+    return None
+
+def _search_failed(query, error):
+    logger.warning("Search Engine Failed: %s", error)
+    fallback = _index_fallback(query)
+    return f"Found via search: {fallback}" if fallback else "Search failed."
+
+def _omdb_get(params):
+    return omdb_backend.call(get_http().get_json, OMDB_URL, params=params)
+
+async def _omdb_get_async(params):
+    return await omdb_backend.call_async(lambda: get_http().get_json_async(OMDB_URL, params=params))
+
+def _remember(data):
+    """Grows the local index from an OMDb response; never fails the lookup."""
+    try:
+        movie_index.add_omdb(data)
+    except Exception as e:
+        logger.warning("Movie index update failed: %s", e)
+
+def _parse_omdb_exact(data):
+    if data.get("Response") == "True":
+        return {
+            "title": data.get("Title"),
+            "year": data.get("Year"),
+            "rating": data.get("imdbRating"),
+            "plot": data.get("Plot"),
+            "director": data.get("Director")
+        }
+    return None
+
+def _parse_omdb_fuzzy(data, clean_title):
+    if data.get("Response") == "True" and data.get("Search"):
+        return {
+            "title": data["Search"][0]["Title"],
+            "year": data["Search"][0]["Year"],
+            "note": "Exact match failed, found closest result."
+        }
+    return f"Error: Movie '{clean_title}' not found in OMDb."
+
+def _trailer_params(clean_title):
+    return {"key": YOUTUBE_API_KEY, "q": f"{clean_title} official trailer", "part": "snippet", "type": "video", "maxResults": 1}
+
+def _parse_trailer(data):
+    if "items" in data and len(data["items"]) > 0:
+        return f"https://www.youtube.com/watch?v={data['items'][0]['id']['videoId']}"
+    return "Trailer not found."
+
+def _format_streaming(results):
+    if not results: return "Streaming info not found."
+    return "\n".join([f"{r['title']}: {r['href']}" for r in results])
+
+def _split_titles(titles):
+    """
+    Accepts a list of titles or one string ("Heat | Collateral | Thief", or
+    "Heat, Collateral and Thief"). " and " only splits the last item of a
+    comma list, so "Harry Potter and the Deathly Hallows" stays whole.
+    """
+    if isinstance(titles, str):
+        parts = BULK_SEPARATORS.split(titles.strip())
+        if len(parts) > 1 and " and " in parts[-1]:
+            parts[-1:] = parts[-1].rsplit(" and ", 1)
+        titles = parts
+    return [str(t).strip() for t in titles if str(t).strip()]
+
+def _bulk_plan(titles):
+    """(clean titles in input order, unique cache keys with their clean title)."""
+    clean = [clean_movie_title(t) for t in _split_titles(titles)]
+    unique = {}
+    for title in clean:
+        unique.setdefault(_cache_key(title), title)
+    current_span().set("titles", len(clean))
+    current_span().set("unique", len(unique))
+    return clean, unique
+
+def _cache_key(clean_title):
+    return clean_title.lower()
+
+def _is_cacheable(result):
+    if isinstance(result, dict):
+        return True
+    return not result.startswith(("Error", "API Error")) and result not in UNCACHEABLE_RESULTS
+
+def get_tool_cache_stats():
+    """Fresh/stale hit, miss and coalesced-request counters per tool cache."""
+    return {
+        "search_movie_details": details_cache.stats(),
+        "get_youtube_trailer": trailer_cache.stats(),
+        "get_streaming_info": streaming_cache.stats(),
+    }
+
+# --- Sync tools ---
+
 def get_movie_title_from_search(query):
     """
-    Finds a movie title using Cache -> Search -> LLM.
+    Finds a movie title using Cache -> Semantic cache -> Local index -> Search -> LLM.
+    If the search is down (or its circuit is open), a weaker index match is used instead.
     """
     # 1. CHECK CACHE FIRST 💾
     cached_title = get_cached_result(query)
+    current_span().set("cache", "hit" if cached_title else "miss")
     if cached_title:
-        print(f"DEBUG: ⚡ Cache Hit! Using '{cached_title}' for '{query}'")
+        logger.debug("⚡ Cache Hit! Using '%s' for '%s'", cached_title, query)
         return f"Found via search: {cached_title}"
 
-    # 2. If not in cache, Try Real Search
+    # 2. Then a differently worded query with the same meaning, then the local index;
+    #    only low-confidence index matches go to the web
+    known_title = _semantic_lookup(query) or _index_lookup(query)
+    if known_title:
+        return f"Found via search: {known_title}"
+
+    # 3. If not in cache, Try Real Search
     try:
-        print(f"DEBUG: 🔍 Searching DDG for: '{query}'")
-        
-        with DDGS() as ddgs:
-            results = list(ddgs.text(f"movie title {query}", max_results=3))
-            
+        logger.debug("🔍 Searching DDG for: '%s'", query)
+        results = _web_search(f"movie title {query}")
+
         if not results:
             return "Search failed."
+        _announce_candidate(results)
 
-        # 3. Use LLM to refine the result
+        # 4. Use LLM to refine the result
         final_title = results[0]['title'] # Default fallback
-        
+
         if llm_client:
-            snippets = "\n".join([f"- {r['title']}: {r['body']}" for r in results])
-            prompt = f"""
-            Search Query: "{query}"
-            Search Results:
-            {snippets}
-            
-            Identify the specific movie title described. Return ONLY the title.
-            """
-            extracted = llm_client.generate_text(prompt).strip()
+            extracted = llm_client.generate_text(_title_prompt(query, results), prompt_name="title",
+                                                 validate=_valid_title).strip()
             # Clean up LLM output
             final_title = clean_movie_title(extracted)
-        
-        # 4. SAVE TO CACHE 💾
+
+        # 5. SAVE TO CACHE 💾
         set_cached_result(query, final_title)
-        
+        semantic_cache.put(query, final_title)
+
         return f"Found via search: {final_title}"
 
     except Exception as e:
-        print(f"DEBUG: Search Engine Failed: {e}")
-        return "Search failed."
+        return _search_failed(query, e)
 
 def search_movie_details(movie_title):
     clean_title = clean_movie_title(movie_title)
-    print(f"DEBUG: OMDb Request -> t='{clean_title}'") # Verbose log
-    
-    url = "http://www.omdbapi.com/"
-    params = {"apikey": OMDB_API_KEY, "t": clean_title}
-    
+    return details_cache.get_or_fetch(_cache_key(clean_title), lambda: _fetch_movie_details(clean_title), _is_cacheable)
+
+def _fetch_movie_details(clean_title):
+    logger.debug("OMDb Request -> t='%s'", clean_title)
+
     try:
-        response = requests.get(url, params=params)
-        data = response.json()
-        if data.get("Response") == "True":
-            return {
-                "title": data.get("Title"),
-                "year": data.get("Year"),
-                "rating": data.get("imdbRating"),
-                "plot": data.get("Plot"),
-                "director": data.get("Director")
-            }
-        else:
-            # Fallback: Fuzzy search 's' instead of exact 't'
-            print(f"DEBUG: OMDb exact match failed for '{clean_title}', trying fuzzy search...")
-            params.pop("t")
-            params["s"] = clean_title
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if data.get("Response") == "True" and data.get("Search"):
-                return {
-                    "title": data["Search"][0]["Title"],
-                    "year": data["Search"][0]["Year"],
-                    "note": "Exact match failed, found closest result."
-                }
-            return f"Error: Movie '{clean_title}' not found in OMDb."
+        data = _omdb_get({"apikey": OMDB_API_KEY, "t": clean_title})
+        details = _parse_omdb_exact(data)
+        _remember(data)
+        if details:
+            OMDB_LOOKUPS.inc(result="exact")
+            return details
+
+        # Fallback: Fuzzy search 's' instead of exact 't'
+        logger.debug("OMDb exact match failed for '%s', trying fuzzy search...", clean_title)
+        data = _omdb_get({"apikey": OMDB_API_KEY, "s": clean_title})
+        details = _parse_omdb_fuzzy(data, clean_title)
+        _remember(data)
+        OMDB_LOOKUPS.inc(result="fuzzy" if isinstance(details, dict) else "not_found")
+        return details
     except Exception as e:
+        OMDB_LOOKUPS.inc(result="error")
         return f"API Error: {e}"
 
+_bulk_pool = None
+_bulk_pool_lock = threading.Lock()
+
+def _get_bulk_pool():
+    global _bulk_pool
+    with _bulk_pool_lock:
+        if _bulk_pool is None:
+            _bulk_pool = ThreadPoolExecutor(max_workers=BULK_MAX_PARALLEL, thread_name_prefix="omdb-bulk")
+        return _bulk_pool
+
+def search_movies_bulk(titles):
+    """
+    Looks up several movies at once. Titles are de-duplicated after
+    clean_movie_title; cached ones are served from details_cache and the rest
+    are fetched concurrently (at most BULK_MAX_PARALLEL at a time). Returns
+    one result per input title, in input order.
+    """
+    clean, unique = _bulk_plan(titles)
+    pool = _get_bulk_pool()
+    futures = {key: pool.submit(contextvars.copy_context().run, search_movie_details, title)
+               for key, title in unique.items()}
+    return [futures[_cache_key(title)].result() for title in clean]
+
 def get_youtube_trailer(movie_title):
     if not YOUTUBE_API_KEY: return "Error: YouTube API Key missing."
     clean_title = clean_movie_title(movie_title)
-    url = "https://www.googleapis.com/youtube/v3/search"
-    params = {"key": YOUTUBE_API_KEY, "q": f"{clean_title} official trailer", "part": "snippet", "type": "video", "maxResults": 1}
+    return trailer_cache.get_or_fetch(_cache_key(clean_title), lambda: _fetch_trailer(clean_title), _is_cacheable)
+
+def _fetch_trailer(clean_title):
     try:
-        data = requests.get(url, params=params).json()
-        if "items" in data and len(data["items"]) > 0:
-            return f"https://www.youtube.com/watch?v={data['items'][0]['id']['videoId']}"
-        return "Trailer not found."
+        data = get_http().get_json(YOUTUBE_SEARCH_URL, params=_trailer_params(clean_title))
+        return _parse_trailer(data)
     except Exception as e: return f"Error: {e}"
 
 def get_streaming_info(movie_title):
     clean_title = clean_movie_title(movie_title)
+    return streaming_cache.get_or_fetch(_cache_key(clean_title), lambda: _fetch_streaming(clean_title), _is_cacheable)
+
+def _fetch_streaming(clean_title):
+    try:
+        return _format_streaming(_web_search(f"where to watch {clean_title} streaming"))
+    except: return "Streaming info unavailable."
+
+# --- Async tools ---
+# Same behaviour as the sync tools above. HTTP goes through the shared async
+# client; DDGS has no async API, so it runs in a worker thread.
+
+async def get_movie_title_from_search_async(query):
+    """
+    Async version of get_movie_title_from_search.
+    """
+    cached_title = get_cached_result(query)
+    current_span().set("cache", "hit" if cached_title else "miss")
+    if cached_title:
+        logger.debug("⚡ Cache Hit! Using '%s' for '%s'", cached_title, query)
+        return f"Found via search: {cached_title}"
+
+    known_title = _semantic_lookup(query) or _index_lookup(query)
+    if known_title:
+        return f"Found via search: {known_title}"
+
+    try:
+        logger.debug("🔍 Searching DDG for: '%s'", query)
+        results = await asyncio.to_thread(_web_search, f"movie title {query}")
+
+        if not results:
+            return "Search failed."
+        _announce_candidate(results)
+
+        final_title = results[0]['title'] # Default fallback
+
+        if async_llm_client:
+            extracted = (await async_llm_client.generate_text(_title_prompt(query, results), prompt_name="title",
+                                                            validate=_valid_title)).strip()
+            final_title = clean_movie_title(extracted)
+
+        set_cached_result(query, final_title)
+        semantic_cache.put(query, final_title)
+
+        return f"Found via search: {final_title}"
+
+    except Exception as e:
+        return _search_failed(query, e)
+
+async def search_movie_details_async(movie_title):
+    clean_title = clean_movie_title(movie_title)
+    return await details_cache.get_or_fetch_async(
+        _cache_key(clean_title), lambda: _fetch_movie_details_async(clean_title), _is_cacheable)
+
+async def _fetch_movie_details_async(clean_title):
+    logger.debug("OMDb Request -> t='%s'", clean_title)
+
+    try:
+        data = await _omdb_get_async({"apikey": OMDB_API_KEY, "t": clean_title})
+        details = _parse_omdb_exact(data)
+        _remember(data)
+        if details:
+            OMDB_LOOKUPS.inc(result="exact")
+            return details
+
+        logger.debug("OMDb exact match failed for '%s', trying fuzzy search...", clean_title)
+        data = await _omdb_get_async({"apikey": OMDB_API_KEY, "s": clean_title})
+        details = _parse_omdb_fuzzy(data, clean_title)
+        _remember(data)
+        OMDB_LOOKUPS.inc(result="fuzzy" if isinstance(details, dict) else "not_found")
+        return details
+    except Exception as e:
+        OMDB_LOOKUPS.inc(result="error")
+        return f"API Error: {e}"
+
+async def search_movies_bulk_async(titles):
+    """Async version of search_movies_bulk."""
+    clean, unique = _bulk_plan(titles)
+    slots = asyncio.Semaphore(BULK_MAX_PARALLEL)
+
+    async def lookup(title):
+        async with slots:
+            return await search_movie_details_async(title)
+
+    found = dict(zip(unique, await asyncio.gather(*(lookup(title) for title in unique.values()))))
+    return [found[_cache_key(title)] for title in clean]
+
+async def get_youtube_trailer_async(movie_title):
+    if not YOUTUBE_API_KEY: return "Error: YouTube API Key missing."
+    clean_title = clean_movie_title(movie_title)
+    return await trailer_cache.get_or_fetch_async(
+        _cache_key(clean_title), lambda: _fetch_trailer_async(clean_title), _is_cacheable)
+
+async def _fetch_trailer_async(clean_title):
+    try:
+        data = await get_http().get_json_async(YOUTUBE_SEARCH_URL, params=_trailer_params(clean_title))
+        return _parse_trailer(data)
+    except Exception as e: return f"Error: {e}"
+
+async def get_streaming_info_async(movie_title):
+    clean_title = clean_movie_title(movie_title)
+    return await streaming_cache.get_or_fetch_async(
+        _cache_key(clean_title), lambda: _fetch_streaming_async(clean_title), _is_cacheable)
+
+async def _fetch_streaming_async(clean_title):
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(f"where to watch {clean_title} streaming", max_results=3))
-        if not results: return "Streaming info not found."
-        return "\n".join([f"{r['title']}: {r['href']}" for r in results])
-    except: return "Streaming info unavailable."
\ No newline at end of file
+        results = await asyncio.to_thread(_web_search, f"where to watch {clean_title} streaming")
+        return _format_streaming(results)
+    except: return "Streaming info unavailable."
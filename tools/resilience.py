@@ -0,0 +1,276 @@
+"""
+Tail-latency protection for the external backends the tools call (DuckDuckGo, OMDb).
+
+Each backend gets a Backend with:
+- a CircuitBreaker: after BREAKER_FAILURES consecutive outages (see
+  is_outage: transport errors, timeouts, 5xx/429 answers) the backend
+  is skipped (calls raise BackendUnavailable at once) for BREAKER_RESET
+  seconds, then one trial call decides whether it closes again. The tools
+  fall back to their caches or the local index meanwhile.
+- hedging: if a call has not answered after the backend's HEDGE_PERCENTILE
+  latency (measured over its recent calls), the same call is sent once
+  more and whichever answers first wins. Only idempotent reads go through
+  here, so a duplicate is harmless.
+
+Breaker state and hedge win rates are in `get_resilience_stats()`.
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from logger import get_logger
+from utils.metrics import BREAKER_STATE, HEDGED_REQUESTS
+from utils.tracing import current_span
+
+logger = get_logger("Resilience")
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 95))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", 0.2))     # Never hedge sooner than this (seconds)
+HEDGE_DEFAULT_DELAY = 1.0  # Until HEDGE_MIN_SAMPLES calls have been timed
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+HEDGE_MAX_WORKERS = int(os.getenv("HEDGE_MAX_WORKERS", 16))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", 5))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET_SECONDS", 30))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Errors of libraries the backends use that mean the backend is down, checked only once imported
+OUTAGE_ERRORS = {"httpx": "TransportError", "ddgs.exceptions": "DDGSException"}
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class BackendUnavailable(Exception):
+    """Raised instead of calling a backend whose circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0          # Consecutive
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0, "successes": 0, "failures": 0}
+        BREAKER_STATE.set(0, backend=name)
+
+    def _set_state(self, state):
+        self.state = state
+        BREAKER_STATE.set(_STATE_VALUES[state], backend=self.name)
+
+    def allow(self):
+        """True if a call may go out now. In half-open state only one trial call does."""
+        with self._lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+                self._trial_running = False
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self._trial_running):
+                self._trial_running = self.state == HALF_OPEN
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self.failures = 0
+            if self.state != CLOSED:
+                logger.info("Circuit for %s closed again", self.name)
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                logger.warning("Circuit for %s opened after %s failures", self.name, self.failures)
+                self._set_state(OPEN)
+                self._stats["opened"] += 1
+                self.opened_at = self.clock()
+                self._trial_running = False
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, **self._stats}
+
+
+def is_outage(error):
+    """
+    True if `error` says the backend is down or overloaded: a transport
+    error, a timeout, a 5xx or 429 answer. Anything else (a 4xx, a body
+    that does not parse) is about the request; the backend did answer.
+    """
+    if isinstance(error, (OSError, asyncio.TimeoutError)):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status >= 500 or status == 429
+    for module_name, class_name in OUTAGE_ERRORS.items():
+        module = sys.modules.get(module_name)
+        if module is not None and isinstance(error, getattr(module, class_name)):
+            return True
+    return False
+
+
+class LatencyTracker:
+    """Recent call latencies of one backend; the hedge delay is a percentile of them."""
+
+    def __init__(self, window=LATENCY_WINDOW, percentile=HEDGE_PERCENTILE):
+        self.samples = deque(maxlen=window)
+        self.percentile = percentile
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def hedge_delay(self):
+        with self._lock:
+            samples = sorted(self.samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        rank = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(HEDGE_MIN_DELAY, samples[rank])
+
+
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool():
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+        return _hedge_pool
+
+
+class Backend:
+    """One external backend: its circuit breaker, latency history and hedge counters."""
+
+    def __init__(self, name, hedge=HEDGE_ENABLED, breaker=None):
+        self.name = name
+        self.hedge = hedge
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latency = LatencyTracker()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _timed(self, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.latency.observe(time.perf_counter() - started)
+        return result
+
+    def _settle(self, winner, hedged, error=None):
+        """Records the outcome of a call; `winner` is 0 (first request) or 1 (the hedge)."""
+        current_span().set(f"{self.name}_hedged", hedged)
+        if hedged:
+            self._count("hedged")
+            HEDGED_REQUESTS.inc(backend=self.name, winner="hedge" if winner else "primary")
+            if winner:
+                self._count("hedge_wins")
+        if error is None or not is_outage(error):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def _check(self):
+        if not self.breaker.allow():
+            current_span().set(f"{self.name}_circuit", OPEN)
+            raise BackendUnavailable(f"{self.name} is unavailable (circuit open)")
+        self._count("calls")
+
+    # --- Threads ---
+    def call(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs), hedged after the backend's slow-call threshold. Raises BackendUnavailable while open."""
+        self._check()
+        if not self.hedge:
+            try:
+                result = self._timed(fn, *args, **kwargs)
+            except Exception as e:
+                self._settle(0, False, e)
+                raise
+            self._settle(0, False)
+            return result
+
+        pool = _get_hedge_pool()
+        submit = lambda: pool.submit(contextvars.copy_context().run, self._timed, fn, *args, **kwargs)
+        futures = [submit()]
+        done, _ = wait(futures, timeout=self.latency.hedge_delay())
+        if not done:
+            futures.append(submit())
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._settle(futures.index(future), len(futures) > 1)
+                    return future.result()
+                error = future.exception()
+        self._settle(0, len(futures) > 1, error)
+        raise error
+
+    # --- Event loop ---
+    async def call_async(self, make_coro):
+        """Async version of call; `make_coro` returns a new coroutine for each attempt."""
+        self._check()
+
+        async def timed():
+            started = time.perf_counter()
+            result = await make_coro()
+            self.latency.observe(time.perf_counter() - started)
+            return result
+
+        tasks = [asyncio.ensure_future(timed())]
+        if self.hedge:
+            done, _ = await asyncio.wait(tasks, timeout=self.latency.hedge_delay())
+            if not done:
+                tasks.append(asyncio.ensure_future(timed()))
+        pending = set(tasks)
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._settle(tasks.index(task), len(tasks) > 1)
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        self._settle(0, len(tasks) > 1, error)
+        raise error
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hedge_win_rate"] = round(stats["hedge_wins"] / stats["hedged"], 4) if stats["hedged"] else 0.0
+        stats["hedge_delay_s"] = round(self.latency.hedge_delay(), 4)
+        stats["breaker"] = self.breaker.stats()
+        return stats
+
+
+# Shared by tools/movie_tools.py
+ddgs_backend = Backend("ddgs")
+omdb_backend = Backend("omdb")
+
+
+def get_resilience_stats():
+    return {backend.name: backend.stats() for backend in (ddgs_backend, omdb_backend)}
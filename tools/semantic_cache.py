@@ -0,0 +1,408 @@
+"""
+Semantic cache for get_movie_title_from_search: free-text descriptions that
+mean the same thing ("the guy who can't form new memories" / "film about a
+man with short-term memory loss") share one answer, even though the exact
+search cache keys them differently.
+
+Queries are embedded into unit vectors, either with a small local
+sentence-transformers model (SEMANTIC_CACHE_MODEL, if the package is
+installed) or with hashed word and character n-grams. Lookup is a
+nearest-neighbour search (one matrix-vector product with NumPy, a sparse dot
+product without it); the neighbour's title is returned when its cosine
+similarity reaches SEMANTIC_CACHE_THRESHOLD and both queries name the same
+place in a series. "toy story 3" embeds close to "toy story 2", and "the
+last harry potter movie" close to "the first harry potter movie", so a
+neighbour whose sequel numbers (2, III, third) or position words (first,
+last, latest, ...) differ is refused rather than returned.
+
+Entries persist to <SEMANTIC_CACHE_PATH>.json (queries and titles) and, with
+NumPy, <SEMANTIC_CACHE_PATH>.npy (their vectors). Writes are batched: the
+files are rewritten at most every SAVE_INTERVAL seconds and at exit. Several
+processes (the API workers) can share the files: a flush holds a lock on
+<SEMANTIC_CACHE_PATH>.lock and merges its new entries into what is on disk,
+so no worker drops another's. NumPy, the model and the saved entries are all
+loaded on first use, not at import.
+
+benchmarks/eval_semantic_cache.py reports recall and false-hit rate on a
+labeled set of paraphrases and near misses (sequels, ordinals, one changed
+content word).
+"""
+import atexit
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl  # POSIX only; elsewhere one process is expected to own the files
+except ImportError:
+    fcntl = None
+
+from logger import get_logger
+from tools.movie_index import normalize, sequel_numbers, tokens
+
+logger = get_logger("SemanticCache")
+
+np = None  # NumPy once _load_numpy() found it
+_numpy_checked = False
+
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "semantic_cache")  # "" keeps it in memory
+# Hashed n-grams score a one-word change ("same year" for "same day") about as high as a reworded
+# query (0.81); 0.82 is the lowest threshold without false hits on the labeled set, near misses
+# included. It mostly serves near-verbatim rewordings; sentence models need their own sweep.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.82))
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "")  # e.g. sentence-transformers/all-MiniLM-L6-v2
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 5000))
+HASH_DIM = 2 ** 10
+SAVE_INTERVAL = 5.0
+
+# Feature weights of the hashing embedder
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.3
+CHAR_WEIGHT = 0.35
+
+# Words that pick one film out of a series; queries must agree on them to share an answer
+POSITION_WORDS = {"first", "last", "final", "latest", "newest", "original", "next", "previous",
+                  "prequel", "sequel", "remake", "reboot"}
+
+
+def _load_numpy():
+    """Imports NumPy on first need (it is slow to import). Without it, vectors stay pure-Python and sparse."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = None
+        _numpy_checked = True
+    return np
+
+
+def series_position(text):
+    """What `text` says about where in a series the film is: sequel numbers and position words."""
+    return sequel_numbers(text), POSITION_WORDS.intersection(normalize(text).split())
+
+
+@contextmanager
+def _file_lock(path, exclusive=True):
+    """flock on <path>.lock: one process writes the cache files at a time, readers see both files in sync."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _bucket(feature):
+    """Stable (across processes) hash of a feature into (index, sign)."""
+    digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest % HASH_DIM, 1.0 if digest >> 63 else -1.0
+
+
+class HashingEmbedder:
+    """
+    Hashed bag of stemmed words, word bigrams and in-word character trigrams.
+    Needs no model; character trigrams let 'memories' meet 'memory loss'.
+    """
+    name = f"hashing-{HASH_DIM}"
+    dim = HASH_DIM
+
+    def features(self, text):
+        """{index: weight}, L2-normalized."""
+        words = tokens(text)
+        vector = {}
+
+        def add(feature, weight):
+            index, sign = _bucket(feature)
+            vector[index] = vector.get(index, 0.0) + sign * weight
+
+        for word in words:
+            add("w:" + word, WORD_WEIGHT)
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                add("c:" + padded[i:i + 3], CHAR_WEIGHT)
+        for first, second in zip(words, words[1:]):
+            add(f"b:{first} {second}", BIGRAM_WEIGHT)
+
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {i: v / norm for i, v in vector.items() if v} if norm else {}
+
+    def embed(self, text):
+        """Dense vector (NumPy array, or None without NumPy)."""
+        if _load_numpy() is None:
+            return None
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for index, value in self.features(text).items():
+            vector[index] = value
+        return vector
+
+
+class ModelEmbedder:
+    """A local sentence-transformers model, loaded when the cache is created."""
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer  # Optional dependency
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.name = model_name
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, text):
+        return self.model.encode(normalize(text), normalize_embeddings=True).astype(np.float32)
+
+
+def make_embedder(model_name=SEMANTIC_CACHE_MODEL):
+    """The configured model if it (and NumPy) can be loaded, else the hashing embedder."""
+    if model_name and _load_numpy() is not None:
+        try:
+            return ModelEmbedder(model_name)
+        except Exception as e:  # ImportError, or the model could not be downloaded/loaded
+            logger.warning("⚠️ Semantic cache model '%s' unavailable, using hashed n-grams: %s", model_name, e)
+    return HashingEmbedder()
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache from query text to movie title. Thread-safe; the
+    vectors of every entry are kept in one matrix (or a list of sparse
+    vectors without NumPy).
+    """
+
+    def __init__(self, path=SEMANTIC_CACHE_PATH, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES, embedder=None):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._embedder = embedder
+        self._lock = threading.Lock()
+        self._entries = []   # [{"query", "title"}], oldest first
+        self._vectors = []   # Sparse vectors (pure-Python mode)
+        self._matrix = None  # Rows L2-normalized, first len(entries) in use (NumPy mode)
+        self._unsaved = []   # [(entry, vector)] put since the last flush
+        self._cleared = False  # The next flush replaces the files instead of merging into them
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._stats = {"hits": 0, "misses": 0, "refused": 0, "writes": 0}
+        self._opened = False
+        self._open_lock = threading.Lock()
+
+    @property
+    def embedder(self):
+        """Built on first use: a sentence-transformers model takes seconds to load."""
+        if self._embedder is None:
+            self._embedder = make_embedder()
+        return self._embedder
+
+    def open(self):
+        """Loads NumPy, the embedder and the saved entries. Idempotent; called on first use."""
+        if self._opened:
+            return
+        with self._open_lock:
+            if self._opened:
+                return
+            _load_numpy()
+            self.embedder  # Builds it now rather than inside the first lookup's lock
+            if self.path:
+                self._load()
+                atexit.register(self.flush)
+            self._opened = True
+
+    # --- Vectors ---
+    def _vector(self, text):
+        """The query's vector, or None if it has no features (e.g. only stopwords)."""
+        if np is None:
+            return self.embedder.features(text) or None
+        vector = self.embedder.embed(text)
+        return vector if vector.any() else None
+
+    def _nearest(self, vector):
+        """(row, cosine similarity) of the closest entry, or (None, 0.0)."""
+        if not self._entries:
+            return None, 0.0
+        if np is None:
+            scores = [sum(vector.get(i, 0.0) * v for i, v in row.items()) for row in self._vectors]
+            best = max(range(len(scores)), key=scores.__getitem__)
+            return best, scores[best]
+        scores = self._matrix[:len(self._entries)] @ vector
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+    def _append(self, entry, vector):
+        if len(self._entries) >= self.max_entries:
+            # Evict the oldest tenth at once, so a full cache does not shift the matrix on every write
+            drop = max(1, self.max_entries // 10)
+            del self._entries[:drop]
+            if np is None:
+                del self._vectors[:drop]
+            else:
+                size = len(self._entries)
+                self._matrix[:size] = self._matrix[drop:drop + size]
+
+        size = len(self._entries)
+        self._entries.append(entry)
+        if np is None:
+            self._vectors.append(vector)
+            return
+        if self._matrix is None or size == len(self._matrix):
+            # Grown by doubling: appends are amortized O(dim), not a full copy each time
+            grown = np.zeros((min(max(64, 2 * size), self.max_entries), vector.shape[0]), dtype=np.float32)
+            if self._matrix is not None:
+                grown[:size] = self._matrix[:size]
+            self._matrix = grown
+        self._matrix[size] = vector
+
+    # --- Public API ---
+    def lookup(self, query):
+        """
+        {"title", "query", "similarity"} of the nearest cached query above the
+        threshold, else None. A neighbour naming another film of the series
+        ("toy story 3" for "toy story 2") is a miss, counted as "refused".
+        """
+        self.open()
+        vector = self._vector(query)
+        with self._lock:
+            row, similarity = self._nearest(vector) if vector is not None else (None, 0.0)
+            if row is None or similarity < self.threshold:
+                self._stats["misses"] += 1
+                return None
+            entry = self._entries[row]
+            if series_position(entry["query"]) != series_position(query):
+                self._stats["misses"] += 1
+                self._stats["refused"] += 1
+                return None
+            self._stats["hits"] += 1
+        return {"title": entry["title"], "query": entry["query"], "similarity": round(similarity, 3)}
+
+    def put(self, query, title):
+        self.open()
+        vector = self._vector(query)
+        if vector is None:
+            return  # Nothing but stopwords: nothing to match on
+        with self._lock:
+            entry = {"query": query, "title": title}
+            self._append(entry, vector)
+            self._unsaved.append((entry, vector))
+            self._stats["writes"] += 1
+            self._dirty = True
+            due = time.monotonic() - self._saved_at >= SAVE_INTERVAL
+        if due:
+            self.flush()
+
+    def clear(self):
+        self.open()
+        with self._lock:
+            self._entries, self._vectors, self._matrix = [], [], None
+            self._unsaved, self._cleared = [], True
+            self._dirty = True
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["embedder"] = self.embedder.name
+        return stats
+
+    # --- Persistence ---
+    def flush(self):
+        """Merges the entries put since the last flush into the files on disk, if there are any."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            unsaved, self._unsaved = self._unsaved, []
+            cleared, self._cleared = self._cleared, False
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        try:
+            with _file_lock(self.path):
+                entries, matrix = ([], None) if cleared else self._read_saved()
+                if np is not None and matrix is None and entries:
+                    entries, matrix = self._embed_all(entries)  # Saved by another embedder, or without NumPy
+                entries = entries + [entry for entry, _ in unsaved]
+                if np is not None and unsaved:
+                    new = np.stack([vector for _, vector in unsaved])
+                    matrix = new if matrix is None else np.concatenate([matrix, new])
+                self._write(entries[-self.max_entries:], matrix[-self.max_entries:] if matrix is not None else None)
+        except OSError as e:
+            logger.warning("⚠️ Semantic cache not saved: %s", e)
+            with self._lock:  # Kept for the next flush
+                self._unsaved[:0] = unsaved
+                self._cleared = self._cleared or cleared
+                self._dirty = True
+
+    def _embed_all(self, entries):
+        """(entries, matrix) for saved entries without usable vectors; entries with no features are dropped."""
+        embedded = [(entry, vector) for entry in entries for vector in [self._vector(entry["query"])]
+                    if vector is not None]
+        return [entry for entry, _ in embedded], np.stack([vector for _, vector in embedded]) if embedded else None
+
+    def _write(self, entries, matrix):
+        """
+        Temp files + rename, so a crash mid-write never leaves half a file
+        behind. Temp names are per process: the workers share the directory.
+        """
+        pid = os.getpid()
+        tmp = f"{self.path}.json.{pid}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"embedder": self.embedder.name, "entries": entries}, f, ensure_ascii=False)
+        if np is not None and matrix is not None:
+            with open(f"{self.path}.npy.{pid}.tmp", "wb") as f:
+                np.save(f, matrix)
+            os.replace(f"{self.path}.npy.{pid}.tmp", f"{self.path}.npy")
+        os.replace(tmp, f"{self.path}.json")
+
+    def _read_saved(self):
+        """(entries, matrix) on disk. The matrix is None without NumPy, or if it is out of sync with the entries."""
+        try:
+            with open(f"{self.path}.json", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return [], None
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Semantic cache not loaded: %s", e)
+            return [], None
+        entries = saved.get("entries", [])
+
+        matrix = None
+        if np is not None and entries and saved.get("embedder") == self.embedder.name:
+            try:
+                matrix = np.load(f"{self.path}.npy")
+            except (OSError, ValueError):
+                matrix = None
+            if matrix is not None and matrix.shape != (len(entries), self.embedder.dim):
+                matrix = None  # Different embedder dimension or a half-synced pair: re-embed
+        return entries, matrix
+
+    def _load(self):
+        with _file_lock(self.path, exclusive=False):
+            entries, matrix = self._read_saved()
+        entries = entries[-self.max_entries:]
+
+        with self._lock:
+            if matrix is not None:
+                self._entries, self._matrix = entries, matrix[-len(entries):]
+                return
+            # Different embedder (or no NumPy): vectors are cheap to rebuild from the queries
+            for entry in entries:
+                vector = self._vector(entry["query"])
+                if vector is not None:
+                    self._append(entry, vector)
+
+
+# Shared by the sync and async title search tools
+semantic_cache = SemanticCache()
+
+
+def get_semantic_cache_stats():
+    return semantic_cache.stats()
@@ -1,40 +1,347 @@
+import asyncio
 import json
 import os
-import hashlib
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 
-CACHE_FILE = "search_cache.json"
+from logger import get_logger
+from utils.tracing import current_span
 
-def load_cache():
-    """Loads the cache from disk."""
-    if os.path.exists(CACHE_FILE):
+logger = get_logger("Cache")
+
+CACHE_DB = os.getenv("CACHE_DB", "search_cache.db")
+DEFAULT_TTL = int(os.getenv("CACHE_TTL_SECONDS", 7 * 24 * 3600))  # One week
+DEFAULT_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 2048))
+DEFAULT_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 8 * 1024 * 1024))
+
+
+class TTLCache:
+    """
+    In-process LRU cache with per-entry TTL and size limits, sitting in front
+    of a durable SQLite store (WAL mode).
+
+    - Memory (L1) is loaded once from SQLite on first use (or open()), so
+      creating a cache, e.g. at import time, touches no files.
+    - A memory miss falls through to SQLite (L2), so entries written by other
+      processes (e.g. other Streamlit workers) are still found.
+    - Every write is a single-row upsert inside its own transaction, which makes
+      it atomic and safe when several processes share the same file.
+    """
+
+    def __init__(self, namespace, db_path=CACHE_DB, ttl=DEFAULT_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.namespace = namespace
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.RLock()
+        self._db_lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._stats = {"hits": 0, "backend_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "writes": 0}
+
+        self._conn = None
+        self._opened = not db_path
+        self._open_lock = threading.Lock()
+
+    # --- Backend ---
+    def open(self):
+        """Opens the SQLite store and warms memory from it. Idempotent; called on first use."""
+        if self._opened:
+            return
+        with self._open_lock:
+            if not self._opened:
+                self._open_backend()
+                self._load()
+                self._opened = True
+
+    def _open_backend(self):
         try:
-            with open(CACHE_FILE, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-def save_cache(cache_data):
-    """Saves the cache to disk."""
-    try:
-        with open(CACHE_FILE, "w") as f:
-            json.dump(cache_data, f, indent=4)
-    except Exception as e:
-        print(f"⚠️ Warning: Failed to save cache: {e}")
+            self._conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Cache backend unavailable, running memory-only: %s", e)
+            self._conn = None
+
+    def _backend(self, sql, params=(), fetch=False):
+        """Runs one statement against SQLite. Failures degrade to memory-only behaviour."""
+        if self._conn is None:
+            return None
+        try:
+            with self._db_lock:
+                cursor = self._conn.execute(sql, params)
+                return cursor.fetchall() if fetch else None
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Cache backend error: %s", e)
+            return None
+
+    def _load(self):
+        """Warms memory with the most recently written, still valid entries."""
+        now = time.time()
+        self._backend("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+        rows = self._backend(
+            "SELECT key, value, expires_at FROM cache WHERE namespace = ? ORDER BY updated_at DESC LIMIT ?",
+            (self.namespace, self.max_entries), fetch=True,
+        ) or []
+        with self._lock:
+            for key, raw, expires_at in reversed(rows):
+                self._store(key, json.loads(raw), expires_at, len(raw))
+
+    # --- Memory ---
+    def _store(self, key, value, expires_at, size):
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[2]
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._stats["evictions"] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._bytes -= entry[2]
+
+    # --- Public API ---
+    def get(self, key):
+        self.open()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                value, expires_at, _ = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                self._drop(key)
+                self._stats["expirations"] += 1
+
+        rows = self._backend(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (self.namespace, key, now), fetch=True,
+        )
+        with self._lock:
+            if rows:
+                raw, expires_at = rows[0]
+                value = json.loads(raw)
+                self._store(key, value, expires_at, len(raw))
+                self._stats["backend_hits"] += 1
+                return value
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key, value, ttl=None):
+        self.open()
+        raw = json.dumps(value)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires_at, len(raw))
+            self._stats["writes"] += 1
+        self._backend(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, raw, expires_at, now),
+        )
+
+    def delete(self, key):
+        self.open()
+        with self._lock:
+            self._drop(key)
+        self._backend("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self):
+        self.open()
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        self._backend("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(entries=len(self._entries), bytes=self._bytes,
+                         max_entries=self.max_entries, max_bytes=self.max_bytes)
+        lookups = stats["hits"] + stats["backend_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["backend_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def _always(value):
+    return True
+
+
+class SWRCache:
+    """
+    Stale-while-revalidate cache for tool results, stored in a TTLCache.
+
+    - Fresh entries (younger than `fresh_ttl`) are returned as-is.
+    - Stale entries (up to `stale_ttl` past freshness) are returned immediately
+      while a background refresh fetches a new value.
+    - Concurrent misses for the same key share one in-flight fetch
+      (single-flight), in threads and on event loops alike.
+    """
+
+    def __init__(self, namespace, fresh_ttl, stale_ttl, **kwargs):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.store = TTLCache(namespace, ttl=fresh_ttl + stale_ttl, **kwargs)
+
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future (threads)
+        self._async_inflight = weakref.WeakKeyDictionary()  # event loop -> {key: Task}
+        self._background = set()  # Keeps refresh tasks alive until they finish
+        self._refresher = None
+        self._stats = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _lookup(self, key):
+        """Returns (value, is_stale), or (None, None) on a miss."""
+        entry = self.store.get(key)
+        if entry is None:
+            self._count("misses")
+            current_span().set("cache", "miss")
+            return None, None
+        if entry["fresh_until"] > time.time():
+            self._count("fresh_hits")
+            current_span().set("cache", "fresh")
+            return entry["value"], False
+        self._count("stale_hits")
+        current_span().set("cache", "stale")
+        return entry["value"], True
+
+    def put(self, key, value):
+        self.store.set(key, {"value": value, "fresh_until": time.time() + self.fresh_ttl})
+
+    # --- Threads ---
+    def get_or_fetch(self, key, fetch, cacheable=_always):
+        value, is_stale = self._lookup(key)
+        if is_stale is None:
+            return self._fetch_once(key, fetch, cacheable)
+        if is_stale:
+            with self._lock:
+                refreshing = key in self._inflight
+                if self._refresher is None:
+                    self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+            if not refreshing:
+                self._count("refreshes")
+                self._refresher.submit(self._fetch_once, key, fetch, cacheable)
+        return value
+
+    def _fetch_once(self, key, fetch, cacheable):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            value = fetch()
+            if cacheable(value):
+                self.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    # --- Event loop ---
+    async def get_or_fetch_async(self, key, fetch, cacheable=_always):
+        """Async version of get_or_fetch; `fetch` is a coroutine function."""
+        value, is_stale = self._lookup(key)
+        if is_stale is None:
+            return await self._fetch_once_async(key, fetch, cacheable)
+        if is_stale and key not in self._loop_inflight():
+            self._count("refreshes")
+            task = asyncio.ensure_future(self._fetch_once_async(key, fetch, cacheable))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        return value
+
+    def _loop_inflight(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            return self._async_inflight.setdefault(loop, {})
+
+    async def _fetch_and_store(self, key, fetch, cacheable):
+        value = await fetch()
+        if cacheable(value):
+            self.put(key, value)
+        return value
+
+    async def _fetch_once_async(self, key, fetch, cacheable):
+        inflight = self._loop_inflight()
+        task = inflight.get(key)
+        if task is None:
+            task = inflight[key] = asyncio.ensure_future(self._fetch_and_store(key, fetch, cacheable))
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        else:
+            self._count("coalesced")
+        # Shielded so one caller giving up does not cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["store"] = self.store.stats()
+        return stats
+
+
+# Search cache used by get_movie_title_from_search (query -> movie title)
+search_cache = TTLCache("search")
+
+
+def _normalize(query):
+    """Normalizes the query (lowercase, stripped) to hit cache more often."""
+    return query.lower().strip()
+
 
 def get_cached_result(query):
     """
     Returns the cached result for a query if it exists.
-    Normalizes the query (lowercase, stripped) to hit cache more often.
     """
-    cache = load_cache()
-    key = query.lower().strip()
-    return cache.get(key)
+    return search_cache.get(_normalize(query))
+
 
 def set_cached_result(query, result):
     """Saves a new result to the cache."""
-    cache = load_cache()
-    key = query.lower().strip()
-    cache[key] = result
-    save_cache(cache)
-    print(f"💾 Cached saved: '{key}' -> '{result}'")
\ No newline at end of file
+    key = _normalize(query)
+    search_cache.set(key, result)
+    logger.debug("💾 Cached saved: '%s' -> '%s'", key, result)
+
+
+def get_cache_stats():
+    """Returns hit/miss/eviction counters for sizing the search cache."""
+    return search_cache.stats()
+
+
+def clear_cache():
+    """Removes every cached search result (memory and disk)."""
+    search_cache.clear()
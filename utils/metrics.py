@@ -0,0 +1,275 @@
+"""
+Process-wide metrics, exposed in the Prometheus text format without extra
+dependencies.
+
+Agents and tools update the module-level Counter / Gauge / Histogram objects
+below; each update is one dict change under the metric's own lock. Numbers
+other modules already keep (cache, scheduler and HTTP stats) are read by
+collectors at scrape time instead, so they cost nothing on the hot path.
+
+start_metrics_server() serves GET /metrics from a daemon thread.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from logger import get_logger
+
+logger = get_logger("Metrics")
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))  # 0 disables the endpoint
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # 0.0.0.0 lets other hosts (a Prometheus server) scrape it
+PREFIX = "movie_agent_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in key) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name, help_text):
+        self.name = PREFIX + name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values = {}  # label key -> value
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def value(self, **labels):
+        """(count, sum) for the label set."""
+        with self._lock:
+            state = self._values.get(_label_key(labels))
+            return (state[2], state[1]) if state else (0, 0.0)
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        samples = []
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append((self.name + "_bucket", key + (("le", _format_value(float(bound))),), cumulative))
+            samples.append((self.name + "_sum", key, round(total, 6)))
+            samples.append((self.name + "_count", key, count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def _get_or_create(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name, help_text):
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name, help_text):
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def register_collector(self, collector):
+        """
+        `collector()` is called on every scrape and returns an iterable of
+        (name, type, help, [(labels_dict, value), ...]).
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self):
+        """The whole registry in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.type}"]
+            lines += [f"{name}{_format_labels(key)} {_format_value(value)}" for name, key, value in metric.samples()]
+
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.warning("metrics collector failed: %s", e)
+                continue
+            for name, metric_type, help_text, samples in families:
+                name = PREFIX + name
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+                lines += [f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def render():
+    return registry.render()
+
+
+# --- Metrics written by the agents and tools ---
+PHASE_LATENCY = registry.histogram("phase_latency_seconds", "Latency of each pipeline phase (query, plan, execute, verify).")
+IN_FLIGHT = registry.gauge("in_flight", "Requests currently inside each pipeline phase.")
+PLANS = registry.counter("plans_total", "Plans created, by route (fast_path, llm, failed).")
+TOOL_LATENCY = registry.histogram("tool_latency_seconds", "Latency of each executor step, by tool and status.")
+LLM_LATENCY = registry.histogram("llm_latency_seconds", "Latency of Groq calls that reached the API, by model.")
+LLM_REQUESTS = registry.counter("llm_requests_total", "Groq calls by outcome (ok, cached, error).")
+LLM_TOKENS = registry.counter("llm_tokens_total", "Tokens reported by Groq, by model.")
+LLM_ESCALATIONS = registry.counter("llm_escalations_total", "Calls repeated on the large model after the small model's answer failed validation, by route.")
+LLM_PROMPT_TOKENS = registry.counter("llm_prompt_tokens_total", "Tokens reported by Groq, by prompt type and kind (prompt, completion).")
+OMDB_LOOKUPS = registry.counter("omdb_lookups_total", "OMDb lookups by result (exact, fuzzy, not_found, error).")
+MOVIE_INDEX_LOOKUPS = registry.counter("movie_index_lookups_total", "Local movie index lookups by result (hit, low_confidence, miss, fallback).")
+SPECULATIVE_LOOKUPS = registry.counter("speculative_lookups_total", "Lookups started on an early title candidate, by result (hit, wasted).")
+SPECULATION_SAVED = registry.counter("speculation_saved_seconds_total", "Step latency saved by reusing speculative lookups.")
+DDGS_SEARCHES = registry.counter("ddgs_searches_total", "DuckDuckGo searches by outcome (ok, empty, error, circuit_open).")
+BREAKER_STATE = registry.gauge("circuit_breaker_state", "Circuit breaker state per backend (0 closed, 1 half-open, 2 open).")
+HEDGED_REQUESTS = registry.counter("hedged_requests_total", "Backend calls that sent a hedge, by backend and winner (primary, hedge).")
+
+
+@contextmanager
+def track_phase(phase):
+    """Counts the phase as in flight while it runs, then records its latency."""
+    IN_FLIGHT.inc(phase=phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_LATENCY.observe(time.perf_counter() - started, phase=phase)
+        IN_FLIGHT.dec(phase=phase)
+
+
+# --- HTTP endpoint ---
+def _metrics_handler():
+    # http.server is only imported when the endpoint starts (it is slow to import)
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the console
+
+    return _MetricsHandler
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """
+    Serves /metrics on `host`:`port` from a daemon thread (local only by default). Safe to call more than once
+    (Streamlit reruns): only the first call starts a server. Returns the server,
+    or None if disabled (port 0) or the port is taken.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None or not port:
+            return _server
+        from http.server import ThreadingHTTPServer
+        try:
+            _server = ThreadingHTTPServer((host, port), _metrics_handler())
+        except OSError as e:
+            logger.warning("metrics endpoint not started on port %s: %s", port, e)
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info("📈 Metrics available at http://%s:%s/metrics", host, port)
+        return _server
@@ -0,0 +1,209 @@
+"""
+Lightweight per-request tracing.
+
+`trace(name)` opens one trace per user query; `span(name)` opens a child of
+whatever span is current (planning, executor steps, tool calls, HTTP/DDGS
+requests, LLM calls). Spans record their duration plus any attributes set on
+them (cache hit/miss, retries, tokens...).
+
+The current span lives in a contextvar, so it follows asyncio tasks and
+asyncio.to_thread. Plain thread pool hops must carry it explicitly with
+`contextvars.copy_context().run`.
+
+Finished spans are appended, one JSON object per line, to TRACE_FILE. With
+TRACE_OTEL=1 (and opentelemetry-api installed) they are mirrored as
+OpenTelemetry spans too. Tracing is off unless TRACE_ENABLED=1; a disabled
+`span()` is one contextvar lookup returning a shared no-op span.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+from logger import get_logger
+
+logger = get_logger("Tracing")
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "0").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join("logs", "traces.jsonl"))
+TRACE_OTEL = os.getenv("TRACE_OTEL", "0").lower() in ("1", "true", "yes")
+
+_current_span = ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """Returned when tracing is off (or outside a trace): every call does nothing."""
+    trace_id = None
+    span_id = None
+
+    def set(self, key, value):
+        pass
+
+    def incr(self, key, amount=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    def __init__(self, tracer, name, trace_id, parent=None, attrs=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.attrs = dict(attrs or {})
+        self.status = "ok"
+        self.start_time = None
+        self.duration = None
+        self._started = None
+        self._token = None
+        self._otel_span = None
+
+    def set(self, key, value):
+        self.attrs[key] = value
+
+    def incr(self, key, amount=1):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def __enter__(self):
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        self._otel_span = self.tracer._start_otel(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        if exc_type is not None:
+            self.status = "error"
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # A generator span closed from another context (e.g. abandoned stream)
+            pass
+        self.tracer._finish(self)
+        return False
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": round(self.start_time, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+class Tracer:
+    """
+    Creates spans and exports the finished ones. `path=None` keeps them in
+    `self.spans` instead of writing a file (handy for tests and benchmarks).
+    """
+    def __init__(self, enabled=TRACE_ENABLED, path=TRACE_FILE, otel=TRACE_OTEL):
+        self.enabled = enabled
+        self.path = path
+        self.spans = []
+        self._lock = threading.Lock()
+        self._file = None
+        self._otel = _load_otel() if otel else None
+
+    def trace(self, name, **attrs):
+        """Starts a new trace (the root span for one user query)."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, uuid.uuid4().hex, attrs=attrs)
+
+    def span(self, name, **attrs):
+        """Starts a child of the current span; a no-op outside a trace."""
+        parent = _current_span.get()
+        if parent is None:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent=parent, attrs=attrs)
+
+    # --- Export ---
+    def _finish(self, span):
+        self._end_otel(span)
+        record = span.to_dict()
+        with self._lock:
+            if self.path is None:
+                self.spans.append(record)
+                return
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(record, default=str) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # --- OpenTelemetry (optional) ---
+    def _start_otel(self, span):
+        if self._otel is None:
+            return None
+        otel_trace, otel_tracer = self._otel
+        parent = span.parent._otel_span if span.parent else None
+        context = otel_trace.set_span_in_context(parent) if parent is not None else None
+        return otel_tracer.start_span(span.name, context=context)
+
+    def _end_otel(self, span):
+        otel_span = span._otel_span
+        if otel_span is None:
+            return
+        otel_span.set_attribute("app.trace_id", span.trace_id)
+        for key, value in span.attrs.items():
+            otel_span.set_attribute(key, value if isinstance(value, (bool, int, float, str)) else str(value))
+        if span.status == "error":
+            otel_span.set_status(self._otel[0].Status(self._otel[0].StatusCode.ERROR))
+        otel_span.end()
+
+
+def _load_otel():
+    try:
+        from opentelemetry import trace as otel_trace
+    except ImportError:
+        logger.warning("TRACE_OTEL is set but opentelemetry-api is not installed; exporting JSONL only.")
+        return None
+    return otel_trace, otel_trace.get_tracer("ai_movie_agent")
+
+
+# Process-wide tracer (swap it with configure() or patch it in tests)
+tracer = Tracer()
+
+
+def configure(enabled=True, path=TRACE_FILE, otel=TRACE_OTEL):
+    """Replaces the process-wide tracer, e.g. to turn tracing on at runtime."""
+    global tracer
+    tracer.close()
+    tracer = Tracer(enabled=enabled, path=path, otel=otel)
+    return tracer
+
+
+def trace(name, **attrs):
+    return tracer.trace(name, **attrs)
+
+
+def span(name, **attrs):
+    return tracer.span(name, **attrs)
+
+
+def current_span():
+    """The active span, or a no-op span, so callers can always `.set(...)` on it."""
+    return _current_span.get() or NOOP_SPAN